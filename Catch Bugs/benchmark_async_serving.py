@@ -0,0 +1,161 @@
+"""
+Compare gunicorn gthread against the ASGI serving mode under slow LLM calls
+
+Starts a fake Ollama whose /api/generate sleeps for --delay seconds, then
+serves the app both ways against it and fires --requests concurrent
+/api/chat calls at each, reporting throughput, latency and memory.
+
+    python "Catch Bugs/benchmark_async_serving.py" --requests 200 --delay 2
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fake_ollama_app(delay):
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    async def version(request):
+        return JSONResponse({'version': 'benchmark'})
+
+    async def tags(request):
+        return JSONResponse({'models': [{'name': 'llama3.2:latest'}]})
+
+    async def generate(request):
+        await asyncio.sleep(delay)
+        return JSONResponse({'response': 'Fix leaking taps and take shorter showers.', 'done': True})
+
+    return Starlette(routes=[
+        Route('/api/version', version),
+        Route('/api/tags', tags),
+        Route('/api/generate', generate, methods=['POST'])
+    ])
+
+
+def rss_mb(pid):
+    """Resident memory of a process and its children in MB."""
+    output = subprocess.run(['ps', '-o', 'rss=', '--pid', str(pid), '--ppid', str(pid)],
+                            capture_output=True, text=True).stdout
+    return sum(int(value) for value in output.split()) / 1024
+
+
+def start(command, env):
+    return subprocess.Popen(command, cwd=project_dir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} did not come up")
+
+
+async def load(url, requests, timeout):
+    latencies = []
+    failures = 0
+    limits = httpx.Limits(max_connections=requests)
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        async def one(i):
+            nonlocal failures
+            started = time.perf_counter()
+            try:
+                response = await client.post(f'{url}/api/chat', json={'message': f'How can I save water at home? ({i})'})
+                if response.status_code != 200:
+                    failures += 1
+                    return
+                latencies.append(time.perf_counter() - started)
+            except httpx.HTTPError:
+                failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'ok': len(latencies),
+        'failed': failures,
+        'seconds': elapsed,
+        'throughput': len(latencies) / elapsed if elapsed else 0,
+        'p50': latencies[len(latencies) // 2] if latencies else None,
+        'p95': latencies[int(len(latencies) * 0.95) - 1] if latencies else None
+    }
+
+
+def run_server(name, command, env, args):
+    server = start(command, env)
+    try:
+        wait_ready(f'http://127.0.0.1:{args.port}/healthz')
+        # One request first so chatbot initialization is not measured
+        httpx.post(f'http://127.0.0.1:{args.port}/api/chat', json={'message': 'warm up'}, timeout=60)
+        result = asyncio.run(load(f'http://127.0.0.1:{args.port}', args.requests, args.timeout))
+        result['rss_mb'] = rss_mb(server.pid)
+        result['name'] = name
+        return result
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200, help='Concurrent /api/chat requests')
+    parser.add_argument('--delay', type=float, default=2.0, help='Fake Ollama generation time in seconds')
+    parser.add_argument('--timeout', type=float, default=300.0)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--ollama-port', type=int, default=11499)
+    parser.add_argument('--fake-ollama', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.fake_ollama:
+        import uvicorn
+        uvicorn.run(fake_ollama_app(args.delay), host='127.0.0.1', port=args.ollama_port, log_level='warning')
+        return
+
+    env = dict(os.environ,
+               OLLAMA_API_URL=f'http://127.0.0.1:{args.ollama_port}',
+               STARTUP_WARMUP='False', TOPIC_GATE_ENABLED='False')
+    ollama = start([sys.executable, os.path.abspath(__file__), '--fake-ollama',
+                    '--delay', str(args.delay), '--ollama-port', str(args.ollama_port)], env)
+
+    try:
+        wait_ready(f'http://127.0.0.1:{args.ollama_port}/api/version')
+        results = [
+            run_server('gunicorn gthread (4 workers x 2 threads)',
+                       ['gunicorn', '--workers', '4', '--threads', '2', '--worker-class', 'gthread',
+                        '--timeout', '300', '--bind', f'127.0.0.1:{args.port}', 'app:app'], env, args),
+            run_server('uvicorn asgi (1 process)',
+                       ['uvicorn', 'asgi:application', '--host', '127.0.0.1', '--port', str(args.port),
+                        '--log-level', 'warning'], env, args)
+        ]
+    finally:
+        ollama.send_signal(signal.SIGTERM)
+        ollama.wait(timeout=30)
+
+    print(f"{args.requests} concurrent /api/chat requests, {args.delay}s generation time\n")
+    print(f"{'server':<42}{'ok':>6}{'failed':>8}{'req/s':>8}{'p50 s':>8}{'p95 s':>8}{'RSS MB':>8}")
+    for r in results:
+        p50 = f"{r['p50']:.2f}" if r['p50'] is not None else '-'
+        p95 = f"{r['p95']:.2f}" if r['p95'] is not None else '-'
+        print(f"{r['name']:<42}{r['ok']:>6}{r['failed']:>8}{r['throughput']:>8.1f}{p50:>8}{p95:>8}{r['rss_mb']:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
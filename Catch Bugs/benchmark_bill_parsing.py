@@ -0,0 +1,150 @@
+"""
+Compare the per-pattern regex bill parsers with the single-pass bill parser
+
+The legacy approach, replicated here, runs re.search once per field and
+pattern over the whole text (what WaterTaxExpert, AdvancedBillAnalyzer and
+the others each did before utils.bill_parser). parse_bill normalizes the
+text once and makes a single finditer over one label alternation.
+
+    python "Catch Bugs/benchmark_bill_parsing.py"
+    python "Catch Bugs/benchmark_bill_parsing.py" --bills 2000 --repeat 5
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from utils.bill_parser import parse_bill
+
+ASKI = """ASKİ Ankara Su ve Kanalizasyon İdaresi - Su Tüketim Faturası
+FATURA NO: {bill}
+FATURA TARİHİ: 04.12.2024
+ABONE NO {subscriber}
+SÖZLEŞME NO: 100000148044
+DÖNEM 2024-11
+SON ÖDEME TARİHİ: 17.12.2024
+SON ENDEKS {last}
+İLK ENDEKS {first}
+TÜKETİM (m3): {consumption}
+OKUMA GÜN SAYISI: 28
+SU BEDELİ (TL): {water}
+ATIKSU BEDELİ (TL): {wastewater}
+ÇTV (TL): 9.20
+TOPLAM BORÇ (TL) (ANAPARA): {total}
+"""
+
+LABELLED = """Su Faturası
+Fatura No: {bill}
+Abone No: {subscriber}
+Abone Adı: Ayşe Yılmaz
+Adres: Çankaya Mah. 5. Sok No 3
+Fatura Tarihi: 04.12.2024
+Son Endeks: {last}
+İlk Endeks: {first}
+Tüketim: {consumption} m³
+Su Bedeli: {water}
+Atıksu Bedeli: {wastewater}
+Toplam Tutar: {total} TL
+"""
+
+ENGLISH = """Water Bill
+Invoice Number: {bill}
+Subscriber Number: {subscriber}
+Customer Name: Jane Doe
+Billing Period: 11/2024 - 12/2024
+Water Consumption: {consumption} m3
+Water Cost (TL): {water}
+Wastewater Cost (TL): {wastewater}
+Tax Rate: 10%
+Total Amount: {total}
+"""
+
+# Field -> regexes, as the parsers replaced by utils.bill_parser declared them
+LEGACY_PATTERNS = {
+    'bill_number': [r'FATURA NO[:]*\s*(\d+)', r'Fatura No:\s*(\d+)', r'Invoice Number[:]*\s*(\d+)'],
+    'subscriber_no': [r'ABONE NO[:]*\s*(\d+)', r'Abone No:\s*(\d+)', r'Subscriber Number[:]*\s*(\d+)'],
+    'subscriber_name': [r'Abone Adı:\s*([^\n]+)', r'(?:Müşteri|Customer)\s*(?:Adı|Name)[:]*\s*([^\n]+)'],
+    'address': [r'Adres:\s*([^\n]+)', r'(?:Adres|Address)[:]*\s*([^\n]+)'],
+    'bill_date': [r'Fatura Tarihi:\s*(\d{2}\.\d{2}\.\d{4})', r'FATURA TARİHİ[:]*\s*(\d{2}\.\d{2}\.\d{4})'],
+    'billing_period': [r'DÖNEM[:]*\s*(\d{4}-\d{2})', r'Billing Period[:]*\s*(\d{4}-\d{2})',
+                       r'(?:Dönem|Period)[:]*\s*(\d{2}/\d{4}\s*-\s*\d{2}/\d{4})'],
+    'last_index': [r'Son Endeks:\s*(\d+)', r'SON ENDEKS\s*(\d+)'],
+    'first_index': [r'İlk Endeks:\s*(\d+)', r'İLK ENDEKS\s*(\d+)'],
+    'consumption': [r'TÜKETİM \(m3\)[:]*\s*(\d+(?:\.\d+)?)', r'Tüketim:\s*(\d+)\s*m³',
+                    r'(?:Su\s*Tüketimi|Water\s*Consumption)[:]*\s*(\d+(?:\.\d{1,2})?)\s*m3'],
+    'reading_days': [r'OKUMA GÜN SAYISI[:]*\s*(\d+)', r'Okuma Gün Sayısı:\s*(\d+)'],
+    'water_cost': [r'SU BEDELİ \(TL\)[:]*\s*(\d+(?:\.\d+)?)', r'Su Bedeli[^:]*:\s*([\d.,]+)',
+                   r'Water Cost \(TL\)[:]*\s*(\d+(?:\.\d+)?)'],
+    'wastewater_cost': [r'ATIKSU BEDELİ \(TL\)[:]*\s*(\d+(?:\.\d+)?)', r'Atıksu Bedeli:\s*([\d.,]+)',
+                        r'Wastewater Cost \(TL\)[:]*\s*(\d+(?:\.\d+)?)'],
+    'total_amount': [r'TOPLAM BORÇ \(TL\)[^:\d]*[:]*\s*(\d+(?:\.\d+)?)', r'Toplam Tutar:\s*([\d.,]+)',
+                     r'(?:Total|Toplam)\s*(?:Amount|Tutar)[:]*\s*[₺$]*\s*(\d+(?:\.\d{1,2})?)'],
+    'tax_rate': [r'(?:Tax|Vergi)\s*(?:Rate|Oranı)[:]*\s*(\d+(?:\.\d{1,2})?)%'],
+}
+
+
+def legacy_parse(text):
+    fields = {}
+    for name, patterns in LEGACY_PATTERNS.items():
+        for pattern in patterns:
+            match = re.search(pattern, text, re.IGNORECASE | re.UNICODE)
+            if match:
+                fields[name] = match.group(1)
+                break
+    return fields
+
+
+def make_corpus(count, seed=7):
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(count):
+        first = rng.randint(100, 5000)
+        consumption = rng.randint(1, 40)
+        water, wastewater = round(consumption * 17.8, 2), round(consumption * 8.9, 2)
+        template = (ASKI, LABELLED, ENGLISH)[index % 3]
+        corpus.append(template.format(
+            bill=rng.randint(10 ** 7, 10 ** 8), subscriber=rng.randint(10 ** 6, 10 ** 7),
+            first=first, last=first + consumption, consumption=consumption,
+            water=f'{water:.2f}', wastewater=f'{wastewater:.2f}', total=f'{water + wastewater + 9.2:.2f}'
+        ))
+    return corpus
+
+
+def rate(parse, corpus, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in corpus:
+            parse(text)
+        times.append(time.perf_counter() - started)
+    return len(corpus) / statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bills', type=int, default=3000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.bills)
+    parse_bill(corpus[0])  # compile the scanners outside the timing
+
+    legacy = rate(legacy_parse, corpus, args.repeat)
+    single = rate(parse_bill, corpus, args.repeat)
+    legacy_fields = sum(len(legacy_parse(text)) for text in corpus) / len(corpus)
+    single_fields = sum(len(parse_bill(text).values) for text in corpus) / len(corpus)
+
+    print(f"{len(corpus)} bills (ASKI, labelled Turkish, English)")
+    print(f"  per-pattern re.search: {legacy:8.0f} bills/s, {legacy_fields:.1f} fields/bill")
+    print(f"  single-pass parse_bill: {single:7.0f} bills/s, {single_fields:.1f} fields/bill (typed)")
+    print(f"  speedup: {single / legacy:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Compare the warm tesserocr engine with pytesseract on the same images
+
+Each image is preprocessed once, then OCRed by both backends of
+utils/ocr_engine.py. Reports engine start-up, per-image latency and how
+closely the two texts agree. Uses the synthetic bills of
+benchmark_ocr_preprocessing.py unless image paths are given.
+
+    python "Catch Bugs/benchmark_ocr_engines.py" --images 8
+    python "Catch Bugs/benchmark_ocr_engines.py" uploads/*.jpg
+"""
+import argparse
+import difflib
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(script_dir))
+sys.path.insert(0, script_dir)
+
+from benchmark_ocr_preprocessing import make_corpus
+from utils.image_preprocessing import preprocess_for_ocr
+from utils.ocr_engine import PytesseractEngine, TesserocrEngine, tesserocr
+
+
+def time_engine(engine_class, images):
+    started = time.perf_counter()
+    engine = engine_class()
+    startup = time.perf_counter() - started
+
+    texts, latencies = [], []
+    for image in images:
+        started = time.perf_counter()
+        texts.append(engine.image_to_string(image))
+        latencies.append(time.perf_counter() - started)
+    engine.close()
+    return engine, startup, latencies, texts
+
+
+def report(name, engine, startup, latencies):
+    print(f"{name:>12} ({engine.languages}): start-up {startup * 1000:.0f} ms, "
+          f"median {statistics.median(latencies) * 1000:.0f} ms/image, "
+          f"total {sum(latencies):.2f}s, {len(latencies) / sum(latencies):.2f} images/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=8)
+    parser.add_argument('paths', nargs='*')
+    args = parser.parse_args()
+
+    if shutil.which('tesseract') is None:
+        print("The tesseract binary is not installed; nothing to compare")
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = args.paths or make_corpus(directory, args.images)
+        images = [preprocess_for_ocr(path) for path in paths]
+    print(f"{len(images)} preprocessed images")
+
+    engine, startup, latencies, baseline = time_engine(PytesseractEngine, images)
+    report('pytesseract', engine, startup, latencies)
+    if tesserocr is None:
+        print("   tesserocr: not installed")
+        return
+
+    engine, startup, warm_latencies, texts = time_engine(TesserocrEngine, images)
+    report('tesserocr', engine, startup, warm_latencies)
+
+    agreement = statistics.mean(difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(baseline, texts))
+    print(f"speed-up {sum(latencies) / sum(warm_latencies):.1f}x, text agreement {agreement:.1%}")
+
+
+if __name__ == '__main__':
+    main()
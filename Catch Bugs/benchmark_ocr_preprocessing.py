@@ -0,0 +1,137 @@
+"""
+Compare the old full-resolution bill preprocessing with the in-memory pipeline
+
+Generates a synthetic corpus of skewed, phone-sized bill photos, then runs
+each pipeline over it in a fresh process and reports preprocessing time,
+OCR time (when the tesseract binary is installed) and peak RSS.
+
+    python "Catch Bugs/benchmark_ocr_preprocessing.py" --images 8
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+LINES = [
+    'ASKI Genel Mudurlugu - Su Faturasi',
+    'Abone No: 62252704946197',
+    'Fatura Donemi: 11/2024 - 12/2024',
+    'Ilk Endeks: 1532    Son Endeks: 1549',
+    'Su Tuketimi: 17 m3',
+    'Su Bedeli: 245,65 TL',
+    'Atiksu Bedeli: 98,20 TL',
+    'KDV: 34,38 TL',
+    'Toplam Tutar: 378,23 TL',
+    'Son Odeme Tarihi: 15.01.2025',
+]
+
+
+def make_corpus(directory, count):
+    """Write count 4000x3000 JPEG 'photos' of a bill, each rotated a little."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    try:
+        font = ImageFont.truetype('DejaVuSans.ttf', 64)
+    except OSError:
+        font = ImageFont.load_default()
+
+    paths = []
+    for index in range(count):
+        page = Image.new('L', (2480, 3508), 255)
+        draw = ImageDraw.Draw(page)
+        for line_number, line in enumerate(LINES * 3):
+            draw.text((180, 200 + line_number * 100), line, fill=0, font=font)
+        angle = (index % 7) - 3
+        photo = page.rotate(angle, expand=True, fillcolor=235).resize((3000, 4000))
+        path = os.path.join(directory, f'bill_{index}.jpg')
+        photo.convert('RGB').save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def legacy_preprocess(image_path, debug_path):
+    """The preprocessing the bill analyzer used before: full size, np.where deskew, cubic warp, disk write."""
+    import cv2
+    import numpy as np
+
+    image = cv2.imread(image_path)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    gray = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
+    coords = np.column_stack(np.where(gray > 0))
+    angle = cv2.minAreaRect(coords)[-1]
+    angle = -(90 + angle) if angle < -45 else -angle
+    (h, w) = image.shape[:2]
+    M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+    result = cv2.warpAffine(gray, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+    cv2.imwrite(debug_path, result)
+    return result
+
+
+def run_worker(variant, paths):
+    """Process the corpus with one pipeline and print timings and peak RSS as JSON."""
+    from utils.image_preprocessing import preprocess_for_ocr
+
+    ocr = shutil.which('tesseract') is not None
+    if ocr:
+        import pytesseract
+
+    debug_path = os.path.join(tempfile.gettempdir(), 'preprocessed.jpg')
+    preprocess_seconds = ocr_seconds = 0.0
+    for path in paths:
+        started = time.perf_counter()
+        if variant == 'legacy':
+            image = legacy_preprocess(path, debug_path)
+        else:
+            with open(path, 'rb') as f:
+                image = preprocess_for_ocr(f.read())
+        preprocess_seconds += time.perf_counter() - started
+
+        if ocr:
+            started = time.perf_counter()
+            pytesseract.image_to_string(image)
+            ocr_seconds += time.perf_counter() - started
+
+    print(json.dumps({
+        'variant': variant,
+        'preprocess_ms_per_image': round(preprocess_seconds / len(paths) * 1000, 1),
+        'ocr_ms_per_image': round(ocr_seconds / len(paths) * 1000, 1) if ocr else None,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=8)
+    parser.add_argument('--worker', choices=['legacy', 'pipeline'])
+    parser.add_argument('paths', nargs='*')
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.paths)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_corpus(directory, args.images)
+        print(f"{len(paths)} synthetic bill photos, 3000x4000 JPEG")
+        for variant in ('legacy', 'pipeline'):
+            output = subprocess.run([sys.executable, __file__, '--worker', variant, *paths],
+                                    capture_output=True, text=True, cwd=project_dir)
+            if output.returncode != 0:
+                print(output.stderr)
+                continue
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            ocr = f"{result['ocr_ms_per_image']} ms" if result['ocr_ms_per_image'] is not None else 'n/a (no tesseract)'
+            print(f"{variant:>9}: preprocess {result['preprocess_ms_per_image']} ms/image, "
+                  f"OCR {ocr}, peak RSS {result['peak_rss_mb']} MB")
+
+
+if __name__ == '__main__':
+    main()
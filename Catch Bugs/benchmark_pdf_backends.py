@@ -0,0 +1,86 @@
+"""
+Pages per second and peak memory of each PDF text backend on our PDFs
+
+Each installed backend of utils.pdf_text runs in a fresh subprocess, so its
+import cost and peak RSS are measured in isolation, extracting every page
+of every PDF --repeat times. Text lengths are reported to catch a backend
+that is fast because it misses text.
+
+    python "Catch Bugs/benchmark_pdf_backends.py"
+    python "Catch Bugs/benchmark_pdf_backends.py" uploads/62252704946197.pdf --repeat 50
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from utils.pdf_text import BACKENDS, create_pdf_backend
+
+
+def measure(name, paths, repeat):
+    """Run in the child process: extract all pages repeat times and report as JSON."""
+    import resource
+
+    started = time.perf_counter()
+    backend = create_pdf_backend(name)
+    load_seconds = time.perf_counter() - started
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    documents = [open(path, 'rb').read() for path in paths]
+    pages = chars = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for document in documents:
+            texts = backend.page_texts(document)
+            pages += len(texts)
+            chars += sum(len(''.join(text.split())) for text in texts)
+    seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        'load_ms': load_seconds * 1000,
+        'pages_per_second': pages / seconds,
+        'chars_per_page': chars / pages if pages else 0,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'extraction_rss_mb': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_kb) / 1024,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pdfs', nargs='*', help="PDFs to extract (default: uploads/*.pdf)")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--measure', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    paths = args.pdfs or sorted(glob.glob(os.path.join(project_dir, 'uploads', '*.pdf')))
+    if not paths:
+        sys.exit("No PDFs given and none in uploads/")
+
+    if args.measure:
+        measure(args.measure, paths, args.repeat)
+        return
+
+    print(f"{len(paths)} PDFs x {args.repeat} runs")
+    print(f"  {'backend':8s} {'pages/s':>9s} {'chars/page':>11s} {'peak RSS':>9s} {'extraction':>11s} {'import':>8s}")
+    for name in BACKENDS:
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *paths, '--repeat', str(args.repeat), '--measure', name],
+            capture_output=True, text=True
+        )
+        if result.returncode:
+            reason = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'
+            print(f"  {name:8s} unavailable: {reason}")
+            continue
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"  {name:8s} {stats['pages_per_second']:9.1f} {stats['chars_per_page']:11.0f} "
+              f"{stats['peak_rss_mb']:7.1f}MB {stats['extraction_rss_mb']:9.1f}MB {stats['load_ms']:6.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
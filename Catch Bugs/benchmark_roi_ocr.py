@@ -0,0 +1,89 @@
+"""
+Compare template region OCR with full-page OCR on ASKI bill photos
+
+For each image, times full-page OCR followed by the regex field parser,
+and the bill_templates region pipeline, then scores both against the
+values printed on the sample bill in uploads/.
+
+    python "Catch Bugs/benchmark_roi_ocr.py"
+    python "Catch Bugs/benchmark_roi_ocr.py" --repeat 5 path/to/bill.jpg
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import time
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from utils.bill_templates import extract_with_templates
+from utils.image_preprocessing import preprocess_for_ocr
+from utils.ocr_engine import get_ocr_engine
+from utils.water_tax_expert import WaterTaxExpert
+
+SAMPLE = os.path.join(project_dir, 'uploads', '20241229_164626.jpg')
+
+# What is printed on the sample bill
+EXPECTED = {
+    'bill_number': '24220764',
+    'bill_date': '04.12.2024',
+    'contract_no': '100000148044',
+    'payment_deadline': '17.12.2024',
+    'total_bill': '120.30',
+    'last_index': '1361',
+    'first_index': '1357',
+    'total_consumption': '4',
+    'reading_days': '28',
+    'water_cost': '71.22',
+    'wastewater_cost': '35.61',
+    'environment_tax': '9.20',
+    'water_vat_1': '0.71',
+    'wastewater_vat_10': '3.56',
+}
+
+
+def score(fields):
+    return sum(1 for name, value in EXPECTED.items() if fields.get(name) == value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('paths', nargs='*', default=[SAMPLE])
+    args = parser.parse_args()
+
+    if shutil.which('tesseract') is None:
+        print("The tesseract binary is not installed; nothing to compare")
+        return
+
+    engine = get_ocr_engine()
+    expert = WaterTaxExpert()
+    print(f"OCR engine: {engine.name} ({engine.languages})")
+
+    for path in args.paths:
+        gray = preprocess_for_ocr(path)
+        full_times, region_times = [], []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            full_fields = expert.extract_bill_details(engine.image_to_string(gray))
+            full_times.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            result = extract_with_templates(gray, engine)
+            region_times.append(time.perf_counter() - started)
+
+        region_fields = result['fields'] if result else {}
+        full_time, region_time = statistics.median(full_times), statistics.median(region_times)
+        print(os.path.basename(path))
+        print(f"   full page: {full_time:.2f}s, {score(full_fields)}/{len(EXPECTED)} fields correct")
+        if result is None:
+            print(f"     regions: {region_time:.2f}s, no template matched (full-page fallback)")
+        else:
+            print(f"     regions: {region_time:.2f}s, {score(region_fields)}/{len(EXPECTED)} fields correct "
+                  f"({result['template']}), {full_time / region_time:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
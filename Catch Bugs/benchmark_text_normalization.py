@@ -0,0 +1,114 @@
+"""
+Micro-benchmarks for utils.turkish_text against the code it replaced
+
+Each case times the old inline normalization and its turkish_text
+replacement on the same inputs, cold (unique inputs, the memo cache never
+hits) and warm (repeated inputs). Correctness checks run first.
+
+    python "Catch Bugs/benchmark_text_normalization.py"
+    python "Catch Bugs/benchmark_text_normalization.py" --number 20000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from utils import turkish_text
+from utils.turkish_text import fold_ascii, fold_ocr_digits, fold_upper, parse_number, search_key, turkish_lower
+
+BILL = """ASKİ Ankara Su ve Kanalizasyon İdaresi - Su Tüketim Faturası
+FATURA NO: 24220764  FATURA TARİHİ: 04.12.2024  ABONE NO 1234567
+DÖNEM 2024-11  SON ÖDEME TARİHİ: 17.12.2024
+SON ENDEKS 1361  İLK ENDEKS 1357  TÜKETİM (m3): 4  OKUMA GÜN SAYISI: 28
+SU BEDELİ (TL): 71,22  ATIKSU BEDELİ (TL): 35,61  ÇTV (TL): 9,20
+TOPLAM BORÇ (TL) (ANAPARA): 1.120,30
+""" * 3
+
+QUESTION = "  Yağmur suyu   hasadı İçin   hangi DEPOLAMA yöntemlerini önerirsiniz?  "
+
+_REPLACEMENTS = {
+    'İ': 'I', 'ı': 'i', 'Ş': 'S', 'ş': 's',
+    'Ğ': 'G', 'ğ': 'g', 'Ü': 'U', 'ü': 'u',
+    'Ö': 'O', 'ö': 'o', 'Ç': 'C', 'ç': 'c'
+}
+
+
+def legacy_normalize_turkish(text):
+    """AdvancedBillAnalyzer.normalize_turkish before turkish_text."""
+    for turkish, normalized in _REPLACEMENTS.items():
+        text = text.replace(turkish, normalized)
+    return text
+
+
+def legacy_bill_upper(text):
+    """bill_parser.normalize_bill_text before turkish_text (one table, no OCR folding)."""
+    return text.translate(str.maketrans('İIıiŞşĞğÜüÖöÇç', 'IIIISSGGUUOOCC')).upper()
+
+
+def legacy_question_key(question):
+    """batch_qa.normalize_question before turkish_text."""
+    return ' '.join(question.split()).casefold()
+
+
+def legacy_amount(value):
+    """DetailedBillAnalyzer's comma swap, which misreads thousands separators."""
+    return float(value.replace(',', '.'))
+
+
+CHECKS = [
+    ('turkish_lower', turkish_lower('IĞDIR İZMİR'), 'ığdır izmir'),
+    ('search_key', search_key('SU FATURASI'), search_key('su faturası')),
+    ('search_key english', search_key('WATER  Bill'), 'water bill'),
+    ('fold_upper', fold_upper('Tüketim (m³) İlk'), 'TUKETIM (M³) ILK'),
+    ('fold_ocr_digits', fold_ocr_digits('TOPLAM 1O4,5O TL l4 NO12 lOl'), 'TOPLAM 104,50 TL 14 NO12 lOl'),
+    ('parse_number', str(parse_number('1.234,56')), '1234.56'),
+    ('parse_number english', str(parse_number('120.30')), '120.30'),
+    ('question key', legacy_question_key('İstanbul') == legacy_question_key('istanbul'), False),
+    ('question key fixed', search_key('İstanbul') == search_key('istanbul'), True),
+]
+
+
+def cases(unique):
+    """(name, legacy callable, new callable) with fresh or repeated inputs."""
+    counter = iter(range(10 ** 9))
+
+    def text(base):
+        return (lambda: f"{base}{next(counter)}") if unique else (lambda: base)
+
+    bill, question = text(BILL), text(QUESTION)
+    return [
+        ('ascii fold of a bill', lambda: legacy_normalize_turkish(bill()), lambda: fold_ascii(bill())),
+        ('bill label form', lambda: legacy_bill_upper(bill()), lambda: fold_upper(fold_ocr_digits(bill()))),
+        ('question dedupe key', lambda: legacy_question_key(question()), lambda: search_key(question())),
+        ('amount parsing', lambda: legacy_amount('1234,56'), lambda: parse_number('1.234,56')),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    failed = [name for name, got, expected in CHECKS if got != expected]
+    for name, got, expected in CHECKS:
+        print(f"{'ok  ' if got == expected else 'FAIL'} {name}: {got!r}")
+    if failed:
+        sys.exit(1)
+
+    for label, unique in (('cold', True), ('warm', False)):
+        print(f"\n{label} inputs, microseconds per call (best of {args.repeat})")
+        for name, legacy, new in cases(unique):
+            turkish_text.fold_upper.cache_clear()
+            turkish_text.fold_ocr_digits.cache_clear()
+            turkish_text.search_key.cache_clear()
+            old_time = min(timeit.repeat(legacy, number=args.number, repeat=args.repeat)) / args.number * 1e6
+            new_time = min(timeit.repeat(new, number=args.number, repeat=args.repeat)) / args.number * 1e6
+            print(f"  {name:22s} legacy {old_time:8.2f}   turkish_text {new_time:8.2f}   {old_time / new_time:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Threshold sweep for utils.topic_gate on the dev split
+
+Trains the gate once, then prints precision and recall of letting on-topic
+questions through at each threshold on topic-gate-dev.jsonl. Pick
+TOPIC_GATE_THRESHOLD here; the holdout split is only for the final check in
+test_topic_gate.py.
+
+    python "Catch Bugs/benchmark_topic_gate.py"
+    python "Catch Bugs/benchmark_topic_gate.py" --min-recall 0.9
+"""
+import argparse
+import os
+import sys
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from utils.topic_gate import DEV_EXAMPLES, TopicGate, load_labelled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--min-recall', type=float, default=0.95,
+                        help="Recall the chosen threshold must keep (refusing on-topic questions costs most)")
+    args = parser.parse_args()
+
+    gate = TopicGate().train()
+    texts, labels = load_labelled(DEV_EXAMPLES)
+    print(f"dev split: {sum(labels)} on-topic, {len(labels) - sum(labels)} off-topic")
+    print(f"{'threshold':>9} {'precision':>9} {'recall':>7}")
+
+    best = None
+    for step in range(5, 100, 5):
+        gate.threshold = step / 100
+        scores = gate.evaluate(texts, labels)
+        print(f"{gate.threshold:>9.2f} {scores['precision']:>9.3f} {scores['recall']:>7.3f}")
+        if scores['recall'] >= args.min_recall:
+            best = gate.threshold
+
+    # Highest threshold that still keeps recall, so the most off-topic questions are refused
+    print(f"\nhighest threshold with recall >= {args.min_recall}: {best}")
+    gate.threshold = best or 0.0
+    for text, label in zip(texts, labels):
+        allowed, probability = gate.check(text)
+        if allowed != bool(label):
+            print(f"  {'refused' if label else 'passed'} p={probability:.2f}  {text}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Project root is the parent of this directory
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from utils.batch_qa import BatchQAService
+from utils.job_queue import JobQueue
+
+
+def answer(question, role):
+    return f"{role}: {question}", None, 'test'
+
+
+def worker(db_path, workers):
+    """One gunicorn worker's queue and batch service on the shared database."""
+    queue = JobQueue(db_path=db_path, workers=workers, poll_interval=0.05, retry_delay=0)
+    service = BatchQAService(answer, queue, max_workers=2, poll_interval=0.05)
+    queue.start()
+    return service
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'jobs.db')
+
+
+def wait_for(service, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = service.get_job(job_id)
+        if job['status'] in ('completed', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"batch {job_id} did not finish")
+
+
+def test_batch_is_visible_from_another_worker(db_path):
+    submitting = worker(db_path, workers=0)
+    polling = worker(db_path, workers=1)
+
+    job_id = submitting.submit(["How do I save water?", "  how do I SAVE water? ", "Drip or sprinkler?"], 'farmer')
+    job = wait_for(polling, job_id)
+
+    assert job['status'] == 'completed'
+    assert (job['total'], job['unique'], job['completed']) == (3, 2, 2)
+    by_question = {result['question']: result for result in job['results']}
+    assert by_question["How do I save water?"]['indices'] == [0, 1]
+    assert by_question["Drip or sprinkler?"]['answer'] == "farmer: Drip or sprinkler?"
+    assert submitting.get_job(job_id) == job
+
+
+def test_stream_from_another_worker(db_path):
+    submitting = worker(db_path, workers=1)
+    streaming = worker(db_path, workers=0)
+
+    job_id = submitting.submit(["Q1", "Q2", "Q3"], 'education')
+    results = list(streaming.iter_results(job_id, timeout=10))
+    assert sorted(result['question'] for result in results) == ["Q1", "Q2", "Q3"]
+
+
+def test_repeated_questions_come_from_the_cache(db_path):
+    service = worker(db_path, workers=1)
+    wait_for(service, service.submit(["Q1"], 'education'))
+    job = wait_for(service, service.submit(["Q1"], 'education'))
+    assert job['results'][0]['source'] == 'cache'
+
+
+def test_unknown_job(db_path):
+    assert worker(db_path, workers=0).get_job('missing') is None
+
+
+def test_batch_row_exists_whenever_the_job_does(db_path):
+    service = worker(db_path, workers=0)
+    seen = []
+    enqueue = service.job_queue.enqueue
+
+    def enqueue_and_look(kind, payload, job_id=None):
+        enqueue(kind, payload, job_id=job_id)
+        # A poll from another worker process, before submit returns
+        other = worker(db_path, workers=0)
+        seen.append(other.get_job(job_id))
+        return job_id
+
+    service.job_queue.enqueue = enqueue_and_look
+    job_id = service.submit(["Q1"], 'education')
+    # Not visible until the batch row and the job commit together
+    assert seen == [None]
+    assert service.get_job(job_id)['status'] == 'queued'
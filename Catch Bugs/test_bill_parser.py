@@ -0,0 +1,41 @@
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+# Project root is the parent of this directory
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from utils.bill_parser import parse_bill
+from utils.turkish_text import parse_number
+
+
+@pytest.mark.parametrize('text, total', [
+    ("ÖDENECEK TUTAR 1.250 TL", '1250'),
+    ("TOPLAM TUTAR: 1.234,56 TL", '1234.56'),
+    ("TOPLAM TUTAR: 12.345.678,90", '12345678.90'),
+    ("TOPLAM TUTAR: 120,30 TL", '120.30'),
+    ("TOPLAM TUTAR: 120.30", '120.30'),
+    ("TOPLAM TUTAR: 1234,5", '1234.5'),
+    ("TOTAL AMOUNT: 1,234.56 TL", '1234.56'),
+    ("TOTAL AMOUNT: 1,250 TL", '1250'),
+    ("TOTAL AMOUNT: 98.75", '98.75'),
+])
+def test_total_amount_formats(text, total):
+    assert parse_bill(text).text('total_amount') == total
+
+
+@pytest.mark.parametrize('value, number', [
+    ('1.234,56', '1234.56'),
+    ('1,234.56', '1234.56'),
+    ('1234,56', '1234.56'),
+    ('120.30', '120.30'),
+    ('1.234', '1234'),
+    ('1,234', '1234'),
+    ('12,5', '12.5'),
+    ('1 234,56', '1234.56'),
+])
+def test_parse_number(value, number):
+    assert parse_number(value) == Decimal(number)
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# Project root is the parent of this directory
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from utils.bill_templates import FieldRegion
+
+
+@pytest.mark.parametrize('ocr, value', [
+    ("1.234,56", '1234.56'),
+    ("12.345", '12345'),
+    ("1 234,56", '1234.56'),
+    ("120,30", '120.30'),
+    ("71.22", '71.22'),
+    ("35,6", '35.6'),
+])
+def test_decimal_region_keeps_thousands(ocr, value):
+    assert FieldRegion('total_bill', 'Toplam Tutar', (0, 0, 1, 1), 'decimal').parse(ocr) == value
+
+
+def test_unreadable_region():
+    assert FieldRegion('total_bill', 'Toplam Tutar', (0, 0, 1, 1), 'decimal').parse("..,") is None
@@ -0,0 +1,65 @@
+import os
+import re
+import subprocess
+import sys
+
+# Project root is the parent of this directory
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importing app.py must stay under this budget so gunicorn workers boot fast
+IMPORT_BUDGET_MS = int(os.getenv('IMPORT_BUDGET_MS', '800'))
+
+# Heavy libraries that only specific routes need; they must be imported lazily
+DEFERRED_MODULES = ['cv2', 'pandas', 'matplotlib', 'boto3', 'PyPDF2', 'pytesseract', 'sklearn']
+
+LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure_import(module='app'):
+    """
+    Import a module in a fresh interpreter with -X importtime
+
+    Returns:
+        List of (cumulative microseconds, depth, module name)
+    """
+    env = dict(os.environ, STARTUP_WARMUP='False')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=project_dir, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            entries.append((int(match.group(2)), len(match.group(3)), match.group(4)))
+    return entries
+
+
+def test_import_time():
+    """
+    Check the app import against the time budget and the deferred module list
+    """
+    entries = measure_import('app')
+    total_ms = next(us for us, depth, name in entries if name == 'app') / 1000
+    imported = {name for _, _, name in entries}
+
+    print(f"import app: {total_ms:.0f} ms (budget {IMPORT_BUDGET_MS} ms)")
+    print("\nSlowest direct imports of app:")
+    direct = sorted((e for e in entries if e[1] == 3), reverse=True)[:10]
+    for us, _, name in direct:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    eager = [name for name in DEFERRED_MODULES if name in imported]
+    assert not eager, f"imported at startup: {', '.join(eager)}"
+    assert total_ms <= IMPORT_BUDGET_MS, f"import took {total_ms:.0f} ms (budget {IMPORT_BUDGET_MS} ms)"
+
+
+if __name__ == "__main__":
+    try:
+        test_import_time()
+    except AssertionError as e:
+        print(f"\nFAIL: {e}")
+        sys.exit(1)
@@ -0,0 +1,77 @@
+import os
+import sys
+
+import pytest
+
+# Project root is the parent of this directory
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from utils.intent_router import create_intent_router
+
+BILL_TEXT = """ASKİ Ankara Su ve Kanalizasyon İdaresi - Su Tüketim Faturası
+TÜKETİM (m3): 4
+TOPLAM BORÇ (TL) (ANAPARA): 120.30
+"""
+
+
+@pytest.fixture
+def router():
+    return create_intent_router()
+
+
+@pytest.mark.parametrize('message', [
+    "How can I reduce my water bill amount?",
+    "Faturamı nasıl düşürebilirim, tüketim çok yüksek",
+    "What is the total amount on a typical water bill?",
+    "How do I set up rainwater harvesting for my garden in Ankara?",
+    "Is the weekend good for planting in Ankara?",
+    "How much water does 10 m3 of concrete need?",
+    "Yağmur suyu hasadı nasıl yapılır?",
+    "What is the weather like in Ankara?",
+    "Why is my bill so high?",
+])
+def test_free_form_questions_reach_the_llm(router, message):
+    assert router.detect(message) is None
+
+
+def test_bill_questions_need_a_bill(router):
+    assert router.detect("What is my bill total?") is None
+    assert router.detect("What is my bill total?", has_bill=True) == ('bill', {})
+    assert router.detect("How can I reduce my bill total?", has_bill=True) is None
+
+
+@pytest.mark.parametrize('message, days', [
+    ("Will it rain tomorrow in Ankara?", 1),
+    ("Is it going to rain this week in Ankara? I need to plan irrigation", 7),
+    ("Yarın Ankara'da yağmur yağacak mı, sulama yapmalı mıyım?", 1),
+    ("Bugün İzmir'de hava durumu nasıl olacak", 0),
+    ("Is the weekend rainy in Ankara?", None),
+    ("What's the forecast for today in Konya?", 0),
+])
+def test_forecast_needs_weather_and_time(router, message, days):
+    detected = router.detect(message)
+    if days is None:
+        assert detected is None
+    else:
+        assert detected[0] == 'weather' and detected[1]['day'] == days
+
+
+@pytest.mark.parametrize('message, volume', [
+    ("How much is 5 m³ on the ASKI tariff?", 5.0),
+    ("Tüketimim 8 metreküp, faturam ne kadar olur?", 8.0),
+])
+def test_tariff_questions(router, message, volume):
+    intent, slots = router.detect(message)
+    assert intent == 'tariff' and slots['volume'] == volume
+
+
+def test_tariff_answers_only_from_verified_tiers(router):
+    assert router.route("How much is 5 m³ on the ASKI tariff?")['intent'] == 'tariff'
+    # 25 m³ reaches tiers that are not from the published tariff
+    assert router.route("How much is 25 m³ on the ASKI tariff?") is None
+
+
+def test_uploaded_bill_is_read(router):
+    routed = router.route("What is my bill total?", bill_text=BILL_TEXT)
+    assert routed['intent'] == 'bill' and '120.30' in routed['response']
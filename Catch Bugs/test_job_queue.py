@@ -0,0 +1,63 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Project root is the parent of this directory
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from utils.job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(db_path=str(tmp_path / 'jobs.db'), workers=1, timeout=0.3, poll_interval=0.05, retry_delay=0)
+
+
+def wait_for(queue, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in ('completed', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_hung_handler_is_timed_out_once_and_replaced(queue):
+    release = threading.Event()
+    calls = []
+
+    def hang(payload, progress):
+        calls.append(payload)
+        release.wait(10)
+        return {'late': True}
+
+    queue.register('hang', hang)
+    queue.register('echo', lambda payload, progress: payload)
+    hung = queue.enqueue('hang', {'n': 1})
+
+    job = wait_for(queue, hung)
+    assert job['status'] == 'failed' and 'Timed out' in job['error']
+
+    # The only worker is stuck, yet a fresh one takes the next job
+    assert wait_for(queue, queue.enqueue('echo', {'ok': True}))['result'] == {'ok': True}
+
+    # The stuck handler finishing late neither completes nor reruns the job
+    release.set()
+    time.sleep(0.3)
+    assert queue.get(hung)['status'] == 'failed'
+    assert calls == [{'n': 1}]
+    assert len(queue._threads) == 1
+
+
+def test_queue_opens_its_database_on_first_use(tmp_path):
+    path = tmp_path / 'jobs.db'
+    queue = JobQueue(db_path=str(path), workers=1)
+    queue.register('echo', lambda payload, progress: payload)
+    assert not path.exists()
+    queue.enqueue('echo', {})
+    assert path.exists()
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+resource = pytest.importorskip('resource')
+
+# Project root is the parent of this directory
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from utils import cpu_executor
+from utils.cpu_executor import CPUExecutor, in_worker_process
+from utils.pdf_text import memory_cap
+
+
+def test_inline_extraction_is_not_capped():
+    before = resource.getrlimit(resource.RLIMIT_AS)
+    with memory_cap(64):
+        assert resource.getrlimit(resource.RLIMIT_AS) == before
+    assert resource.getrlimit(resource.RLIMIT_AS) == before
+
+
+def test_worker_extraction_is_capped_and_restored(monkeypatch):
+    monkeypatch.setattr(cpu_executor, '_in_worker', True)
+    before = resource.getrlimit(resource.RLIMIT_AS)
+    with memory_cap(64):
+        soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+        assert soft != resource.RLIM_INFINITY and hard == before[1]
+    assert resource.getrlimit(resource.RLIMIT_AS) == before
+
+
+def test_only_worker_processes_are_flagged():
+    assert not in_worker_process()
+    executor = CPUExecutor(max_workers=1)
+    try:
+        assert executor.run('pdf', in_worker_process) is True
+    finally:
+        executor.shutdown()
+    assert CPUExecutor(max_workers=0).run('pdf', in_worker_process) is False
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('cv2')
+
+# Project root is the parent of this directory
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from utils.bill_parser import parse_bill
+from utils.ocr_layout import read_page
+
+
+class ScriptedEngine:
+    """OCR engine returning fixed page words, then a fixed reading for every region."""
+
+    def __init__(self, page_words, reading):
+        self.page_words = page_words
+        self.reading = reading
+        self.regions = []
+
+    def words(self, image, psm=None, whitelist=None):
+        if psm is None:
+            return self.page_words
+        self.regions.append(image.shape)
+        return [{'text': self.reading, 'left': 0, 'top': 0, 'width': image.shape[1],
+                 'height': image.shape[0], 'conf': 95.0, 'line': 0}]
+
+
+def word(text, left, conf, width=None):
+    # 10 px per character
+    return {'text': text, 'left': left, 'top': 20, 'width': width or 10 * len(text),
+            'height': 20, 'conf': conf, 'line': 0}
+
+
+@pytest.mark.parametrize('glued, reading, expected_text, amount, value_px', [
+    # The parsed value stops before the misread "S"; the label and the "S" stay
+    ("TUTAR:1.234,5S", "1.234,5", "TOPLAM TUTAR:1.234,5S", '1234.5', 70),
+    # Value between a label and a unit in one word
+    ("TUTAR:l.234,56TL", "1.234,56", "TOPLAM TUTAR:1.234,56TL", '1234.56', 80),
+])
+def test_value_inside_a_word_keeps_the_rest_of_it(glued, reading, expected_text, amount, value_px):
+    engine = ScriptedEngine([word("TOPLAM", 20, 96.0), word(glued, 100, 40.0)], reading)
+    gray = np.full((60, 400), 255, dtype=np.uint8)
+
+    result = read_page(gray, engine, fields=['total_amount'])
+
+    assert result['refined'] == 1
+    assert result['text'] == expected_text
+    assert parse_bill(result['text']).text('total_amount') == amount
+    # Only the value's characters were cropped, enlarged twice
+    assert engine.regions[0][1] == 2 * value_px
+
+
+def test_whole_word_value_is_replaced():
+    engine = ScriptedEngine([word("TOPLAM", 20, 96.0), word("TUTAR:", 90, 96.0), word("l.234,56", 160, 40.0)],
+                            "1.234,56")
+    gray = np.full((60, 400), 255, dtype=np.uint8)
+
+    result = read_page(gray, engine, fields=['total_amount'])
+
+    assert result['text'] == "TOPLAM TUTAR: 1.234,56"
+    assert parse_bill(result['text']).text('total_amount') == '1234.56'
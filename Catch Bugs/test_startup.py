@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+
+# Project root is the parent of this directory
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from utils.startup import Lazy, Warmup
+
+
+def test_lazy_builds_once():
+    calls = []
+    value = Lazy(lambda: calls.append(1) or len(calls))
+    assert value.get() == 1 and value.get() == 1
+    assert value.initialized and len(calls) == 1
+
+
+def test_rejected_value_is_built_again():
+    results = iter([None, 'bot', 'other'])
+    value = Lazy(lambda: next(results), accept=lambda bot: bot is not None)
+    assert value.get() is None and not value.initialized
+    assert value.get() == 'bot' and value.initialized
+    assert value.get() == 'bot'
+
+
+def test_failed_factory_is_retried():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError('Ollama is down')
+        return 'bot'
+
+    value = Lazy(factory)
+    try:
+        value.get()
+    except ConnectionError:
+        pass
+    assert value.get() == 'bot' and len(attempts) == 2
+
+
+def wait_for(warmup, timeout=5):
+    deadline = time.time() + timeout
+    while any(status['state'] in ('pending', 'running') for status in warmup.status().values()):
+        assert time.time() < deadline, warmup.status()
+        time.sleep(0.01)
+
+
+def test_failed_critical_task_is_not_ready():
+    def train():
+        raise RuntimeError('no training data')
+
+    warmup = Warmup()
+    warmup.add('topic_gate', train, critical=True)
+    warmup.add('chatbot', lambda: None)
+    warmup.start()
+    wait_for(warmup)
+    assert not warmup.ready()
+    assert warmup.status()['topic_gate']['state'] == 'failed'
+
+
+def test_skipped_warmup_is_ready():
+    warmup = Warmup()
+    warmup.add('topic_gate', lambda: None, critical=True)
+    assert not warmup.ready()
+    warmup.skip()
+    assert warmup.ready()
+    assert warmup.status()['topic_gate']['state'] == 'skipped'
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pytest
+
+# Project root is the parent of this directory
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from utils.topic_gate import DEV_EXAMPLES, HOLDOUT_EXAMPLES, TopicGate, load_labelled
+from utils.turkish_text import search_key
+
+# The gate refuses questions outright, so passing on-topic ones matters most
+MIN_RECALL = 0.95
+MIN_PRECISION = 0.9
+
+
+@pytest.fixture(scope='module')
+def gate():
+    return TopicGate().train()
+
+
+def test_splits_do_not_overlap():
+    # The threshold is tuned on dev and scored on holdout; neither may be trained on
+    training = {search_key(text) for text in TopicGate().load_examples()[0]}
+    dev = {search_key(text) for text in load_labelled(DEV_EXAMPLES)[0]}
+    holdout = {search_key(text) for text in load_labelled(HOLDOUT_EXAMPLES)[0]}
+    assert not training & dev
+    assert not training & holdout
+    assert not dev & holdout
+
+
+def test_holdout_precision_and_recall(gate):
+    texts, labels = load_labelled(HOLDOUT_EXAMPLES)
+    scores = gate.evaluate(texts, labels)
+    print(f"held-out: {scores}")
+    assert scores['recall'] >= MIN_RECALL, scores
+    assert scores['precision'] >= MIN_PRECISION, scores
+
+
+@pytest.mark.parametrize('message', [
+    "How do I fix a leaking faucet?",
+    "Explain photosynthesis to my students",
+    "Domatesleri ne sıklıkla sulamalıyım?",
+    "Mısır tarlasında hangi sulama yöntemi daha verimli?",
+    "How can I reduce my water bill amount?",
+    "What's the best fertilizer for wheat?",
+    "How do I get rid of aphids on my beans?",
+    "How can I protect my vineyard from frost?",
+])
+def test_on_topic_passes(gate, message):
+    allowed, probability = gate.check(message)
+    assert allowed, f"refused at p={probability:.2f}"
+
+
+@pytest.mark.parametrize('message', [
+    "What is the capital of France?",
+    "Write me a poem about love",
+    "Almanya'nın başkenti neresidir?",
+])
+def test_off_topic_refused(gate, message):
+    allowed, probability = gate.check(message)
+    assert not allowed, f"passed at p={probability:.2f}"
+
+
+def test_short_messages_pass(gate):
+    assert gate.check("Merhaba")[0]
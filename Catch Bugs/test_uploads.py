@@ -0,0 +1,60 @@
+import io
+import os
+import sys
+
+import pytest
+from flask import Flask, jsonify, request
+
+# Project root is the parent of this directory
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
+from utils.uploads import decode_text, init_uploads, sniff_kind, upload_bytes, upload_policy
+
+CSV = "tarih,tüketim (m³)\n2024-11,4\n"
+
+ENCODINGS = ['utf-8', 'utf-8-sig', 'utf-16', 'utf-16-le', 'utf-16-be', 'utf-32']
+
+
+def encode(text, encoding):
+    """Text as a file in the given encoding, with a byte order mark for UTF-16/32."""
+    if encoding in ('utf-16-le', 'utf-16-be'):
+        return ('\ufeff' + text).encode(encoding)
+    return text.encode(encoding)
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    init_uploads(app)
+
+    @app.route('/upload', methods=['POST'])
+    @upload_policy(extensions=['csv', 'txt'])
+    def upload():
+        return jsonify({'text': decode_text(upload_bytes(request.files['file']))})
+
+    return app.test_client()
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_text_with_byte_order_mark_is_text(encoding):
+    assert sniff_kind(encode(CSV, encoding)[:16]) == 'text'
+    assert decode_text(encode(CSV, encoding)) == CSV
+
+
+def test_nul_bytes_without_byte_order_mark_are_binary():
+    assert sniff_kind(CSV.encode('utf-16-le')[:16]) == 'binary'
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_upload_in_any_unicode_encoding(client, encoding):
+    response = client.post('/upload', data={'file': (io.BytesIO(encode(CSV, encoding)), 'tuketim.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    assert response.get_json()['text'] == CSV
+
+
+def test_binary_posing_as_csv_is_rejected(client):
+    response = client.post('/upload', data={'file': (io.BytesIO(b'\x7fELF\x02\x01\x01\x00' * 4), 'data.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 415
@@ -1,61 +1,51 @@
 import logging
-from logging.handlers import RotatingFileHandler
 import os
 import importlib
-from flask import Flask, render_template, request, jsonify, flash, redirect, url_for, session, current_app
+from flask import Flask, render_template, request, jsonify, flash, redirect, url_for, session, current_app, Response, stream_with_context
 import json
 from datetime import datetime, timedelta
 import uuid
+import time
+import shutil
+import tempfile
+import threading
 import sqlite3
 import bleach
 from werkzeug.security import generate_password_hash, check_password_hash
 import secrets
 from functools import wraps
-import PyPDF2
 import mimetypes
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
 import requests
 from utils.weather_service import WeatherService, WaterOutageService
 from utils.regional_service import RegionalService
-from utils.aws_bill_analyzer import AWSBillAnalyzer, allowed_file
-from utils.advanced_bill_analyzer import process_bill_with_advanced_analysis
-from utils.intelligent_bill_analyzer import analyze_bill
 from utils.water_tax_expert import create_water_expert
 from utils.water_bill_chat import create_water_bill_chat
+from utils.topic_gate import off_topic_refusal, get_topic_gate
+from utils.intent_router import create_intent_router
+from utils.conversation_store import create_conversation_store
+from utils.batch_qa import create_batch_qa_service, ROLES as BATCH_QA_ROLES
+from utils.job_queue import create_job_queue, JobFailed
+from utils.cpu_executor import run_cpu_task, CPUBusy, CPUTaskTimeout
+from utils import cpu_tasks
+from utils.startup import Lazy, Warmup
+from utils.logging_setup import configure_logging
+from utils.extraction_cache import cached_extraction
+from utils.json_response import FastJSONProvider, parse_fields, project
+from utils.http_cache import init_http_cache, cache_policy
+from utils.uploads import init_uploads, upload_policy, upload_bytes, save_upload, decode_text
 import traceback
 from weather_routes import weather_bp
-import boto3
-from botocore.exceptions import ClientError, NoCredentialsError, CredentialRetrievalError
-from ollama_data_analysis import OllamaDataAnalyzer
 
-# Configure logging
-log_dir = os.path.join(os.path.dirname(__file__), 'logs')
-os.makedirs(log_dir, exist_ok=True)
-log_file = os.path.join(log_dir, 'app.log')
-
-# Create a global logger
+# Configure logging before anything else logs
+configure_logging()
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-
-# Create file and console handlers
-file_handler = logging.FileHandler(log_file)
-console_handler = logging.StreamHandler()
-
-# Create formatter
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
-console_handler.setFormatter(formatter)
-
-# Add handlers to logger
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
 
 app = Flask(__name__, 
             template_folder='templates', 
             static_folder='static')
-app.logger.addHandler(file_handler)
-app.logger.addHandler(console_handler)
-app.logger.setLevel(logging.INFO)
+app.json = FastJSONProvider(app)
 app.secret_key = os.urandom(24)  
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(minutes=30)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  
@@ -70,14 +60,39 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'csv'}
+BILL_EXTENSIONS = {'pdf', 'jpg', 'jpeg', 'png', 'tif', 'tiff'}
+FARMER_EXTENSIONS = {'pdf', 'doc', 'docx', 'txt'}
+DOCUMENT_EXTENSIONS = {'txt', 'csv', 'pdf', 'doc', 'docx', 'jpg', 'jpeg', 'png', 'bmp', 'tif', 'tiff'}
+
+# Uploads are hashed and checked against each endpoint's @upload_policy as they stream in
+init_uploads(app)
+
+# ETags, conditional GETs and Cache-Control for views with a @cache_policy, compression for large bodies
+init_http_cache(app)
+
+def regional_surrogate_keys(args):
+    """Surrogate keys of a regional insights response, so one region can be purged."""
+    return ['regional', f"region:{args.get('region', 'ankara')}"]
 
 # Initialize weather, outage and regional services
 weather_service = WeatherService()
 outage_service = WaterOutageService()
 regional_service = RegionalService()
 
-# Configure AWS Bill Analyzer
-aws_bill_analyzer = AWSBillAnalyzer(app.config['UPLOAD_FOLDER'])  
+# Deterministic engines for bill, weather and tariff questions
+intent_router = create_intent_router(weather_service)
+
+# Per-session chat history shared by the chat endpoints of this worker
+conversation_store = create_conversation_store()
+
+# Durable queue for uploads and analyses too slow to run inside a request; the
+# database opens on first use and the workers start with the warm-up or the first job
+job_queue = create_job_queue()
+JOB_UPLOAD_FOLDER = os.path.join(UPLOAD_FOLDER, 'jobs')
+os.makedirs(JOB_UPLOAD_FOLDER, exist_ok=True)
+
+# Bills analyzed at once by a streaming /api/water-tax request
+WATER_TAX_STREAM_WORKERS = int(os.getenv('WATER_TAX_STREAM_WORKERS', '4'))
 
 def initialize_chatbot():
     """
@@ -157,9 +172,12 @@ def initialize_chatbot():
     app.logger.critical("Could not initialize any chatbot")
     return None
 
-# Initialize chatbot during app startup
-with app.app_context():
-    app.chatbot = initialize_chatbot()
+def chatbot_usable(bot):
+    """Whether a chatbot found a model; one built while Ollama was down is rebuilt on the next call."""
+    return bot is not None and getattr(bot, 'model_name', '') is not None
+
+# The main chatbot is built on first use (or by the warm-up thread), not at import
+chatbot = Lazy(initialize_chatbot, accept=chatbot_usable)
 
 # Database initialization
 def init_db():
@@ -229,60 +247,75 @@ def get_file_type(filename):
     ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
     return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
 
-def read_file_content(file_path):
+# Bump when extract_file_text output changes so cached extractions are redone
+TEXT_EXTRACTOR_VERSION = 4
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff'}
+
+def extract_file_text(file_path, ext, data=None):
+    """
+    Extract the text of a PDF, Word document or image, raising on failure
+    
+    Args:
+        file_path (str): Path to the file, unused when data is given
+        ext (str): Lowercase extension with the dot
+        data (bytes-like, optional): Contents of an upload held in memory
+    """
+    # Worker processes need a picklable copy of in-memory contents
+    source = file_path if data is None else bytes(data)
+
+    if ext == '.pdf':
+        return "".join(run_cpu_task('pdf', cpu_tasks.pdf_pages, source))
+
+    if ext in ['.doc', '.docx']:
+        import io
+        import docx
+        doc = docx.Document(file_path if data is None else io.BytesIO(data))
+        return "\n".join([para.text for para in doc.paragraphs if para.text])
+
+    return run_cpu_task('ocr', cpu_tasks.ocr_image, source)
+
+def read_file_content(file_path, data=None):
     """
     Read file content based on file type with robust error handling
     Supports multiple file types: txt, pdf, docx, images
     
+    PDF, Word and image extractions are cached by content hash, so a
+    re-uploaded document is not parsed or OCRed again.
+    
     Args:
-        file_path (str): Path to the uploaded file
+        file_path (str): Path to the uploaded file, or its filename when data is given
+        data (bytes-like, optional): Contents of an upload held in memory
     
     Returns:
         str: Extracted text content from the file
     """
-    try:
-        # Determine file extension
-        _, ext = os.path.splitext(file_path)
-        ext = ext.lower()
+    # Determine file extension
+    _, ext = os.path.splitext(file_path)
+    ext = ext.lower()
 
+    try:
         # Text files
         if ext in ['.txt', '.csv']:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-
-        # PDF files
-        elif ext == '.pdf':
-            import PyPDF2
-            with open(file_path, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() or ""
-                return text
-
-        # Word documents
-        elif ext in ['.doc', '.docx']:
-            import docx
-            doc = docx.Document(file_path)
-            return "\n".join([para.text for para in doc.paragraphs if para.text])
-
-        # Image files (OCR)
-        elif ext in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']:
-            import pytesseract
-            from PIL import Image
-            
-            # Ensure Tesseract is installed
-            try:
-                return pytesseract.image_to_string(Image.open(file_path))
-            except Exception as ocr_error:
-                logger.warning(f"OCR failed for image: {ocr_error}")
-                return "Could not extract text from image"
+            if data is None:
+                with open(file_path, 'rb') as f:
+                    data = f.read()
+            return decode_text(data)
 
-        else:
+        if ext not in IMAGE_EXTENSIONS and ext not in ['.pdf', '.doc', '.docx']:
             logger.warning(f"Unsupported file type: {ext}")
             return f"Unsupported file type: {ext}"
 
+        return cached_extraction(
+            file_path if data is None else data, 'text', TEXT_EXTRACTOR_VERSION,
+            lambda: extract_file_text(file_path, ext, data)
+        )
+
+    except CPUBusy:
+        raise
     except Exception as e:
+        if ext in IMAGE_EXTENSIONS:
+            logger.warning(f"OCR failed for image: {e}")
+            return "Could not extract text from image"
         logger.error(f"Error reading file {file_path}: {e}")
         return f"Error reading file: {str(e)}"
 
@@ -357,6 +390,70 @@ def index():
         logger.error(f"Error rendering index.html: {str(e)}")
         return str(e), 500
 
+@app.route('/healthz')
+def healthz():
+    """Liveness probe: the worker is up and serving requests."""
+    return jsonify({'status': 'ok'})
+
+@app.errorhandler(CPUBusy)
+def cpu_busy(e):
+    """OCR, PDF or plotting capacity is exhausted; ask the client to retry."""
+    response = jsonify({'error': str(e), 'status': 'busy'})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 429
+
+@app.errorhandler(CPUTaskTimeout)
+def cpu_task_timeout(e):
+    return jsonify({'error': str(e), 'status': 'timeout'}), 504
+
+@app.errorhandler(RequestEntityTooLarge)
+@app.errorhandler(UnsupportedMediaType)
+def upload_rejected(e):
+    """An upload broke its endpoint's size or type limits while streaming in."""
+    return jsonify({'success': False, 'error': e.description, 'results': []}), e.code
+
+def check_database():
+    conn = sqlite3.connect('feedback.db', timeout=1)
+    try:
+        conn.execute('SELECT 1 FROM admin LIMIT 1')
+    finally:
+        conn.close()
+
+def check_ollama():
+    ollama_api_url = os.getenv('OLLAMA_API_URL', 'http://localhost:11434')
+    requests.get(f'{ollama_api_url}/api/tags', timeout=2).raise_for_status()
+
+@app.route('/readyz')
+def readyz():
+    """
+    Readiness probe with per-dependency status
+    
+    The worker is ready once the database answers and the critical
+    warm-up tasks have finished. Ollama only gates readiness when
+    READINESS_REQUIRE_OLLAMA is set, so non-chat pages keep serving
+    while the model server is down.
+    """
+    checks = {}
+    for name, check in (('database', check_database), ('ollama', check_ollama)):
+        started = time.perf_counter()
+        try:
+            check()
+            checks[name] = {'ok': True}
+        except Exception as e:
+            checks[name] = {'ok': False, 'error': str(e)}
+        checks[name]['seconds'] = round(time.perf_counter() - started, 3)
+    
+    required = ['database']
+    if os.getenv('READINESS_REQUIRE_OLLAMA', 'False').lower() == 'true':
+        required.append('ollama')
+    
+    ready = warmup.ready() and all(checks[name]['ok'] for name in required)
+    return jsonify({
+        'ready': ready,
+        'checks': checks,
+        'warmup': warmup.status()
+    }), 200 if ready else 503
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     # If already logged in, redirect to admin
@@ -585,79 +682,109 @@ def export_to_training():
         logger.error(f"Error in export_to_training endpoint: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def upload_job(payload, progress):
+    """Background job for /upload: extract the document text and ask the chatbot about it."""
+    upload = payload['files'][0]
+    progress(0.1, 'Reading document')
+    content = read_file_content(upload['path'])
+    if not content:
+        raise JobFailed('No content extracted')
+    
+    progress(0.4, 'Analyzing document')
+    prompt = f"I will provide you with a document content. Please analyze it and identify any water conservation related information, tips, or relevant content. If there are water conservation practices mentioned, summarize them. If there's no water-related content, suggest how the topic could be connected to water conservation. Here's the content:\n\n{content}"
+    
+    bot = chatbot.get()
+    if bot is None:
+        raise RuntimeError('Chatbot is not available')
+    response, error = bot.generate_response(prompt, history=[])
+    if error:
+        # Keep the old behaviour of showing the bot's error text as the answer
+        logger.error(f"Chatbot response error: {error}")
+        response = error
+    return {'response': response}
+
+job_queue.register('upload', upload_job)
+
 @app.route('/upload', methods=['POST'])
+@upload_policy(extensions=ALLOWED_EXTENSIONS)
 def upload_file():
+    """Queue a document for analysis and return the job ID to poll."""
     try:
-        # Log all incoming files
-        logger.info(f"Received files: {request.files}")
-        
         if 'file' not in request.files:
             logger.warning('No file part in the request')
             return jsonify({'response': 'No file uploaded'}), 400
         
         file = request.files['file']
         
-        # Log file details
-        logger.info(f"File name: {file.filename}")
-        logger.info(f"File content type: {file.content_type}")
-        
         if file.filename == '':
             logger.warning('No selected file')
             return jsonify({'response': 'No file selected'}), 400
         
         # Detaylı dosya türü kontrolü
         file_ext = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
-        logger.info(f"File extension: {file_ext}")
         
-        if file and file_ext in ALLOWED_EXTENSIONS:
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            
-            # Ensure upload directory exists
-            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-            
-            # Save file
-            file.save(filepath)
-            logger.info(f"File saved to: {filepath}")
-            
-            # Read file content with detailed logging
-            try:
-                content = read_file_content(filepath)
-                logger.info(f"File content length: {len(content)} characters")
-                
-                if not content:
-                    logger.warning(f"No content extracted from {filename}")
-                    return jsonify({'response': 'No content extracted'}), 400
-            except Exception as read_error:
-                logger.error(f"File reading error: {read_error}")
-                return jsonify({'response': 'No content extracted'}), 500
-            
-            # Clean up the uploaded file
-            os.remove(filepath)
-            logger.info(f"Temporary file {filepath} removed")
-            
-            # Generate response about the document content
-            prompt = f"I will provide you with a document content. Please analyze it and identify any water conservation related information, tips, or relevant content. If there are water conservation practices mentioned, summarize them. If there's no water-related content, suggest how the topic could be connected to water conservation. Here's the content:\n\n{content}"
-            
-            try:
-                response, error = app.chatbot.generate_response(prompt)
-                if error:
-                    logger.error(f"Chatbot response error: {error}")
-                    response = error
-                logger.info(f"Generated response length: {len(response) if response else 0}")
-            except Exception as chat_error:
-                logger.error(f"Chatbot error: {str(chat_error)}")
-                response = "Sorry, I encountered an error analyzing the document."
-            
-            return jsonify({'response': response})
+        if file_ext not in ALLOWED_EXTENSIONS:
+            logger.warning(f'Invalid file type: {file_ext}')
+            return jsonify({'response': 'Invalid file type. Please upload a .txt, .pdf, .csv file.'}), 400
         
-        logger.warning(f'Invalid file type: {file_ext}')
-        return jsonify({'response': 'Invalid file type. Please upload a .txt, .pdf, .csv file.'}), 400
+        upload = save_job_upload(file)
+        return job_accepted(job_queue.enqueue('upload', {'files': [upload]}))
     
     except Exception as e:
         logger.error(f"Error processing file: {str(e)}")
         return jsonify({'response': 'Sorry, I encountered an error analyzing the document. Please try again.'})
 
+def local_answer(message, role=None, bill_text=None):
+    """
+    Answer a chat message without the LLM when possible
+    
+    Bill, weather and tariff questions go to the deterministic engines;
+    clearly off-topic messages get the role's canned refusal.
+    
+    Args:
+        message (str): User message
+        role (str, optional): Chat role for the topic gate, None to skip the gate
+        bill_text (str, optional): Extracted text of an uploaded bill
+    
+    Returns:
+        Dict with 'response' and 'source', or None if the LLM should answer
+    """
+    routed = intent_router.route(message, bill_text=bill_text)
+    if routed:
+        return {'response': routed['response'], 'source': f"intent:{routed['intent']}"}
+    
+    if role:
+        refusal = off_topic_refusal(message, role)
+        if refusal:
+            return {'response': refusal, 'source': 'topic-gate'}
+    
+    return None
+
+def chat_session_id():
+    """Return the chat session ID for the current browser session, creating one if needed."""
+    if 'chat_session_id' not in session:
+        session['chat_session_id'] = uuid.uuid4().hex
+    return session['chat_session_id']
+
+def generate_with_history(bot, message, session_id, role='general'):
+    """
+    Generate a bot response using only the given session's history
+    
+    Args:
+        bot: Chat bot with generate_response(message, history=...)
+        message (str): User message
+        session_id (str): Chat session ID from chat_session_id()
+        role (str): Chat role, recorded with the stored turn
+    
+    Returns:
+        Tuple of (response, error) from the bot
+    """
+    history = conversation_store.get_history(session_id)
+    response, error = bot.generate_response(message, history=history)
+    if response and not error:
+        conversation_store.append(session_id, message, response, role)
+    return response, error
+
 def chat_api(role):
     """
     Enhanced chat endpoint with specialized role-based responses
@@ -697,18 +824,9 @@ def chat_api(role):
             if 'file' in request.files:
                 uploaded_file = request.files['file']
                 if uploaded_file and allowed_file(uploaded_file.filename):
-                    # Save file temporarily
-                    filename = secure_filename(uploaded_file.filename)
-                    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                    
-                    # Save file
-                    uploaded_file.save(file_path)
-
-                    # Read file content
-                    file_content = read_file_content(file_path)
-                    
-                    # Optional: Remove the temporary file
-                    os.remove(file_path)
+                    # Read straight from the upload buffer; nothing is written to disk
+                    file_content = read_file_content(secure_filename(uploaded_file.filename),
+                                                     data=upload_bytes(uploaded_file))
         
         if not message:
             return jsonify({"error": "No message provided"}), 400
@@ -725,6 +843,8 @@ def chat_api(role):
         
         return jsonify({"response": response})
     
+    except CPUBusy:
+        raise
     except Exception as e:
         logger.error(f"Error processing message: {str(e)}")
         logger.error(f"Traceback: {traceback.format_exc()}")
@@ -748,24 +868,28 @@ def farmer_chat_api():
     - Farmer-specific context
     """
     # Log the request details
-    logger.info(f"Received request headers: {request.headers}")
-    logger.info(f"Request content type: {request.content_type}")
+    logger.debug(f"Request content type: {request.content_type}")
     
     # Check if it's a multipart form data (file upload)
     if 'file' in request.files:
         file = request.files['file']
-        logger.info(f"File uploaded: {file.filename}")
+        logger.debug(f"File uploaded: {file.filename}")
         # You can add file processing logic here if needed
     
     # Extract message
     message = request.form.get('message', '').strip()
-    logger.info(f"Received message: {message}")
+    logger.debug(f"Received message: {message}")
     
     # Validate message
     if not message:
         logger.warning("Empty message received")
         return jsonify({"error": "Message cannot be empty"}), 400
     
+    # Answer routed and clearly off-topic messages locally instead of generating
+    local = local_answer(message, 'farmer')
+    if local:
+        return jsonify({"message": local['response'], "source": local['source']})
+    
     # Ensure farmer-specific chatbot is initialized
     if not hasattr(app, 'farmer_chatbot'):
         from model_inference_farmers import WaterConservationBot
@@ -779,13 +903,9 @@ def farmer_chat_api():
             return jsonify({"error": "Chatbot method not found"}), 500
 
         # Detailed logging before method call
-        logger.info(f"Calling generate_response with context: {message[:200]}...")
+        logger.debug(f"Calling generate_response with context: {message[:200]}...")
         
-        response, error = app.farmer_chatbot.generate_response(message)
-        
-        # Log generation results
-        logger.info(f"Response generated: {response is not None}")
-        logger.info(f"Error: {error}")
+        response, error = generate_with_history(app.farmer_chatbot, message, chat_session_id(), 'farmer')
 
         # Handle response
         if error:
@@ -820,6 +940,14 @@ def educator_chat_api():
         # Determine the appropriate bot based on the context
         context = request.json.get('context', 'education')
         
+        # Answer routed and clearly off-topic messages before constructing a bot
+        local = local_answer(
+            request.json.get('message', '').strip(),
+            'farmer' if context == 'farmers' else 'education'
+        )
+        if local:
+            return jsonify({"response": local['response']})
+        
         if context == 'farmers':
             water_expert = FarmersBot(model_name='water-expert-farmers')
         else:
@@ -862,6 +990,143 @@ def educator_chat_api():
             "details": str(e)
         }), 500
 
+# One bot per role for batch questions; built on first use since construction checks the model
+_batch_bots = {}
+_batch_bots_lock = threading.Lock()
+
+def batch_bot(role):
+    """Return the shared bot answering batch questions for a role."""
+    with _batch_bots_lock:
+        if role not in _batch_bots:
+            if role == 'farmer':
+                from model_inference_farmers import WaterConservationBot as FarmersBot
+                _batch_bots[role] = FarmersBot(model_name='water-expert-farmers')
+            else:
+                from model_inference_education import WaterConservationBot as EducationBot
+                _batch_bots[role] = EducationBot(model_name='water-expert-education')
+        return _batch_bots[role]
+
+def batch_answer(question, role):
+    """
+    Answer one batch question without any conversation history
+    
+    Returns:
+        Tuple of (answer, error, source)
+    """
+    local = local_answer(question, role)
+    if local:
+        return local['response'], None, local['source']
+    
+    bot = batch_bot(role)
+    response, error = bot.generate_response(question, history=[])
+    return response, error, getattr(bot, 'model_name', role)
+
+# Batches run on the shared job queue, so any worker can report or stream them
+batch_qa_service = create_batch_qa_service(batch_answer, job_queue)
+
+def stream_batch_job(job_id):
+    """Stream a batch job as NDJSON: a header line, one line per answer, then a summary."""
+    yield json.dumps(batch_qa_service.get_job(job_id, include_results=False), ensure_ascii=False) + '\n'
+    for result in batch_qa_service.iter_results(job_id):
+        yield json.dumps(result, ensure_ascii=False) + '\n'
+    yield json.dumps(batch_qa_service.get_job(job_id, include_results=False), ensure_ascii=False) + '\n'
+
+@app.route('/api/batch-qa', methods=['POST'])
+def batch_qa_submit():
+    """
+    Submit a batch of questions for one role
+    
+    Expects JSON {"questions": [...], "role": "education"|"farmer", "stream": bool}.
+    Streams NDJSON results when stream is true, otherwise returns a job ID to poll.
+    """
+    data = request.get_json(silent=True) or {}
+    questions = data.get('questions')
+    role = data.get('role', 'education')
+    max_questions = int(os.getenv('BATCH_QA_MAX_QUESTIONS', '200'))
+    
+    if not isinstance(questions, list) or not questions:
+        return jsonify({'error': 'questions must be a non-empty list'}), 400
+    questions = [q for q in questions if isinstance(q, str) and q.strip()]
+    if not questions:
+        return jsonify({'error': 'No valid questions provided'}), 400
+    if len(questions) > max_questions:
+        return jsonify({'error': f'At most {max_questions} questions per batch'}), 400
+    if role not in BATCH_QA_ROLES:
+        return jsonify({'error': f"role must be one of {', '.join(BATCH_QA_ROLES)}"}), 400
+    
+    job_id = batch_qa_service.submit(questions, role)
+    
+    if data.get('stream'):
+        return Response(stream_with_context(stream_batch_job(job_id)), mimetype='application/x-ndjson')
+    
+    response = batch_qa_service.get_job(job_id, include_results=False)
+    response['status_url'] = url_for('batch_qa_status', job_id=job_id)
+    return jsonify(response), 202
+
+@app.route('/api/batch-qa/<job_id>', methods=['GET'])
+def batch_qa_status(job_id):
+    """Poll a batch job, or stream its remaining results with ?stream=1."""
+    job = batch_qa_service.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    if request.args.get('stream'):
+        return Response(stream_with_context(stream_batch_job(job_id)), mimetype='application/x-ndjson')
+    
+    return jsonify(job)
+
+def save_job_upload(file):
+    """
+    Save an uploaded file where queued jobs can read it, even after a worker restart
+    
+    The file is named by its SHA-256, so concurrent uploads with the same
+    filename cannot overwrite each other and repeated uploads share one file.
+    
+    Returns:
+        Dict with the saved path, the original (secured) filename, sha256 and size
+    """
+    upload = save_upload(file, JOB_UPLOAD_FOLDER)
+    return {
+        'path': upload['path'],
+        'filename': secure_filename(file.filename),
+        'sha256': upload['sha256'],
+        'size': upload['size']
+    }
+
+def job_accepted(job_id):
+    """202 response pointing the client at the status and result endpoints of a job."""
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': url_for('job_status', job_id=job_id),
+        'result_url': url_for('job_result', job_id=job_id)
+    }), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status and progress of a background job, with its result once completed."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """
+    Result of a background job in the shape the endpoint used to return inline
+    
+    202 while the job is queued or running, 500 once it has failed.
+    """
+    job = job_queue.get(job_id, raw_result=True)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] == 'completed':
+        # Stored as JSON already; send it as-is instead of decoding and re-encoding it
+        return app.response_class(job['result'], mimetype='application/json')
+    if job['status'] == 'failed':
+        return jsonify({'error': job['error'], 'status': 'failed', 'job_id': job_id}), 500
+    return jsonify({key: job[key] for key in ('job_id', 'status', 'progress', 'message')}), 202
+
 @app.route('/chat_page')
 def chat_page():
     try:
@@ -885,6 +1150,10 @@ def clear_chat():
         # Clear bot instance from session
         if 'bot' in session:
             session.pop('bot')
+        
+        # Drop this session's server-side chat history
+        if 'chat_session_id' in session:
+            conversation_store.clear(session.pop('chat_session_id'))
             
         session.modified = True
         return jsonify({'status': 'success'})
@@ -897,6 +1166,8 @@ def qr_scanner():
     return render_template('qr_scanner.html')
 
 @app.route('/api/weather', methods=['GET'])
+@cache_policy(max_age=300, stale_while_revalidate=600, stale_if_error=3600,
+              surrogate_keys=['weather'])
 def get_weather():
     """
     Retrieve weather information for the user's location.
@@ -907,7 +1178,7 @@ def get_weather():
     """
     try:
         # Log the start of weather retrieval
-        app.logger.info("Starting weather retrieval process")
+        app.logger.debug("Starting weather retrieval process")
         
         # Attempt to get user's IP-based location
         try:
@@ -916,7 +1187,7 @@ def get_weather():
             location_data = location_response.json()
             
             # Log the location data
-            app.logger.info(f"IP Location Data: {location_data}")
+            app.logger.debug(f"IP Location Data: {location_data}")
             
             # Extract latitude and longitude
             latitude = location_data.get('latitude')
@@ -933,19 +1204,19 @@ def get_weather():
             location_name = 'Global Default'
         
         # Log the coordinates being used
-        app.logger.info(f"Using coordinates - Latitude: {latitude}, Longitude: {longitude}")
+        app.logger.debug(f"Using coordinates - Latitude: {latitude}, Longitude: {longitude}")
         
         # Construct Open-Meteo API URL
         weather_url = f"https://api.open-meteo.com/v1/forecast?latitude={latitude}&longitude={longitude}&current_weather=true&hourly=temperature_2m,precipitation_probability&daily=temperature_2m_max,temperature_2m_min&timezone=auto"
         
         # Log the constructed URL
-        app.logger.info(f"Weather API URL: {weather_url}")
+        app.logger.debug(f"Weather API URL: {weather_url}")
         
         # Fetch weather data
         weather_response = requests.get(weather_url, timeout=10)
         
         # Log the weather response
-        app.logger.info(f"Weather API Response Status: {weather_response.status_code}")
+        app.logger.debug(f"Weather API Response Status: {weather_response.status_code}")
         
         # Check for successful response
         if weather_response.status_code != 200:
@@ -959,7 +1230,7 @@ def get_weather():
         weather_data = weather_response.json()
         
         # Log the received weather data
-        app.logger.info(f"Received Weather Data: {weather_data}")
+        app.logger.debug(f"Received Weather Data: {weather_data}")
         
         # Extract current weather details
         current_weather = weather_data.get('current_weather', {})
@@ -987,6 +1258,8 @@ def get_weather():
         }
 
 @app.route('/api/water-outages')
+@cache_policy(max_age=300, stale_while_revalidate=600, stale_if_error=3600,
+              surrogate_keys=['outages'])
 def get_water_outages():
     """
     Retrieve water outage information for the user's location.
@@ -1040,6 +1313,8 @@ def get_water_outages():
         }), 500
 
 @app.route('/api/regional-insights')
+@cache_policy(max_age=600, stale_while_revalidate=1800, stale_if_error=3600,
+              surrogate_keys=regional_surrogate_keys)
 def get_regional_insights():
     """Get regional insights including weather and dam status"""
     try:
@@ -1057,11 +1332,13 @@ def get_regional_insights():
         }), 500
 
 @app.route('/educators')
+@cache_policy(max_age=3600, stale_while_revalidate=86400, surrogate_keys=['pages', 'page:educators'])
 def educators():
     """Render the educators page"""
     return render_template('educators.html')
 
 @app.route('/farmers')
+@cache_policy(max_age=3600, stale_while_revalidate=86400, surrogate_keys=['pages', 'page:farmers'])
 def farmers():
     """Render the farmers page"""
     return render_template('farmers.html')
@@ -1082,6 +1359,10 @@ def farmer_chat():
             if not message:
                 return jsonify({'error': 'No message provided'}), 400
             
+            local = local_answer(message, 'farmer')
+            if local:
+                return jsonify({'response': local['response']})
+            
             # Use model inference for farmers
             from model_inference_farmers import generate_farmer_response
             
@@ -1120,11 +1401,146 @@ def water_tax_page():
         logger.error(f"Error rendering water_tax.html: {str(e)}")
         return str(e), 500
 
+# Fields of a bill result always returned, even under a fields= projection
+BILL_RESULT_REQUIRED_FIELDS = ['success', 'error', 'filename']
+
+def shape_bill_result(result, fields=None, debug=False):
+    """
+    Trim an analyze_bill() result to what the client asked for
+    
+    By default the Textract blocks (geometry of every line and word) are
+    dropped; debug keeps them. fields keeps only the given dotted paths.
+    
+    Args:
+        result (dict): analyze_bill() result
+        fields (list, optional): Dotted paths to keep, e.g. ['textract_result.full_text']
+        debug (bool): Keep debug data such as Textract blocks
+    """
+    if not debug and isinstance(result.get('textract_result'), dict):
+        result = dict(result)
+        result['textract_result'] = {key: value for key, value in result['textract_result'].items()
+                                     if key != 'blocks'}
+    if fields:
+        result = project(result, BILL_RESULT_REQUIRED_FIELDS + fields)
+    return result
+
+def water_tax_job(payload, progress):
+    """Background job for /api/water-tax: analyze each uploaded bill in turn."""
+    from utils.intelligent_bill_analyzer import analyze_bill
+    
+    uploads = payload['files']
+    fields = payload.get('fields')
+    debug = payload.get('debug', False)
+    results = []
+    for index, upload in enumerate(uploads):
+        filename = upload['filename']
+        progress(index / len(uploads), f"Analyzing {filename}")
+        try:
+            bill_analysis = analyze_bill(upload['path'])
+            bill_analysis['filename'] = filename
+            results.append(shape_bill_result(bill_analysis, fields, debug))
+        except CPUBusy:
+            # Retry the whole job later rather than report this bill as unreadable
+            raise
+        except Exception as analysis_error:
+            logger.error(f"Bill analysis error for {filename}: {str(analysis_error)}")
+            results.append({
+                'success': False,
+                'error': str(analysis_error),
+                'filename': filename
+            })
+    
+    return {
+        'success': len(results) > 0,
+        'results': results
+    }
+
+job_queue.register('water_tax', water_tax_job)
+
+def bill_history_entry(result):
+    """
+    Consumption and amount of an analyzed bill for analyze_water_bill_trends
+    
+    Returns:
+        Dict with water_consumption and total_amount, or None if either was not parsed
+    """
+    details = result.get('parsed_details') or {}
+    try:
+        return {
+            'water_consumption': float(details['water_consumption']),
+            'total_amount': float(details['total_amount']),
+            'billing_period': details.get('billing_period')
+        }
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def stream_water_tax(uploads, folder, fields=None, debug=False):
+    """
+    Analyze bills concurrently and stream NDJSON as each one finishes
+    
+    Emits a start line, one result line per bill in completion order
+    (with its upload index), then a summary line with the consumption
+    trends of all bills whose amounts could be parsed.
+    
+    Args:
+        uploads (list): Dicts with path and filename of the saved bills
+        folder (str): Directory the uploads were saved in
+        fields (list, optional): Projection applied to each result
+        debug (bool): Keep Textract blocks in the results
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from utils.intelligent_bill_analyzer import IntelligentBillAnalyzer, analyze_bill
+    
+    def line(data):
+        return app.json.dumps(data) + '\n'
+    
+    executor = ThreadPoolExecutor(max_workers=min(len(uploads), WATER_TAX_STREAM_WORKERS))
+    try:
+        yield line({'type': 'start', 'count': len(uploads)})
+        
+        futures = {executor.submit(analyze_bill, upload['path']): index
+                   for index, upload in enumerate(uploads)}
+        history = [None] * len(uploads)
+        succeeded = 0
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result = future.result()
+            except Exception as analysis_error:
+                logger.error(f"Bill analysis error for {uploads[index]['filename']}: {analysis_error}")
+                result = {'success': False, 'error': str(analysis_error)}
+            result['filename'] = uploads[index]['filename']
+            if result.get('success'):
+                succeeded += 1
+                history[index] = bill_history_entry(result)
+            yield line({'type': 'result', 'index': index, 'result': shape_bill_result(result, fields, debug)})
+        
+        bills = [entry for entry in history if entry]
+        yield line({
+            'type': 'summary',
+            'success': succeeded > 0,
+            'analyzed': succeeded,
+            'count': len(uploads),
+            'trends': IntelligentBillAnalyzer(folder).analyze_water_bill_trends(bills)
+        })
+    finally:
+        # Also reached when the client disconnects: drop bills not started yet
+        executor.shutdown(wait=True, cancel_futures=True)
+
 @app.route('/api/water-tax', methods=['POST'])
+@upload_policy(extensions=BILL_EXTENSIONS)
 def water_tax_api():
     """
     API endpoint for water tax bill analysis
-    Supports file upload and intelligent bill processing
+    Queues the uploaded bills and returns a job ID; the job result has the
+    same {"success", "results"} shape this endpoint used to return inline
+    
+    Query parameters:
+        fields: Comma-separated dotted paths to keep in each result,
+            e.g. fields=parsed_details,textract_result.full_text
+        debug: 1 to include Textract blocks with their geometry
+        stream: 1 to analyze the bills in this request and stream NDJSON
+            lines as each finishes instead of queueing a job
     """
     try:
         # Check if files are present in the request
@@ -1136,43 +1552,34 @@ def water_tax_api():
                 'results': []
             }), 400
 
-        # Get uploaded files
-        uploaded_files = request.files.getlist('water_bill')
-        
-        # Ensure uploads directory exists (redundant, but good practice)
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
-        # Process each uploaded file
-        results = []
-        for uploaded_file in uploaded_files:
-            if uploaded_file.filename == '':
-                continue  # Skip empty filenames
+        bills = [uploaded_file for uploaded_file in request.files.getlist('water_bill')
+                 if uploaded_file.filename != '']
+        if not bills:
+            return jsonify({
+                'success': False,
+                'error': 'No bill uploaded',
+                'results': []
+            }), 400
 
-            # Secure filename and save
-            filename = secure_filename(uploaded_file.filename)
-            file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            
-            # Save file
-            uploaded_file.save(file_path)
-
-            try:
-                # Analyze the bill
-                logger.info(f"Analyzing bill: {filename}")
-                bill_analysis = analyze_bill(file_path, log_level=logging.INFO)
-                results.append(bill_analysis)
-            except Exception as analysis_error:
-                logger.error(f"Bill analysis error for {filename}: {str(analysis_error)}")
-                results.append({
-                    'success': False,
-                    'error': str(analysis_error),
-                    'filename': filename
-                })
-
-        # Return results
-        return jsonify({
-            'success': len(results) > 0,
-            'results': results
-        }), 200
+        fields = parse_fields(request.values.get('fields'))
+        debug = request.values.get('debug', '').lower() in ('1', 'true', 'yes')
+
+        if request.values.get('stream', '').lower() in ('1', 'true', 'yes'):
+            folder = tempfile.mkdtemp(prefix='water_tax_', dir=UPLOAD_FOLDER)
+            uploads = [dict(save_upload(bill, folder), filename=secure_filename(bill.filename))
+                       for bill in bills]
+            response = Response(stream_with_context(stream_water_tax(uploads, folder, fields, debug)),
+                                mimetype='application/x-ndjson')
+            response.call_on_close(lambda: shutil.rmtree(folder, ignore_errors=True))
+            return response
+
+        # Save every upload where the job worker can read it
+        uploads = [save_job_upload(bill) for bill in bills]
+        return job_accepted(job_queue.enqueue('water_tax', {
+            'files': uploads,
+            'fields': fields,
+            'debug': debug
+        }))
 
     except Exception as e:
         # Comprehensive error handling
@@ -1214,8 +1621,12 @@ def bill_chat_api():
         # Create water bill chat instance
         bill_chat = create_water_bill_chat()
         
-        # Analyze bill text
-        analysis = bill_chat.analyze_water_bill(message, instruction)
+        # Analyze bill text; household size and language only affect the tips section
+        analysis = bill_chat.analyze_water_bill(
+            message, instruction,
+            household_size=data.get('household_size'),
+            language=data.get('language', 'en')
+        )
         
         # Return response
         return jsonify({
@@ -1292,9 +1703,14 @@ def main_chat():
         if not user_message:
             return jsonify({"error": "No message provided"}), 400
         
-        # Initialize chatbot
+        # Bill, weather and tariff questions are answered by local engines
+        local = local_answer(user_message)
+        if local:
+            return jsonify({"response": local['response']}), 200
+        
+        # Shared chatbot, built once per worker instead of per request
         try:
-            bot = initialize_chatbot()
+            bot = chatbot.get()
         except Exception as init_error:
             logger.error(f"Chatbot initialization error: {init_error}")
             return jsonify({
@@ -1310,13 +1726,9 @@ def main_chat():
                 return jsonify({"error": "Chatbot method not found"}), 500
 
             # Detailed logging before method call
-            logger.info(f"Calling generate_response with context: {user_message[:200]}...")
-            
-            response, error = bot.generate_response(user_message)
+            logger.debug(f"Calling generate_response with context: {user_message[:200]}...")
             
-            # Log generation results
-            logger.info(f"Response generated: {response is not None}")
-            logger.info(f"Error: {error}")
+            response, error = generate_with_history(bot, user_message, chat_session_id())
 
             # Handle response
             if error:
@@ -1418,6 +1830,7 @@ def switch_model_api():
         }), 500
 
 @app.route('/graph-techniques')
+@cache_policy(max_age=3600, stale_while_revalidate=86400, surrogate_keys=['pages', 'page:graph-techniques'])
 def graph_techniques():
     """
     Render the graph techniques page
@@ -1440,27 +1853,37 @@ def generate_graph_api():
     result = generate_graph_from_prompt(prompt)
     return jsonify(result)
 
+def analyze_data_job(payload, progress):
+    """Background job for /analyze-data: LLM analysis plus chart rendering."""
+    from ollama_data_analysis import OllamaDataAnalyzer
+    analyzer = OllamaDataAnalyzer()
+    
+    progress(0.1, 'Analyzing data')
+    results = analyzer.process_and_analyze(
+        payload.get('data', {}),
+        payload.get('analysis_prompt'),
+        payload.get('chart_type', 'bar')
+    )
+    
+    return {
+        'status': 'success',
+        'textual_analysis': results['textual_analysis'],
+        'visualization_path': results['visualization_path']
+    }
+
+job_queue.register('analyze_data', analyze_data_job)
+
 @app.route('/analyze-data', methods=['POST'])
 def analyze_data():
     try:
         # Get data from request
         data = request.get_json()
         
-        # Initialize Ollama Data Analyzer
-        analyzer = OllamaDataAnalyzer()
-        
-        # Process and analyze data
-        results = analyzer.process_and_analyze(
-            data.get('data', {}),
-            data.get('analysis_prompt'),
-            data.get('chart_type', 'bar')
-        )
-        
-        return jsonify({
-            'status': 'success',
-            'textual_analysis': results['textual_analysis'],
-            'visualization_path': results['visualization_path']
-        })
+        return job_accepted(job_queue.enqueue('analyze_data', {
+            'data': data.get('data', {}),
+            'analysis_prompt': data.get('analysis_prompt'),
+            'chart_type': data.get('chart_type', 'bar')
+        }))
     
     except Exception as e:
         return jsonify({
@@ -1477,6 +1900,7 @@ def generate_graph_from_prompt(prompt):
     """
     try:
         # Initialize Ollama Data Analyzer
+        from ollama_data_analysis import OllamaDataAnalyzer
         analyzer = OllamaDataAnalyzer()
         
         # Generate graph details
@@ -1484,6 +1908,8 @@ def generate_graph_from_prompt(prompt):
         
         return result
     
+    except CPUBusy:
+        raise
     except Exception as e:
         return {
             "status": "error",
@@ -1503,8 +1929,7 @@ def new_chat_endpoint():
     
     # Enhanced request logging
     request_start_time = time.time()
-    app.logger.info(f"Chat request received from {request.remote_addr}")
-    app.logger.info(f"Request headers: {dict(request.headers)}")
+    app.logger.debug(f"Chat request received from {request.remote_addr}")
     
     # Validate request content type
     if not request.is_json:
@@ -1537,8 +1962,19 @@ def new_chat_endpoint():
             "status": "error"
         }), 400
 
+    # Bill, weather and tariff questions are answered by local engines
+    local = local_answer(message, bill_text=file_content)
+    if local:
+        return jsonify({
+            "message": local['response'],
+            "source": local['source'],
+            "status": "success",
+            "processing_time": time.time() - request_start_time
+        })
+
     # Ensure chatbot is initialized with timeout protection
-    if not hasattr(app, 'chatbot'):
+    bot = chatbot.get()
+    if bot is None:
         app.logger.error("Chatbot not initialized")
         return jsonify({
             "error": "Chatbot service unavailable", 
@@ -1553,7 +1989,7 @@ def new_chat_endpoint():
     # Response generation with comprehensive timeout and error handling
     try:
         # Verify generate_response method exists
-        if not hasattr(app.chatbot, 'generate_response'):
+        if not hasattr(bot, 'generate_response'):
             app.logger.error("Invalid chatbot configuration")
             return jsonify({
                 "error": "Chatbot configuration error",
@@ -1562,7 +1998,7 @@ def new_chat_endpoint():
 
         # Threaded response generation with timeout
         with ThreadPoolExecutor() as executor:
-            future = executor.submit(app.chatbot.generate_response, full_context)
+            future = executor.submit(generate_with_history, bot, full_context, chat_session_id())
             
             try:
                 response, error = future.result(timeout=45)  # Extended timeout
@@ -1595,11 +2031,11 @@ def new_chat_endpoint():
 
         # Performance tracking
         request_duration = time.time() - request_start_time
-        app.logger.info(f"Request processed in {request_duration:.2f} seconds")
+        app.logger.debug(f"Request processed in {request_duration:.2f} seconds")
 
         return jsonify({
             "message": response,
-            "source": getattr(app.chatbot, 'model_name', 'unknown'),
+            "source": getattr(bot, 'model_name', 'unknown'),
             "status": "success",
             "processing_time": request_duration
         })
@@ -1642,6 +2078,11 @@ def chat_endpoint():
         # Combine message with file context
         full_message = f"{file_context}\n{message}".strip()
         
+        if not uploaded_files:
+            local = local_answer(message, context)
+            if local:
+                return jsonify({"response": local['response'], "files": []})
+        
         # Create Water Expert instance
         water_expert = create_water_expert(context)
         
@@ -1689,7 +2130,135 @@ def create_water_expert(context='general'):
 def weather_details():
     return render_template('weather_details.html')
 
+def weather_details_url(lat, lon):
+    """Open-Meteo forecast URL with everything the weather details page shows."""
+    return f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current=temperature_2m,relative_humidity_2m,wind_speed_10m,weather_code,soil_temperature_0cm,soil_moisture_0_1cm&hourly=temperature_2m,precipitation_probability&daily=weather_code,temperature_2m_max,temperature_2m_min,uv_index_max,windspeed_10m_max,precipitation_sum&timezone=auto&forecast_days=7"
+
+def build_weather_details(data):
+    """
+    Shape an Open-Meteo forecast into the /api/weather-details response
+
+    Shared by the Flask view and its async counterpart in asgi.py.
+
+    Args:
+        data (dict): Parsed response from weather_details_url()
+
+    Returns:
+        Tuple of (response body, HTTP status)
+    """
+    # Validate the response structure
+    if not data:
+        app.logger.error("Empty response received from Open-Meteo API")
+        return {
+            'success': False, 
+            'error': 'Empty weather data', 
+            'details': 'No data received from weather service'
+        }, 500
+
+    # Log the received data keys for debugging
+    app.logger.debug(f"Received data keys: {list(data.keys())}")
+    if 'current' in data:
+        app.logger.debug(f"Current data keys: {list(data['current'].keys())}")
+        app.logger.debug(f"Current data content: {data['current']}")
+    if 'daily' in data:
+        app.logger.debug(f"Daily data keys: {list(data['daily'].keys())}")
+
+    # Ensure all required sections are present
+    required_sections = ['current', 'daily', 'hourly']
+    for section in required_sections:
+        if section not in data:
+            app.logger.error(f"Missing required section: {section}")
+            return {
+                'success': False, 
+                'error': 'Incomplete weather data', 
+                'details': f"Missing {section} section"
+            }, 500
+
+    current = data['current']
+    daily = data['daily']
+    hourly = data['hourly']
+
+    # Validate required current weather keys
+    current_required_keys = [
+        'temperature_2m', 'relative_humidity_2m', 'wind_speed_10m', 
+        'weather_code', 'soil_temperature_0cm', 'soil_moisture_0_1cm'
+    ]
+    for key in current_required_keys:
+        if key not in current:
+            app.logger.error(f"Missing key in current weather data: {key}")
+            return {
+                'success': False,
+                'error': 'Unable to fetch weather data', 
+                'details': f"Missing current weather key: '{key}'"
+            }, 500
+
+    # Extract current weather details
+    temp = current['temperature_2m']
+    humidity = current['relative_humidity_2m']
+    wind_speed = current['wind_speed_10m']
+    soil_temp = current['soil_temperature_0cm']
+    soil_moisture = current['soil_moisture_0_1cm']
+    current_weather_code = current['weather_code']
+
+    # Prepare forecast data
+    forecast_data = []
+    for i in range(min(7, len(daily.get('time', [])))):
+        forecast_data.append({
+            'date': datetime.fromisoformat(daily['time'][i]).strftime('%Y-%m-%d'),
+            'temperature_max': round(daily['temperature_2m_max'][i], 1),
+            'temperature_min': round(daily['temperature_2m_min'][i], 1),
+            'precipitation_prob': round(hourly['precipitation_probability'][i * 24], 1),
+            'uv_index': round(daily['uv_index_max'][i], 1),
+            'wind_speed': round(daily['windspeed_10m_max'][i], 1),
+            'icon': get_weather_icon(daily['weather_code'][i])
+        })
+
+    # Temperature trend
+    temperature_trend = {
+        'labels': [datetime.fromisoformat(t).strftime('%A') for t in daily.get('time', [])[:7]],
+        'data': [(daily['temperature_2m_max'][i] + daily['temperature_2m_min'][i]) / 2 for i in range(min(7, len(daily.get('time', []))))]
+    }
+    
+    # Precipitation data
+    precipitation_data = {
+        'labels': [datetime.fromisoformat(t).strftime('%A') for t in daily.get('time', [])[:7]],
+        'data': [p for p in daily.get('precipitation_sum', [0] * 7)[:7]]
+    }
+
+    # Generate comprehensive recommendations
+    recommendations = generate_comprehensive_recommendations(
+        temp, 
+        humidity, 
+        wind_speed, 
+        soil_temp, 
+        soil_moisture,
+        forecast_data
+    )
+
+    # Log successful data retrieval
+    app.logger.debug("Successfully retrieved and processed weather data")
+
+    return {
+        'success': True,
+        'data': {
+            'current': {
+                'temperature': round(temp, 1),
+                'humidity': round(humidity, 1),
+                'windSpeed': round(wind_speed, 1),
+                'description': get_weather_icon(current_weather_code),
+                'soilTemperature': round(soil_temp, 1),
+                'soilMoisture': round(soil_moisture, 1)
+            },
+            'forecast': forecast_data,
+            'temperatureTrend': temperature_trend,
+            'precipitationData': precipitation_data,
+            'recommendations': recommendations
+        }
+    }, 200
+
 @app.route('/api/weather-details')
+@cache_policy(max_age=300, stale_while_revalidate=600, stale_if_error=3600,
+              surrogate_keys=['weather', 'weather-details'])
 def api_weather_details():
     """
     Fetch comprehensive weather details for user's location using Open-Meteo API
@@ -1700,7 +2269,7 @@ def api_weather_details():
         lon = request.args.get('lon')
 
         # Log the received coordinates
-        app.logger.info(f"Received coordinates - Latitude: {lat}, Longitude: {lon}")
+        app.logger.debug(f"Received coordinates - Latitude: {lat}, Longitude: {lon}")
 
         if not lat or not lon:
             app.logger.error("Missing latitude or longitude")
@@ -1711,16 +2280,16 @@ def api_weather_details():
             }), 400
 
         # Construct Open-Meteo API URL with comprehensive parameters
-        url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current=temperature_2m,relative_humidity_2m,wind_speed_10m,weather_code,soil_temperature_0cm,soil_moisture_0_1cm&hourly=temperature_2m,precipitation_probability&daily=weather_code,temperature_2m_max,temperature_2m_min,uv_index_max,windspeed_10m_max,precipitation_sum&timezone=auto&forecast_days=7"
+        url = weather_details_url(lat, lon)
 
         # Log the constructed URL
-        app.logger.info(f"Open-Meteo API Request URL: {url}")
+        app.logger.debug(f"Open-Meteo API Request URL: {url}")
 
         # Make the API request
         response = requests.get(url, timeout=10)
         
         # Log the full response for debugging
-        app.logger.info(f"Open-Meteo API Response Status: {response.status_code}")
+        app.logger.debug(f"Open-Meteo API Response Status: {response.status_code}")
         app.logger.debug(f"Open-Meteo API Full Response: {response.text}")
 
         # Check if the request was successful
@@ -1743,115 +2312,8 @@ def api_weather_details():
                 'details': str(e)
             }), 500
 
-        # Validate the response structure
-        if not data:
-            app.logger.error("Empty response received from Open-Meteo API")
-            return jsonify({
-                'success': False, 
-                'error': 'Empty weather data', 
-                'details': 'No data received from weather service'
-            }), 500
-
-        # Log the received data keys for debugging
-        app.logger.info(f"Received data keys: {list(data.keys())}")
-        if 'current' in data:
-            app.logger.info(f"Current data keys: {list(data['current'].keys())}")
-            app.logger.info(f"Current data content: {data['current']}")
-        if 'daily' in data:
-            app.logger.info(f"Daily data keys: {list(data['daily'].keys())}")
-
-        # Ensure all required sections are present
-        required_sections = ['current', 'daily', 'hourly']
-        for section in required_sections:
-            if section not in data:
-                app.logger.error(f"Missing required section: {section}")
-                return jsonify({
-                    'success': False, 
-                    'error': 'Incomplete weather data', 
-                    'details': f"Missing {section} section"
-                }), 500
-
-        current = data['current']
-        daily = data['daily']
-        hourly = data['hourly']
-
-        # Validate required current weather keys
-        current_required_keys = [
-            'temperature_2m', 'relative_humidity_2m', 'wind_speed_10m', 
-            'weather_code', 'soil_temperature_0cm', 'soil_moisture_0_1cm'
-        ]
-        for key in current_required_keys:
-            if key not in current:
-                app.logger.error(f"Missing key in current weather data: {key}")
-                return jsonify({
-                    'success': False, 
-                    'error': 'Unable to fetch weather data', 
-                    'details': f"Missing current weather key: '{key}'"
-                }), 500
-
-        # Extract current weather details
-        temp = current['temperature_2m']
-        humidity = current['relative_humidity_2m']
-        wind_speed = current['wind_speed_10m']
-        soil_temp = current['soil_temperature_0cm']
-        soil_moisture = current['soil_moisture_0_1cm']
-        current_weather_code = current['weather_code']
-
-        # Prepare forecast data
-        forecast_data = []
-        for i in range(min(7, len(daily.get('time', [])))):
-            forecast_data.append({
-                'date': datetime.fromisoformat(daily['time'][i]).strftime('%Y-%m-%d'),
-                'temperature_max': round(daily['temperature_2m_max'][i], 1),
-                'temperature_min': round(daily['temperature_2m_min'][i], 1),
-                'precipitation_prob': round(hourly['precipitation_probability'][i * 24], 1),
-                'uv_index': round(daily['uv_index_max'][i], 1),
-                'wind_speed': round(daily['windspeed_10m_max'][i], 1),
-                'icon': get_weather_icon(daily['weather_code'][i])
-            })
-
-        # Temperature trend
-        temperature_trend = {
-            'labels': [datetime.fromisoformat(t).strftime('%A') for t in daily.get('time', [])[:7]],
-            'data': [(daily['temperature_2m_max'][i] + daily['temperature_2m_min'][i]) / 2 for i in range(min(7, len(daily.get('time', []))))]
-        }
-        
-        # Precipitation data
-        precipitation_data = {
-            'labels': [datetime.fromisoformat(t).strftime('%A') for t in daily.get('time', [])[:7]],
-            'data': [p for p in daily.get('precipitation_sum', [0] * 7)[:7]]
-        }
-
-        # Generate comprehensive recommendations
-        recommendations = generate_comprehensive_recommendations(
-            temp, 
-            humidity, 
-            wind_speed, 
-            soil_temp, 
-            soil_moisture,
-            forecast_data
-        )
-
-        # Log successful data retrieval
-        app.logger.info("Successfully retrieved and processed weather data")
-
-        return jsonify({
-            'success': True,
-            'data': {
-                'current': {
-                    'temperature': round(temp, 1),
-                    'humidity': round(humidity, 1),
-                    'windSpeed': round(wind_speed, 1),
-                    'description': get_weather_icon(current_weather_code),
-                    'soilTemperature': round(soil_temp, 1),
-                    'soilMoisture': round(soil_moisture, 1)
-                },
-                'forecast': forecast_data,
-                'temperatureTrend': temperature_trend,
-                'precipitationData': precipitation_data,
-                'recommendations': recommendations
-            }
-        })
+        body, status = build_weather_details(data)
+        return jsonify(body), status
 
     except Exception as e:
         # Catch any unexpected errors
@@ -1928,72 +2390,84 @@ def generate_comprehensive_recommendations(temp, humidity, wind_speed, soil_temp
 
     return recommendations
 
+def process_file_education_job(payload, progress):
+    """Background job for /process_file_education."""
+    upload = payload['files'][0]
+    filename = upload['filename']
+    
+    progress(0.1, f"Reading {filename}")
+    file_type = get_file_type(filename)
+    file_content = read_file_content(upload['path'])
+    
+    # Combine file content with user message
+    full_prompt = f"""Analyze the following {file_type} file in the context of water conservation education:
+
+File Content:
+{file_content}
+
+User Message: {payload.get('message', '')}
+
+Please provide an educational analysis focusing on water conservation insights."""
+    
+    progress(0.3, 'Analyzing file')
+    # Use education-specific chatbot
+    from model_inference_education import WaterConservationBot
+    bot = WaterConservationBot(model_name="water-expert-advanced")
+    
+    response, error = bot.generate_response(full_prompt, history=[])
+    if error:
+        raise RuntimeError(error)
+    
+    return {
+        'response': response,
+        'file_name': filename,
+        'file_type': file_type
+    }
+
+job_queue.register('process_file_education', process_file_education_job)
+
 @app.route('/process_file_education', methods=['POST'])
+@upload_policy(extensions=DOCUMENT_EXTENSIONS)
 def process_file_education():
     """
     Process file uploads for the educator chat interface
-    Supports various file types and uses Ollama for analysis
+    Queues the file for analysis with Ollama and returns a job ID
     """
     # Check if file is present
     if 'file' not in request.files:
         return jsonify({'error': 'No file uploaded'}), 400
     
     file = request.files['file']
-    message = request.form.get('message', '')
     
     # Validate file
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
     
-    # Secure filename and generate unique path
-    filename = secure_filename(file.filename)
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"education_{uuid.uuid4()}_{filename}")
-    
-    # Save file
-    file.save(file_path)
-    
     try:
-        # Read file content based on type
-        file_type = get_file_type(filename)
-        file_content = read_file_content(file_path)
-        
-        # Combine file content with user message
-        full_prompt = f"""Analyze the following {file_type} file in the context of water conservation education:
-
-File Content:
-{file_content}
-
-User Message: {message}
-
-Please provide an educational analysis focusing on water conservation insights."""
-        
-        # Use education-specific chatbot
-        from model_inference_education import WaterConservationBot
-        bot = WaterConservationBot(model_name="water-expert-advanced")
-        
-        # Generate response
-        response, error = bot.generate_response(full_prompt)
-        
-        if error:
-            return jsonify({'error': error}), 500
-        
-        return jsonify({
-            'response': response,
-            'file_name': filename,
-            'file_type': file_type
-        })
-    
+        upload = save_job_upload(file)
+        return job_accepted(job_queue.enqueue('process_file_education', {
+            'files': [upload],
+            'message': request.form.get('message', '')
+        }))
     except Exception as e:
         logger.error(f"File processing error: {e}")
         return jsonify({'error': str(e)}), 500
-    finally:
-        # Clean up uploaded file
-        if os.path.exists(file_path):
-            os.remove(file_path)
+
+def process_file_farmer_job(payload, progress):
+    """Background job for /process_file_farmer."""
+    from model_inference_farmers import process_farmer_file
+    
+    progress(0.1, 'Analyzing file')
+    return {
+        'response': process_farmer_file(payload['files'][0]['path'], payload.get('message', ''))
+    }
+
+job_queue.register('process_file_farmer', process_file_farmer_job)
 
 @app.route('/process_file_farmer', methods=['POST'])
+@upload_policy(extensions=FARMER_EXTENSIONS)
 def process_file_farmer():
-    """Process file uploads for farmer chat"""
+    """Queue file uploads from the farmer chat for analysis"""
     try:
         # Check if file is present
         if 'file' not in request.files:
@@ -2005,40 +2479,12 @@ def process_file_farmer():
         if file.filename == '':
             return jsonify({'error': 'No selected file'}), 400
         
-        # Check file type and size
-        allowed_extensions = {'.pdf', '.doc', '.docx', '.txt'}
-        max_file_size = 50 * 1024 * 1024  # 50MB
-        
-        # Get file extension
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        
-        if file_ext not in allowed_extensions:
-            return jsonify({'error': f'File type {file_ext} not allowed'}), 400
-        
-        if file.content_length > max_file_size:
-            return jsonify({'error': 'File too large'}), 400
-        
-        # Get optional message
-        message = request.form.get('message', '')
-        
-        # Save file temporarily
-        temp_dir = os.path.join(app.instance_path, 'temp_uploads')
-        os.makedirs(temp_dir, exist_ok=True)
-        temp_path = os.path.join(temp_dir, secure_filename(file.filename))
-        file.save(temp_path)
-        
-        # Process file with Ollama
-        from model_inference_farmers import process_farmer_file
-        
-        # Generate response
-        response_text = process_farmer_file(temp_path, message)
-        
-        # Clean up temporary file
-        os.remove(temp_path)
-        
-        return jsonify({
-            'response': response_text
-        })
+        # Type and size were enforced by the upload policy while the body streamed in
+        upload = save_job_upload(file)
+        return job_accepted(job_queue.enqueue('process_file_farmer', {
+            'files': [upload],
+            'message': request.form.get('message', '')
+        }))
     
     except Exception as e:
         # Log the error
@@ -2058,7 +2504,7 @@ def get_weather_route():
         result = get_weather()
         
         # Log the result for debugging
-        app.logger.info(f"Get Weather Result: {result}")
+        app.logger.debug(f"Get Weather Result: {result}")
         
         return jsonify(result)
     
@@ -2070,189 +2516,21 @@ def get_weather_route():
             'details': str(e)
         }), 500
 
+def warm_chatbot():
+    if not chatbot_usable(chatbot.get()):
+        raise RuntimeError('No chatbot could be initialized')
+
+# Slow subsystems load in the background so worker boot stays fast
+warmup = Warmup()
+# Every worker process also runs queued jobs; unfinished ones resume after a restart
+warmup.add('job_queue', job_queue.start)
+warmup.add('topic_gate', get_topic_gate, critical=True)
+warmup.add('chatbot', warm_chatbot)
+if os.getenv('STARTUP_WARMUP', 'True').lower() == 'true':
+    warmup.start()
+else:
+    # Everything still loads on first use; /readyz does not wait for a warm-up that never runs
+    warmup.skip()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
-    conn = sqlite3.connect('feedback.db')
-    c = conn.cursor()
-    
-    # Create feedback table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS feedback (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            email TEXT,
-            rating INTEGER,
-            comments TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create admin table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS admin (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE,
-            password TEXT
-        )
-    ''')
-    
-    # Add default admin if not exists
-    c.execute('SELECT * FROM admin WHERE username = ?', ('admin',))
-    if not c.fetchone():
-        c.execute('INSERT INTO admin (username, password) VALUES (?, ?)',
-                 ('admin', generate_password_hash('admin123')))
-    
-    conn.commit()
-    conn.close()
-
-# Initialize database on startup
-init_db()
-
-# Load translations
-with open('translations.json', 'r', encoding='utf-8') as f:
-    translations = json.load(f)
-
-def get_text(key):
-    """Get text in English"""
-    try:
-        return translations['en'].get(key, key)
-    except:
-        return key
-
-# Register get_text as a template filter
-app.jinja_env.filters['translate'] = get_text
-
-@app.context_processor
-def utility_processor():
-    return dict(get_text=get_text)
-
-# Sanitize input
-def sanitize_input(text):
-    return bleach.clean(text, strip=True)
-
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def get_file_type(filename):
-    """Get file type based on extension"""
-    ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
-    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
-
-def read_file_content(file_path):
-    """
-    Read file content based on file type with robust error handling
-    Supports multiple file types: txt, pdf, docx, images
-    
-    Args:
-        file_path (str): Path to the uploaded file
-    
-    Returns:
-        str: Extracted text content from the file
-    """
-    try:
-        # Determine file extension
-        _, ext = os.path.splitext(file_path)
-        ext = ext.lower()
-
-        # Text files
-        if ext in ['.txt', '.csv']:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-
-        # PDF files
-        elif ext == '.pdf':
-            import PyPDF2
-            with open(file_path, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() or ""
-                return text
-
-        # Word documents
-        elif ext in ['.doc', '.docx']:
-            import docx
-            doc = docx.Document(file_path)
-            return "\n".join([para.text for para in doc.paragraphs if para.text])
-
-        # Image files (OCR)
-        elif ext in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']:
-            import pytesseract
-            from PIL import Image
-            
-            # Ensure Tesseract is installed
-            try:
-                return pytesseract.image_to_string(Image.open(file_path))
-            except Exception as ocr_error:
-                logger.warning(f"OCR failed for image: {ocr_error}")
-                return "Could not extract text from image"
-
-        else:
-            logger.warning(f"Unsupported file type: {ext}")
-            return f"Unsupported file type: {ext}"
-
-    except Exception as e:
-        logger.error(f"Error reading file {file_path}: {e}")
-        return f"Error reading file: {str(e)}"
-
-def generate_csrf_token():
-    if 'csrf_token' not in session:
-        session['csrf_token'] = secrets.token_hex(32)
-    return session['csrf_token']
-
-app.jinja_env.globals['csrf_token'] = generate_csrf_token
-
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            flash('Please log in to access this page', 'error')
-            return redirect(url_for('login'))
-        return f(*args, **kwargs)
-    return decorated_function
-
-def verify_csrf_token():
-    # Skip CSRF check for local network requests
-    if request.remote_addr.startswith('192.168.') or request.remote_addr == '127.0.0.1':
-        return True
-        
-    # Check form data first
-    token = request.form.get('csrf_token')
-    if not token and request.is_json:
-        # Then check JSON data
-        token = request.json.get('csrf_token')
-    # Finally check headers
-    if not token:
-        token = request.headers.get('X-CSRF-Token')
-    return token and token == session.get('csrf_token')
-
-@app.before_request
-def before_request():
-    # Skip session check for static files and public routes
-    if request.path.startswith('/static') or request.endpoint in ['login', 'index', 'logout']:
-        return
-
-    # Only check admin routes
-    if request.endpoint and request.endpoint.startswith('admin'):
-        if 'user_id' not in session:
-            flash('Please log in to access the admin panel.', 'error')
-            return redirect(url_for('login'))
-        
-        # Check session timeout (20 minutes)
-        if 'last_activity' in session:
-            last_activity = datetime.fromisoformat(session['last_activity'])
-            if (datetime.now() - last_activity).total_seconds() > 1200:  # 20 minutes
-                session.clear()
-                flash('Your session has expired. Please log in again.', 'error')
-                return redirect(url_for('login'))
-        
-        # Update last activity time
-        session['last_activity'] = datetime.now().isoformat()
-
-    # Require CSRF token for all POST requests
-    if request.method == 'POST':
-        if not verify_csrf_token():
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                return jsonify({'error': 'Invalid CSRF token'}), 400
-            flash('Invalid CSRF token. Please try again.', 'error')
-            return redirect(url_for('index'))
\ No newline at end of file
@@ -0,0 +1,526 @@
+"""
+ASGI entry point serving the slow, network-bound routes asynchronously
+
+Chat, bill-chat, weather and regional-insights handlers await a shared
+httpx.AsyncClient instead of pinning a worker thread for the length of
+an Ollama or weather API call. Every other route is served by the Flask
+app mounted underneath, including /api/main-chat: its Flask view picks
+no bot for the 'main' role, so there is no behaviour to port yet.
+
+Run with:
+    uvicorn asgi:application --host 0.0.0.0 --port 8000
+"""
+import os
+import time
+import uuid
+import logging
+import contextlib
+
+import httpx
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route
+
+import app as flask_module
+from app import app as flask_app, build_weather_details, chatbot, conversation_store, local_answer, regional_service, \
+    weather_details_url
+from utils.http_cache import compress, etag_for, etag_matches
+from utils.bill_report import parse_bill_fields, has_core_fields, tips_profile, render_bill_report, fallback_tips
+from utils.startup import Lazy
+from utils.water_bill_chat import create_water_bill_chat, tips_cache
+from weather_routes import LOCATION_SERVICES, parse_location, current_weather_url, build_weather_response
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_API_URL = os.getenv('OLLAMA_API_URL', 'http://localhost:11434')
+OLLAMA_TIMEOUT = float(os.getenv('ASYNC_OLLAMA_TIMEOUT', '120'))
+
+# Shared client; one connection pool for Ollama and the weather APIs
+http = None
+
+
+def _farmers_bot():
+    from model_inference_farmers import WaterConservationBot as FarmersBot
+    return FarmersBot()
+
+
+def _education_bot():
+    from model_inference_education import WaterConservationBot as EducationBot
+    return EducationBot(model_name='water-expert-education')
+
+# Built on first use, on the thread pool; the education bot shells out to ollama
+farmer_chatbot = Lazy(_farmers_bot)
+education_chatbot = Lazy(_education_bot)
+
+
+def cached_json(request: Request, data, view_name: str) -> Response:
+    """
+    JSON response with the ETag, Cache-Control and compression the Flask
+    view's @cache_policy would give it; 304 if the client's copy is current
+    """
+    policy = flask_app.view_functions[view_name].cache_policy
+    body = flask_app.json.dumps(data).encode('utf-8')
+    etag = etag_for(body)
+    headers = policy.headers(dict(request.query_params))
+    headers['ETag'] = f'W/"{etag}"'
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+
+    body, encoding = compress(body, request.headers.get('accept-encoding', ''))
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        headers['Vary'] = 'Accept-Encoding'
+    return Response(body, media_type='application/json', headers=headers)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(application):
+    global http
+    http = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=int(os.getenv('ASYNC_MAX_CONNECTIONS', '500'))),
+        timeout=httpx.Timeout(10.0)
+    )
+    try:
+        yield
+    finally:
+        await http.aclose()
+
+
+def load_session(request: Request) -> dict:
+    """Decode the Flask session cookie so async routes share CSRF tokens and chat IDs."""
+    cookie = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return {}
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    try:
+        return dict(serializer.loads(cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds())))
+    except Exception:
+        return {}
+
+
+def save_session(response, session: dict):
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    response.set_cookie(
+        flask_app.config['SESSION_COOKIE_NAME'],
+        serializer.dumps(session),
+        httponly=flask_app.config['SESSION_COOKIE_HTTPONLY'],
+        secure=flask_app.config['SESSION_COOKIE_SECURE'],
+        samesite=flask_app.config['SESSION_COOKIE_SAMESITE'],
+        path='/'
+    )
+
+
+def csrf_valid(request: Request, data: dict, session: dict) -> bool:
+    """Same rules as app.verify_csrf_token."""
+    remote_addr = request.client.host if request.client else ''
+    if remote_addr.startswith('192.168.') or remote_addr == '127.0.0.1':
+        return True
+    token = data.get('csrf_token') or request.headers.get('X-CSRF-Token')
+    return bool(token) and token == session.get('csrf_token')
+
+
+async def read_request(request: Request):
+    """
+    Parse the JSON or form body and enforce CSRF like the Flask before_request hook
+
+    Returns:
+        Tuple of (data, session, error response or None)
+    """
+    session = load_session(request)
+    content_type = request.headers.get('content-type', '')
+    try:
+        if 'application/json' in content_type:
+            data = await request.json()
+        else:
+            data = dict(await request.form())
+    except Exception:
+        data = {}
+
+    if not isinstance(data, dict):
+        data = {}
+    if not csrf_valid(request, data, session):
+        return data, session, JSONResponse({'error': 'Invalid CSRF token'}, status_code=400)
+    return data, session, None
+
+
+def chat_session_id(session: dict) -> str:
+    if 'chat_session_id' not in session:
+        session['chat_session_id'] = uuid.uuid4().hex
+    return session['chat_session_id']
+
+
+async def ollama_generate(model: str, prompt: str, options: dict = None) -> str:
+    response = await http.post(
+        f'{OLLAMA_API_URL}/api/generate',
+        json={'model': model, 'prompt': prompt, 'stream': False, 'options': options or {}},
+        timeout=OLLAMA_TIMEOUT
+    )
+    response.raise_for_status()
+    return response.json().get('response', '').strip()
+
+
+async def generate_with_history(bot, message: str, session_id: str, role: str = 'general'):
+    """
+    Async counterpart of app.generate_with_history
+
+    Bots without build_prompt (the WaterTaxExpert fallback) run on the
+    thread pool through the synchronous path.
+    """
+    if not hasattr(bot, 'build_prompt'):
+        return await run_in_threadpool(flask_module.generate_with_history, bot, message, session_id, role)
+    if not getattr(bot, 'model_name', None):
+        return None, "AI service is currently unavailable. Please try again later."
+
+    history = conversation_store.get_history(session_id)
+    try:
+        response = await ollama_generate(bot.model_name, bot.build_prompt(message, history), bot.generation_options)
+    except httpx.HTTPError as e:
+        logger.error(f"Ollama API error: {e}")
+        return None, "Could not connect to Ollama service. Please ensure it's running."
+
+    if not response:
+        return None, "Unable to generate a meaningful response."
+    conversation_store.append(session_id, message, response, role)
+    return response, None
+
+
+async def main_chat(request: Request):
+    data, session, error = await read_request(request)
+    if error:
+        return error
+
+    user_message = data.get('message', '')
+    if not user_message:
+        return JSONResponse({"error": "No message provided"}, status_code=400)
+
+    # Bill, weather and tariff questions are answered by local engines
+    local = await run_in_threadpool(local_answer, user_message)
+    if local:
+        return JSONResponse({"response": local['response']})
+
+    try:
+        bot = await run_in_threadpool(chatbot.get)
+    except Exception as init_error:
+        logger.error(f"Chatbot initialization error: {init_error}")
+        return JSONResponse({
+            'error': 'AI service initialization failed',
+            'response': 'I apologize, but the AI service is currently unavailable.'
+        }, status_code=503)
+
+    if bot is None:
+        return JSONResponse({"error": "Chatbot method not found"}, status_code=500)
+
+    response, generation_error = await generate_with_history(bot, user_message, chat_session_id(session))
+    if generation_error:
+        return JSONResponse({"error": generation_error}, status_code=400)
+
+    result = JSONResponse({"response": response or "I apologize, but I couldn't generate a meaningful response."})
+    save_session(result, session)
+    return result
+
+
+async def new_chat_endpoint(request: Request):
+    request_start_time = time.time()
+    if 'application/json' not in request.headers.get('content-type', ''):
+        return JSONResponse({"error": "Invalid request format", "status": "error"}, status_code=400)
+
+    data, session, error = await read_request(request)
+    if error:
+        return error
+
+    message = (data.get('message') or '').strip()
+    file_content = data.get('file_content')
+    if not message:
+        return JSONResponse({"error": "Message cannot be empty", "status": "error"}, status_code=400)
+
+    local = await run_in_threadpool(local_answer, message, None, file_content)
+    if local:
+        return JSONResponse({
+            "message": local['response'],
+            "source": local['source'],
+            "status": "success",
+            "processing_time": time.time() - request_start_time
+        })
+
+    bot = await run_in_threadpool(chatbot.get)
+    if bot is None:
+        return JSONResponse({"error": "Chatbot service unavailable", "status": "error"}, status_code=500)
+
+    full_context = message
+    if file_content:
+        full_context += f"\nAdditional context: {file_content}"
+
+    response, generation_error = await generate_with_history(bot, full_context, chat_session_id(session))
+    if generation_error:
+        return JSONResponse({"error": generation_error, "status": "generation_error"}, status_code=400)
+
+    result = JSONResponse({
+        "message": response or "I apologize, but I couldn't generate a meaningful response.",
+        "source": getattr(bot, 'model_name', 'unknown'),
+        "status": "success",
+        "processing_time": time.time() - request_start_time
+    })
+    save_session(result, session)
+    return result
+
+
+async def farmer_chat_api(request: Request):
+    data, session, error = await read_request(request)
+    if error:
+        return error
+
+    message = (data.get('message') or '').strip()
+    if not message:
+        return JSONResponse({"error": "Message cannot be empty"}, status_code=400)
+
+    local = await run_in_threadpool(local_answer, message, 'farmer')
+    if local:
+        return JSONResponse({"message": local['response'], "source": local['source']})
+
+    bot = await run_in_threadpool(farmer_chatbot.get)
+    response, generation_error = await generate_with_history(bot, message, chat_session_id(session), 'farmer')
+    if generation_error:
+        return JSONResponse({"error": generation_error}, status_code=400)
+
+    result = JSONResponse({
+        "message": response or "Üzgünüm, bu soruya şu anda yanıt veremiyorum.",
+        "source": getattr(bot, 'model_name', 'water-expert-farmers')
+    })
+    save_session(result, session)
+    return result
+
+
+async def generate_once(bot, message: str):
+    """
+    Answer one message without session history, like bot.generate_response(message)
+    on the per-request bots the Flask educator view builds
+
+    Returns:
+        Tuple of (response, error)
+    """
+    if not hasattr(bot, 'build_prompt'):
+        # Empty caller-owned history: the shared bot's own history stays untouched
+        return await run_in_threadpool(bot.generate_response, message, [])
+
+    try:
+        response = await ollama_generate(bot.model_name, bot.build_prompt(message, []), bot.generation_options)
+    except httpx.HTTPError as e:
+        logger.error(f"Ollama API error: {e}")
+        return None, "Error generating response"
+    return response, None
+
+
+async def educator_chat_api(request: Request):
+    data, session, error = await read_request(request)
+    if error:
+        return error
+
+    message = (data.get('message') or '').strip()
+    context = data.get('context', 'education')
+
+    local = await run_in_threadpool(local_answer, message, 'farmer' if context == 'farmers' else 'education')
+    if local:
+        return JSONResponse({"response": local['response']})
+
+    if not message:
+        return JSONResponse({"error": "No message provided"}, status_code=400)
+
+    try:
+        bot = await run_in_threadpool(farmer_chatbot.get if context == 'farmers' else education_chatbot.get)
+        response, generation_error = await generate_once(bot, message)
+    except Exception as e:
+        logger.error(f"Unexpected error in educator_chat_api: {e}")
+        return JSONResponse({"error": "Unexpected server error", "details": str(e)}, status_code=500)
+
+    if generation_error:
+        return JSONResponse({"error": str(generation_error)}, status_code=500)
+    return JSONResponse({"response": response})
+
+
+async def bill_chat_api(request: Request):
+    data, session, error = await read_request(request)
+    if error:
+        return error
+    if 'message' not in data:
+        return JSONResponse({'success': False, 'error': 'No message provided'}, status_code=400)
+
+    bill_chat = create_water_bill_chat()
+    message = data.get('message', '')
+    fields = parse_bill_fields(message)
+
+    try:
+        if not has_core_fields(fields):
+            # Unreadable by the local parsers: full LLM analysis, as in analyze_water_bill
+            instruction = "bill information + english text and use turkish liras for pricemen and give advice for water saving tips"
+            response = await ollama_generate(bill_chat.model, bill_chat.generate_bill_analysis_prompt(message, instruction))
+            return JSONResponse({'success': True, 'response': response or 'No analysis available', 'context': []})
+
+        profile = tips_profile(fields, data.get('household_size'), data.get('language', 'en'))
+        tips = tips_cache.get(profile)
+        if tips is None:
+            try:
+                tips = await ollama_generate(bill_chat.model, bill_chat.conservation_tips_prompt(profile), {'num_predict': 200})
+                if tips:
+                    tips_cache.put(profile, tips)
+            except httpx.HTTPError as e:
+                logger.error(f"Ollama API error: {e}")
+                tips = None
+
+        return JSONResponse({
+            'success': True,
+            'response': render_bill_report(fields, tips or fallback_tips(profile[3]), profile[3]),
+            'context': []
+        })
+
+    except Exception as e:
+        logger.error(f"Bill chat API error: {e}")
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=500)
+
+
+async def get_weather(request: Request):
+    """Async /get-weather: server location from IP, then Open-Meteo current weather."""
+    city = country = latitude = longitude = None
+    location_data = None
+    for service_name, url in LOCATION_SERVICES:
+        try:
+            response = await http.get(url, timeout=5)
+            location_data = response.json()
+            city, country, latitude, longitude = parse_location(location_data)
+            if all([city, country, latitude, longitude]):
+                break
+            logger.warning(f"Incomplete location data from {service_name}")
+        except Exception as e:
+            logger.error(f"Error fetching location from {service_name}: {e}")
+
+    if not location_data or not all([city, country, latitude, longitude]):
+        return JSONResponse({
+            'error': 'Unable to determine location',
+            'details': 'No valid location data found',
+            'raw_data': location_data
+        }, status_code=400)
+
+    try:
+        weather_response = await http.get(current_weather_url(latitude, longitude), timeout=10)
+        if weather_response.status_code != 200:
+            return JSONResponse({
+                'error': 'Unable to fetch weather data',
+                'details': 'Weather service unavailable'
+            }, status_code=500)
+        return JSONResponse(build_weather_response(city, country, latitude, longitude, weather_response.json()))
+    except Exception as weather_error:
+        logger.error(f"Weather data fetch error: {weather_error}")
+        return JSONResponse({
+            'error': 'Weather data retrieval failed',
+            'details': str(weather_error)
+        }, status_code=500)
+
+
+async def api_weather(request: Request):
+    """Async /api/weather with the same response shape as app.get_weather."""
+    try:
+        try:
+            location_data = (await http.get('https://ipapi.co/json/', timeout=5)).json()
+            latitude = location_data.get('latitude')
+            longitude = location_data.get('longitude')
+            location_name = f"{location_data.get('city', 'Unknown')}, {location_data.get('country_name', 'Unknown')}"
+        except Exception as location_error:
+            logger.error(f"Location retrieval error: {location_error}")
+            latitude, longitude, location_name = 0.0, 0.0, 'Global Default'
+
+        weather_url = f"https://api.open-meteo.com/v1/forecast?latitude={latitude}&longitude={longitude}&current_weather=true&hourly=temperature_2m,precipitation_probability&daily=temperature_2m_max,temperature_2m_min&timezone=auto"
+        weather_response = await http.get(weather_url, timeout=10)
+        if weather_response.status_code != 200:
+            return JSONResponse({
+                'error': 'Unable to fetch weather data',
+                'details': f'API returned status {weather_response.status_code}'
+            })
+
+        current_weather = weather_response.json().get('current_weather', {})
+        return cached_json(request, {
+            'success': True,
+            'latitude': latitude,
+            'longitude': longitude,
+            'location': location_name,
+            'temperature': current_weather.get('temperature', 'N/A'),
+            'windspeed': current_weather.get('windspeed', 'N/A')
+        }, 'get_weather')
+
+    except Exception as e:
+        logger.error(f"Unexpected weather retrieval error: {e}")
+        return JSONResponse({'error': 'Failed to retrieve weather information', 'details': str(e)})
+
+
+async def api_weather_details(request: Request):
+    """Async /api/weather-details; the forecast is shaped by app.build_weather_details."""
+    lat = request.query_params.get('lat')
+    lon = request.query_params.get('lon')
+    if not lat or not lon:
+        return JSONResponse({
+            'success': False,
+            'error': 'Missing location coordinates',
+            'details': 'Latitude and longitude are required'
+        }, status_code=400)
+
+    try:
+        response = await http.get(weather_details_url(lat, lon), timeout=10)
+        if response.status_code != 200:
+            logger.error(f"Open-Meteo API Error: {response.status_code} - {response.text}")
+            return JSONResponse({
+                'success': False,
+                'error': 'Unable to fetch weather data',
+                'details': f'API returned status {response.status_code}'
+            }, status_code=500)
+
+        try:
+            data = response.json()
+        except ValueError as e:
+            return JSONResponse({'success': False, 'error': 'Invalid JSON response', 'details': str(e)}, status_code=500)
+
+        body, status = build_weather_details(data)
+        if status != 200:
+            return JSONResponse(body, status_code=status)
+        return cached_json(request, body, 'api_weather_details')
+    except Exception as e:
+        logger.error(f"Unexpected error in weather details: {e}")
+        return JSONResponse({'success': False, 'error': 'Unexpected server error', 'details': str(e)}, status_code=500)
+
+
+async def regional_insights(request: Request):
+    lat = request.query_params.get('lat', '39.9334')  # Default: Ankara
+    lon = request.query_params.get('lon', '32.8597')
+    region_id = request.query_params.get('region', 'ankara')
+
+    try:
+        weather_data = None
+        try:
+            response = await http.get(regional_service.weather_forecast_url(lat, lon))
+            data = response.json()
+            if response.status_code == 200:
+                weather_data = regional_service.recommendation_from_forecast(data)
+        except Exception as e:
+            weather_data = regional_service.weather_error(e)
+
+        return cached_json(request, regional_service.build_insights(weather_data, region_id), 'get_regional_insights')
+    except Exception as e:
+        return JSONResponse({"error": str(e), "message": "Failed to fetch regional insights"}, status_code=500)
+
+
+application = Starlette(
+    routes=[
+        Route('/api/chat', main_chat, methods=['POST']),
+        Route('/new-chat-endpoint', new_chat_endpoint, methods=['POST']),
+        Route('/api/farmer-chat', farmer_chat_api, methods=['POST']),
+        Route('/api/educator-chat', educator_chat_api, methods=['POST']),
+        Route('/api/bill-chat', bill_chat_api, methods=['POST']),
+        Route('/get-weather', get_weather, methods=['GET']),
+        Route('/api/weather', api_weather, methods=['GET']),
+        Route('/api/weather-details', api_weather_details, methods=['GET']),
+        Route('/api/regional-insights', regional_insights, methods=['GET']),
+        # Everything else is served by the synchronous Flask app
+        Mount('/', WSGIMiddleware(flask_app, workers=int(os.getenv('ASYNC_WSGI_THREADS', '8'))))
+    ],
+    lifespan=lifespan
+)
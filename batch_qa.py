@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import requests
+
+
+def load_questions(path):
+    """Read questions from a JSON list or a text file with one question per line."""
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+
+    if path.endswith('.json'):
+        return [q for q in json.loads(content) if isinstance(q, str) and q.strip()]
+    return [line.strip() for line in content.splitlines() if line.strip()]
+
+
+def stream_remote(url, questions, role):
+    """Submit the batch to a running server and yield NDJSON lines as they arrive."""
+    response = requests.post(
+        f"{url.rstrip('/')}/api/batch-qa",
+        json={'questions': questions, 'role': role, 'stream': True},
+        stream=True,
+        timeout=(10, 600)
+    )
+    response.raise_for_status()
+    for line in response.iter_lines(decode_unicode=True):
+        if line:
+            yield json.loads(line)
+
+
+def stream_local(questions, role, concurrency):
+    """Answer the batch in this process, talking to Ollama directly."""
+    from utils.batch_qa import BatchQAService
+    from utils.job_queue import JobQueue
+
+    if role == 'farmer':
+        from model_inference_farmers import WaterConservationBot
+        bot = WaterConservationBot(model_name='water-expert-farmers')
+    else:
+        from model_inference_education import WaterConservationBot
+        bot = WaterConservationBot(model_name='water-expert-education')
+
+    def answer(question, role):
+        response, error = bot.generate_response(question, history=[])
+        return response, error, bot.model_name
+
+    # A private queue in a throwaway database, run by this process alone
+    with tempfile.TemporaryDirectory() as directory:
+        queue = JobQueue(db_path=os.path.join(directory, 'batch.db'), workers=1, max_attempts=1, poll_interval=0.1)
+        service = BatchQAService(answer, queue, max_workers=concurrency, poll_interval=0.1)
+        queue.start()
+        job_id = service.submit(questions, role)
+        yield service.get_job(job_id, include_results=False)
+        yield from service.iter_results(job_id)
+        yield service.get_job(job_id, include_results=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Answer a worksheet of water conservation questions in one batch')
+    parser.add_argument('questions', help='Text file with one question per line, or a JSON list')
+    parser.add_argument('--role', choices=['education', 'farmer'], default='education')
+    parser.add_argument('--url', default='http://localhost:5000', help='WaterWise AI server URL')
+    parser.add_argument('--local', action='store_true', help='Answer in this process instead of via the server')
+    parser.add_argument('--concurrency', type=int, default=4, help='Parallel questions in --local mode')
+    parser.add_argument('--output', help='Write NDJSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    if not questions:
+        print('No questions found', file=sys.stderr)
+        return 1
+
+    if args.local:
+        lines = stream_local(questions, args.role, args.concurrency)
+    else:
+        lines = stream_remote(args.url, questions, args.role)
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for line in lines:
+            out.write(json.dumps(line, ensure_ascii=False) + '\n')
+            out.flush()
+    finally:
+        if args.output:
+            out.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,15 +6,6 @@ from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 import traceback
 
-# Configure logging with UTF-8 encoding
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('model_inference.log', encoding='utf-8')
-    ]
-)
 logger = logging.getLogger(__name__)
 
 class WaterConservationBot:
@@ -69,7 +60,7 @@ class WaterConservationBot:
         
         # Diagnostic logging of Ollama configuration
         logger.info(f"Validating model: {self.model_name}")
-        logger.info(f"Ollama API Base URL: {self.api_base}")
+        logger.debug(f"Ollama API Base URL: {self.api_base}")
         
         for attempt in range(max_retries):
             try:
@@ -86,7 +77,7 @@ class WaterConservationBot:
                 
                 # Log server version for diagnostics
                 server_version = health_response.json().get('version', 'Unknown')
-                logger.info(f"Ollama Server Version: {server_version}")
+                logger.debug(f"Ollama Server Version: {server_version}")
                 
                 # Check available models with extended timeout
                 tags_response = requests.get(
@@ -103,7 +94,7 @@ class WaterConservationBot:
                 model_names = [model.get('name', '') for model in models]
                 
                 # Detailed model diagnostics
-                logger.info(f"Available models: {model_names}")
+                logger.debug(f"Available models: {model_names}")
                 
                 # Check if exact model or partial match exists
                 model_match = any(
@@ -160,12 +151,45 @@ class WaterConservationBot:
         logger.error(f"Could not validate or download model {self.model_name} after {max_retries} attempts")
         return False
 
-    def generate_response(self, user_input: str) -> Tuple[Optional[str], Optional[str]]:
+    # Balanced temperature for consistent responses, slightly higher top_p for
+    # more diverse responses and an increased context window
+    generation_options = {
+        'temperature': 0.5,
+        'top_p': 0.9,
+        'num_ctx': 2048,
+    }
+
+    def build_prompt(self, user_input: str, history: Optional[list] = None) -> str:
+        """
+        Build the generation prompt for a user input.
+        
+        Args:
+            user_input (str): User's input query
+            history (list, optional): Earlier turns of this session
+        
+        Returns:
+            str: Prompt for the Ollama generate API
+        """
+        # Prepare system message with clear, specific instructions
+        system_message = """You are an advanced water conservation expert AI specializing in Turkey's water resources. 
+                Provide precise, actionable advice on water conservation. Use authoritative sources like DSI and TUIK. 
+                Be concise, practical, and focus on sustainable water management strategies."""
+        
+        # Include only this session's earlier turns
+        conversation = "".join(
+            f"User: {entry['user']}\nAssistant: {entry['bot']}\n" for entry in (history or [])
+        )
+        
+        return f"{system_message}\n\n{conversation}User: {user_input}\nAssistant:"
+
+    def generate_response(self, user_input: str, history: Optional[list] = None) -> Tuple[Optional[str], Optional[str]]:
         """
         Generate a response for the given user input with enhanced error handling.
         
         Args:
             user_input (str): User's input query
+            history (list, optional): Caller-owned session turns included in the
+                prompt; when given, the bot's own history is not updated
         
         Returns:
             Tuple[Optional[str], Optional[str]]: Generated response and error message (if any)
@@ -190,7 +214,7 @@ class WaterConservationBot:
         user_input = user_input.strip()[:2000]  # Limit input length
         
         if len(user_input) != original_length:
-            logger.info(f"Input truncated from {original_length} to {len(user_input)} characters")
+            logger.debug(f"Input truncated from {original_length} to {len(user_input)} characters")
         
         if not user_input:
             logger.warning("Input became empty after stripping")
@@ -220,25 +244,16 @@ class WaterConservationBot:
         
         for attempt in range(max_retries):
             try:
-                # Prepare system message with clear, specific instructions
-                system_message = """You are an advanced water conservation expert AI specializing in Turkey's water resources. 
-                Provide precise, actionable advice on water conservation. Use authoritative sources like DSI and TUIK. 
-                Be concise, practical, and focus on sustainable water management strategies."""
-                
                 # Prepare payload with intelligent configuration
                 payload = {
                     'model': self.model_name,
-                    'prompt': f"{system_message}\n\nUser: {user_input}\nAssistant:",
+                    'prompt': self.build_prompt(user_input, history),
                     'stream': False,
-                    'options': {
-                        'temperature': 0.5,  # Balanced temperature for consistent responses
-                        'top_p': 0.9,  # Slightly higher top_p for more diverse responses
-                        'num_ctx': 2048,  # Increased context window
-                    }
+                    'options': self.generation_options
                 }
                 
                 # Detailed logging for traceability
-                logger.info(f"Generating response (Attempt {attempt + 1}/{max_retries})")
+                logger.debug(f"Generating response (Attempt {attempt + 1}/{max_retries})")
                 logger.debug(f"Payload: {payload}")
                 
                 # Send request with dynamic timeout and error tracking
@@ -263,14 +278,15 @@ class WaterConservationBot:
                         self._error_tracking['count'] = 0
                         self._error_tracking['last_reset'] = current_time
                         
-                        # Store conversation history with metadata
-                        self.history.append({
-                            'timestamp': current_time,
-                            'user_input': user_input,
-                            'bot_response': generated_text,
-                            'model': self.model_name,
-                            'attempt': attempt + 1
-                        })
+                        # Store conversation history with metadata unless tracked per session
+                        if history is None:
+                            self.history.append({
+                                'timestamp': current_time,
+                                'user_input': user_input,
+                                'bot_response': generated_text,
+                                'model': self.model_name,
+                                'attempt': attempt + 1
+                            })
                         
                         return generated_text, None
                     
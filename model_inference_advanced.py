@@ -4,12 +4,6 @@ import logging
 from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 
-# Configure logging with UTF-8 encoding
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    encoding='utf-8'
-)
 logger = logging.getLogger(__name__)
 
 class WaterConservationBot:
@@ -26,7 +20,7 @@ class WaterConservationBot:
             return None, "Please provide a valid question"
         
         # Log the input for debugging
-        logger.info(f"Generating response for input: {user_input[:100]}...")
+        logger.debug(f"Generating response for input: {user_input[:100]}...")
         
         # Limit input length to prevent extremely long processing times
         max_input_length = 2000  # Yaklaşık 2000 karakter sınırı
@@ -125,6 +119,7 @@ Specialized Knowledge Areas:
 
 # For testing
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     bot = WaterConservationBot()
     response, error = bot.generate_response("Merhaba")
     if error:
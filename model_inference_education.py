@@ -6,12 +6,6 @@ import os
 from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 
-# Configure logging with UTF-8 encoding
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    encoding='utf-8'
-)
 logger = logging.getLogger(__name__)
 
 class WaterConservationBot:
@@ -82,8 +76,15 @@ class WaterConservationBot:
             logger.error(f"Failed to switch model: {e}")
             return False
     
-    def generate_response(self, user_input: str) -> Tuple[Optional[str], Optional[str]]:
-        """Generate a response for the given user input."""
+    def generate_response(self, user_input: str, history: Optional[list] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Generate a response for the given user input.
+        
+        Args:
+            user_input (str): User's input query
+            history (list, optional): Caller-owned turns; when given, the bot's
+                own history is neither used nor updated
+        """
         if not user_input or not user_input.strip():
             return None, "Please provide a valid question"
         
@@ -122,9 +123,9 @@ Specialized Knowledge Areas:
 -Techniques for water recycling, reuse, and protection of local resources.
 -Interactive and Student-Focused"""
 
-            # Build conversation history from self.history
+            # Build conversation history from the caller's turns or self.history
             conversation_history = ""
-            for entry in self.history:
+            for entry in (self.history if history is None else history):
                 conversation_history += f"User: {entry['user']}\nBot: {entry['bot']}\n"
             
             # Add the current user input
@@ -165,8 +166,9 @@ Specialized Knowledge Areas:
                         logger.error(f"Error decoding JSON: {e}")
                         continue
 
-            # Update conversation history
-            self.history.append({"user": user_input, "bot": full_response})
+            # Update conversation history unless the caller tracks it
+            if history is None:
+                self.history.append({"user": user_input, "bot": full_response})
             
             return full_response, None
 
@@ -193,6 +195,7 @@ Specialized Knowledge Areas:
 
 # For testing
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     bot = WaterConservationBot()
     if not bot.is_service_running():
         print("Error: Ollama service is not running")
@@ -4,17 +4,16 @@ import logging
 from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 import os
-import PyPDF2
 import docx
+from utils.cpu_executor import run_cpu_task, CPUBusy
+from utils.cpu_tasks import pdf_pages
+from utils.extraction_cache import cached_extraction
 
-# Configure logging with UTF-8 encoding
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    encoding='utf-8'
-)
 logger = logging.getLogger(__name__)
 
+# Bump when the text extracted by process_farmer_file changes
+FARMER_EXTRACTOR_VERSION = 2
+
 class WaterConservationBot:
     def __init__(self, model_name: str = "water-expert-farmers"):
         """Initialize the Water Conservation Bot."""
@@ -23,24 +22,24 @@ class WaterConservationBot:
         self.history = []  # Store user interactions and responses
         self._m = 0  # Internal metric counter
     
-    def generate_response(self, user_input: str) -> Tuple[Optional[str], Optional[str]]:
-        """Generate a response for the given user input."""
-        if not user_input or not user_input.strip():
-            return None, "Please provide a valid question"
-        
-        # Internal metric tracking
-        _k = [bytes([119, 104, 111]).decode(), bytes([99, 114, 101, 97, 116]).decode(), 
-              bytes([109, 97, 100, 101]).decode(), bytes([100, 101, 118]).decode()]
-        if any(k in user_input.lower() for k in _k):
-            self._m += 1
-            if self._m >= 3:
-                return bytes([77, 121, 32, 99, 114, 101, 97, 116, 111, 114, 32, 105, 115, 32, 106, 101, 115, 116, 98, 111, 105]).decode(), None
+    # Sampling options for the Ollama generate API
+    generation_options = {
+        'temperature': 0.7,
+        'top_p': 0.9,
+    }
+
+    def build_prompt(self, user_input: str, history: Optional[list] = None) -> str:
+        """
+        Build the generation prompt for a user input.
         
-        try:
-            # Format the prompt with conversation history and system message
-            system_message = """You are a highly knowledgeable water conservation expert AI specialized in 
-            providing practical advice and solutions to farmers in Turkey. Your goal is to help farmers optimize 
-            water usage while maintaining crop productivity. Follow these specific guidelines:
+        Args:
+            user_input (str): User's input query
+            history (list, optional): Caller-owned session turns; defaults to the bot's own history
+        """
+        # Format the prompt with conversation history and system message
+        system_message = """You are a highly knowledgeable water conservation expert AI specialized in 
+        providing practical advice and solutions to farmers in Turkey. Your goal is to help farmers optimize 
+        water usage while maintaining crop productivity. Follow these specific guidelines:
 
 Do not use "*" and "**"
 Only response agriculture related questions and messages.
@@ -83,15 +82,40 @@ How can I help you improve your water management today?"
 
 Your primary goal is to empower farmers with the knowledge and tools they need to conserve water effectively while sustaining their livelihoods."""
 
-            # Build conversation history from self.history
-            conversation_history = ""
-            for entry in self.history:
-                conversation_history += f"User: {entry['user']}\nBot: {entry['bot']}\n"
-            
-            # Add the current user input
-            conversation_history += f"User: {user_input}"
-            
-            formatted_prompt = f"{system_message}\n\nConversation History:\n{conversation_history}\nBot:"
+        # Build conversation history from the session's turns
+        conversation_history = ""
+        for entry in (self.history if history is None else history):
+            conversation_history += f"User: {entry['user']}\nBot: {entry['bot']}\n"
+        
+        # Add the current user input
+        conversation_history += f"User: {user_input}"
+        
+        formatted_prompt = f"{system_message}\n\nConversation History:\n{conversation_history}\nBot:"
+        
+        return formatted_prompt
+
+    def generate_response(self, user_input: str, history: Optional[list] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Generate a response for the given user input.
+        
+        Args:
+            user_input (str): User's input query
+            history (list, optional): Caller-owned session turns; when given,
+                the bot's own history is neither used nor updated
+        """
+        if not user_input or not user_input.strip():
+            return None, "Please provide a valid question"
+        
+        # Internal metric tracking
+        _k = [bytes([119, 104, 111]).decode(), bytes([99, 114, 101, 97, 116]).decode(), 
+              bytes([109, 97, 100, 101]).decode(), bytes([100, 101, 118]).decode()]
+        if any(k in user_input.lower() for k in _k):
+            self._m += 1
+            if self._m >= 3:
+                return bytes([77, 121, 32, 99, 114, 101, 97, 116, 111, 114, 32, 105, 115, 32, 106, 101, 115, 116, 98, 111, 105]).decode(), None
+        
+        try:
+            formatted_prompt = self.build_prompt(user_input, history)
             
             # Log the full prompt for debugging
             logger.debug(f"Full prompt being sent to model:\n{formatted_prompt}")
@@ -102,10 +126,7 @@ Your primary goal is to empower farmers with the knowledge and tools they need t
                     'model': self.model_name,
                     'prompt': formatted_prompt,
                     'stream': True,
-                    'options': {
-                        'temperature': 0.7,
-                        'top_p': 0.9,
-                    }
+                    'options': self.generation_options
                 }
             )
             
@@ -126,8 +147,9 @@ Your primary goal is to empower farmers with the knowledge and tools they need t
                         logger.error(f"Error decoding JSON: {e}")
                         continue
 
-            # Update conversation history
-            self.history.append({"user": user_input, "bot": full_response})
+            # Update conversation history unless the caller tracks it per session
+            if history is None:
+                self.history.append({"user": user_input, "bot": full_response})
             
             return full_response, None
 
@@ -200,18 +222,22 @@ def process_farmer_file(file_path: str, message: str = '') -> str:
         
         if file_ext == '.pdf':
             try:
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    for page in pdf_reader.pages:
-                        file_content += page.extract_text()
+                file_content = cached_extraction(
+                    file_path, 'farmer-text', FARMER_EXTRACTOR_VERSION,
+                    lambda: "".join(run_cpu_task('pdf', pdf_pages, file_path))
+                )
+            except CPUBusy:
+                raise
             except Exception as pdf_error:
                 logger.error(f"Error reading PDF: {pdf_error}")
                 file_content = f"Could not read PDF file: {str(pdf_error)}"
         
         elif file_ext in ['.doc', '.docx']:
             try:
-                doc = docx.Document(file_path)
-                file_content = '\n'.join([paragraph.text for paragraph in doc.paragraphs])
+                file_content = cached_extraction(
+                    file_path, 'farmer-text', FARMER_EXTRACTOR_VERSION,
+                    lambda: '\n'.join([paragraph.text for paragraph in docx.Document(file_path).paragraphs])
+                )
             except Exception as docx_error:
                 logger.error(f"Error reading DOCX: {docx_error}")
                 file_content = f"Could not read Word document: {str(docx_error)}"
@@ -252,12 +278,15 @@ def process_farmer_file(file_path: str, message: str = '') -> str:
         
         return response or "I couldn't generate a meaningful response about the file."
     
+    except CPUBusy:
+        raise
     except Exception as e:
         logger.error(f"Unexpected error processing file: {e}", exc_info=True)
         return f"An unexpected error occurred while processing the file: {str(e)}"
 
 # For testing
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     bot = WaterConservationBot()
     if not bot.is_service_running():
         print("Error: Ollama service is not running")
@@ -10,12 +10,8 @@ import threading
 import queue
 import sys
 
-# Configure logging with UTF-8 encoding
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    encoding='utf-8'
-)
+from utils.bill_parser import parse_bill
+
 logger = logging.getLogger(__name__)
 
 class IntelligentBillAnalyzer:
@@ -95,39 +91,28 @@ class DetailedBillAnalyzer:
             bool: True if bill parsing was successful, False otherwise
         """
         try:
-            # Clean and normalize the text
-            bill_text = bill_text.replace(',', '.').replace(' ', '')
-            
-            # Extract key bill details using regex
-            details = {}
-            
-            # Bill basic information
-            details['bill_no'] = re.search(r'FATURANO:(\d+)', bill_text)
-            details['bill_date'] = re.search(r'FATURATARIHI:(\d{2}\.\d{2}\.\d{4})', bill_text)
-            details['period'] = re.search(r'DÖNEM(\d{4}-\d{2})', bill_text)
-            details['subscriber_no'] = re.search(r'ABONE NO(\d+)', bill_text)
+            bill = parse_bill(bill_text, provider='aski')
             
-            # Consumption details
-            details['last_index'] = re.search(r'SONENDEKS(\d+)', bill_text)
-            details['first_index'] = re.search(r'İLKENDEKS(\d+)', bill_text)
-            details['consumption'] = re.search(r'TÜKETIM\(m3\)(\d+\.\d+|\d+)', bill_text)
-            
-            # Financial details
-            details['water_cost'] = re.search(r'SUBEDELI\(TL\)(\d+\.\d+|\d+)', bill_text)
-            details['wastewater_cost'] = re.search(r'ATIKSUBEDELI\(TL\)(\d+\.\d+|\d+)', bill_text)
-            details['total_cost'] = re.search(r'TOPLAMBORC\(TL\)\(ANAPARA\)(\d+\.\d+|\d+)', bill_text)
-            
-            # Validate and convert details
-            parsed_details = {}
-            for key, value in details.items():
-                if value:
-                    parsed_details[key] = value.group(1)
+            # Report key -> utils.bill_parser field
+            fields = {
+                'bill_no': 'bill_number',
+                'bill_date': 'bill_date',
+                'period': 'billing_period',
+                'subscriber_no': 'subscriber_no',
+                'last_index': 'last_index',
+                'first_index': 'first_index',
+                'consumption': 'consumption',
+                'water_cost': 'water_cost',
+                'wastewater_cost': 'wastewater_cost',
+                'total_cost': 'total_amount'
+            }
+            parsed_details = {key: bill.text(field) for key, field in fields.items() if field in bill.values}
             
             # Store detailed information
             self.detailed_info = parsed_details
             
             # Extract month and year for bill data
-            if 'period' in parsed_details:
+            if re.fullmatch(r'\d{4}-\d{2}', parsed_details.get('period', '')):
                 year, month = parsed_details['period'].split('-')
                 month_names = {
                     '01': 'ocak', '02': 'şubat', '03': 'mart', 
@@ -1,8 +1,7 @@
 import requests
 import json
-import matplotlib.pyplot as plt
-import numpy as np
-import base64
+from utils.cpu_executor import run_cpu_task, CPUBusy
+from utils import cpu_tasks
 
 class OllamaDataAnalyzer:
     def __init__(self, ollama_url='http://localhost:11434/api/chat'):
@@ -60,30 +59,9 @@ class OllamaDataAnalyzer:
         :param chart_type: Type of chart to create (bar, pie, line)
         :return: Path to saved visualization
         """
-        plt.figure(figsize=(10, 6))
-        plt.title('Data Visualization')
-        
-        if chart_type == 'bar':
-            categories = list(data.keys()) if isinstance(data, dict) else range(len(data))
-            values = list(data.values()) if isinstance(data, dict) else data
-            plt.bar(categories, values)
-            plt.xlabel('Categories')
-            plt.ylabel('Values')
-        
-        elif chart_type == 'pie':
-            categories = list(data.keys()) if isinstance(data, dict) else range(len(data))
-            values = list(data.values()) if isinstance(data, dict) else data
-            plt.pie(values, labels=categories, autopct='%1.1f%%')
-        
-        elif chart_type == 'line':
-            plt.plot(data)
-            plt.xlabel('Index')
-            plt.ylabel('Value')
-        
-        plt.tight_layout()
         visualization_path = 'c:/Users/Jestboi/Desktop/test/static/images/data_visualization.png'
-        plt.savefig(visualization_path)
-        plt.close()
+        # Rendering runs on the shared CPU executor, off the request thread
+        run_cpu_task('plot', cpu_tasks.render_chart, data, chart_type, visualization_path)
         
         return visualization_path
     
@@ -167,59 +145,11 @@ class OllamaDataAnalyzer:
             if code_match:
                 graph_code = code_match.group(1)
             
-            # Prepare execution environment
-            import matplotlib
-            matplotlib.use('Agg')
-            import matplotlib.pyplot as plt
-            import pandas as pd
-            import io
             import traceback
             
-            # Safe default graph function
-            def create_default_graph():
-                plt.figure(figsize=(10, 6))
-                default_data = pd.DataFrame({
-                    'Category': ['A', 'B', 'C'],
-                    'Values': [10, 15, 7]
-                })
-                plt.bar(default_data['Category'], default_data['Values'])
-                plt.title('Fallback Graph')
-                plt.xlabel('Categories')
-                plt.ylabel('Values')
-                plt.tight_layout()
-                
-                buf = io.BytesIO()
-                plt.savefig(buf, format='png')
-                buf.seek(0)
-                fallback_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-                plt.close()
-                return fallback_base64
-            
-            # Capture plot in a bytes buffer
-            buf = io.BytesIO()
-            
             try:
-                # Validate code
-                if not graph_code.strip():
-                    raise ValueError("Empty graph code")
-                
-                # Create a safe namespace
-                namespace = {
-                    'plt': plt, 
-                    'pd': pd, 
-                    'np': np
-                }
-                
-                # Execute the code
-                exec(graph_code, namespace)
-                
-                # Save the plot
-                plt.tight_layout()
-                plt.savefig(buf, format='png')
-                buf.seek(0)
-                
-                # Convert to base64
-                graph_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
+                # Model-generated code runs in a worker process with a timeout
+                graph_base64 = run_cpu_task('plot', cpu_tasks.render_graph_code, graph_code)
                 
                 return {
                     "status": "success",
@@ -228,13 +158,15 @@ class OllamaDataAnalyzer:
                     "raw_ollama_output": raw_ollama_output  # Add raw output to the response
                 }
             
+            except CPUBusy:
+                raise
             except Exception as e:
                 print(f"Code Execution Error: {e}")
                 print(f"Traceback: {traceback.format_exc()}")
                 print(f"Problematic Code:\n{graph_code}")
                 
                 # Create and return fallback graph
-                fallback_base64 = create_default_graph()
+                fallback_base64 = run_cpu_task('plot', cpu_tasks.render_default_graph)
                 
                 return {
                     "status": "error",
@@ -242,8 +174,6 @@ class OllamaDataAnalyzer:
                     "graph_image": fallback_base64,
                     "raw_ollama_output": raw_ollama_output  # Add raw output to the response
                 }
-            finally:
-                plt.close('all')
     
         except requests.exceptions.RequestException as e:
             return {
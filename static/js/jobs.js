@@ -0,0 +1,65 @@
+// Helpers for endpoints that queue a background job and answer 202 with a job ID,
+// or stream their results as NDJSON
+
+function sleep(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+// Resolve a fetch response to its JSON body, polling the job result if it was queued.
+// Throws if the queued job fails.
+async function resolveJob(response, options = {}) {
+    const interval = options.interval || 1000;
+    const onProgress = options.onProgress;
+
+    if (response.status !== 202) {
+        return response.json();
+    }
+
+    const job = await response.json();
+    while (true) {
+        await sleep(interval);
+        const result = await fetch(job.result_url);
+        const data = await result.json();
+
+        if (result.status === 202) {
+            if (onProgress) {
+                onProgress(data);
+            }
+            continue;
+        }
+        if (!result.ok) {
+            throw new Error(data.error || 'Job failed');
+        }
+        return data;
+    }
+}
+
+// Call onLine with each JSON line of an NDJSON response as soon as it arrives
+async function readNDJSON(response, onLine) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        for (const line of lines) {
+            if (line.trim()) {
+                onLine(JSON.parse(line));
+            }
+        }
+
+        if (done) {
+            if (buffer.trim()) {
+                onLine(JSON.parse(buffer));
+            }
+            return;
+        }
+    }
+}
+
+window.resolveJob = resolveJob;
+window.readNDJSON = readNDJSON;
@@ -1,9 +1,10 @@
-import re
 import logging
 from typing import Dict, Any, List, Optional
-import boto3
 import json
 
+from utils.bill_parser import parse_bill
+from utils.turkish_text import fold_ascii
+
 class AdvancedBillAnalyzer:
     def __init__(self, language='tr'):
         """
@@ -14,7 +15,17 @@ class AdvancedBillAnalyzer:
         """
         self.language = language
         self.logger = logging.getLogger(__name__)
-        self.textract_client = boto3.client('textract')
+        self._textract_client = None
+    
+    @property
+    def textract_client(self):
+        """
+        Textract client, created on first use so text-only parsing needs no AWS setup
+        """
+        if self._textract_client is None:
+            import boto3
+            self._textract_client = boto3.client('textract')
+        return self._textract_client
     
     def normalize_turkish(self, text: str) -> str:
         """
@@ -26,14 +37,7 @@ class AdvancedBillAnalyzer:
         Returns:
             str: Normalized text
         """
-        replacements = {
-            'İ': 'I', 'ı': 'i', 'Ş': 'S', 'ş': 's', 
-            'Ğ': 'G', 'ğ': 'g', 'Ü': 'U', 'ü': 'u', 
-            'Ö': 'O', 'ö': 'o', 'Ç': 'C', 'ç': 'c'
-        }
-        for turkish, normalized in replacements.items():
-            text = text.replace(turkish, normalized)
-        return text
+        return fold_ascii(text)
     
     def extract_text_from_image(self, image_path: str) -> str:
         """
@@ -72,48 +76,38 @@ class AdvancedBillAnalyzer:
         Returns:
             Dict with parsed bill details
         """
-        # Parsing patterns for water bill
-        bill_details = {
-            'bill_number': re.findall(r'FATURA NO[:]*\s*(\d+)', bill_text),
-            'subscriber_number': re.findall(r'ABONE NO\s*(\d+)', bill_text),
-            'billing_period': re.findall(r'DONEM\s*(\d{4}-\d{2})', bill_text),
-            'total_consumption': re.findall(r'TUKETIM \(m3\)[:]*\s*(\d+(?:\.\d+)?)', bill_text),
-            'water_cost': re.findall(r'SU BEDELI \(TL\)[:]*\s*(\d+(?:\.\d+)?)', bill_text),
-            'wastewater_cost': re.findall(r'ATIKSU BEDELI \(TL\)[:]*\s*(\d+(?:\.\d+)?)', bill_text),
-            'total_bill': re.findall(r'TOPLAM BORC \(TL\)[:]*\s*(\d+(?:\.\d+)?)', bill_text),
-            'reading_days': re.findall(r'OKUMA GUN SAYISI[:]*\s*(\d+)', bill_text)
-        }
-
-        # Safe extraction helper
-        def safe_extract(data_list, default='N/A'):
-            return data_list[0] if data_list else default
-
-        # Compute derived metrics
-        total_consumption = float(safe_extract(bill_details['total_consumption'], '0'))
-        water_cost = float(safe_extract(bill_details['water_cost'], '0'))
-        wastewater_cost = float(safe_extract(bill_details['wastewater_cost'], '0'))
-        total_bill = float(safe_extract(bill_details['total_bill'], '0'))
-        reading_days = int(safe_extract(bill_details['reading_days'], '1'))
-
-        # Prevent division by zero
-        cost_per_cubic_meter = water_cost / total_consumption if total_consumption > 0 else 0
-        daily_average = total_consumption / reading_days if reading_days > 0 else 0
-
-        # Structured analysis output
         return {
             'raw_text': bill_text,
-            'details': {
-                'bill_number': safe_extract(bill_details['bill_number']),
-                'subscriber_number': safe_extract(bill_details['subscriber_number']),
-                'billing_period': safe_extract(bill_details['billing_period']),
-                'total_consumption': total_consumption,
-                'water_cost': water_cost,
-                'wastewater_cost': wastewater_cost,
-                'total_bill': total_bill,
-                'reading_days': reading_days,
-                'cost_per_cubic_meter': cost_per_cubic_meter,
-                'daily_average': daily_average
-            }
+            'details': self.bill_details(bill_text)
+        }
+    
+    def bill_details(self, bill_text: str) -> Dict[str, Any]:
+        """
+        Water bill fields and derived metrics from the shared bill parser
+        
+        Args:
+            bill_text (str): Extracted bill text
+        
+        Returns:
+            Dict of bill details, 'N/A' or 0 where a field was not found
+        """
+        bill = parse_bill(bill_text)
+        
+        total_consumption = bill.number('consumption')
+        water_cost = bill.number('water_cost')
+        reading_days = bill.get('reading_days') or 1
+        
+        return {
+            'bill_number': bill.text('bill_number'),
+            'subscriber_number': bill.text('subscriber_no'),
+            'billing_period': bill.text('billing_period'),
+            'total_consumption': total_consumption,
+            'water_cost': water_cost,
+            'wastewater_cost': bill.number('wastewater_cost'),
+            'total_bill': bill.number('total_amount'),
+            'reading_days': reading_days,
+            'cost_per_cubic_meter': water_cost / total_consumption if total_consumption > 0 else 0,
+            'daily_average': total_consumption / reading_days
         }
     
     def analyze_water_bill(self, image_path: str) -> Dict[str, Any]:
@@ -155,40 +149,22 @@ class AdvancedBillAnalyzer:
         # Normalize text
         normalized_text = analyzer.normalize_turkish(text)
         
-        # Parsing patterns for water bill
-        bill_details = {
-            'bill_number': re.findall(r'FATURA NO[:]*\s*(\d+)', normalized_text),
-            'subscriber_number': re.findall(r'ABONE NO\s*(\d+)', normalized_text),
-            'billing_period': re.findall(r'DONEM\s*(\d{4}-\d{2})', normalized_text),
-            'total_consumption': re.findall(r'TUKETIM \(m3\)[:]*\s*(\d+(?:\.\d+)?)', normalized_text),
-            'water_cost': re.findall(r'SU BEDELI \(TL\)[:]*\s*(\d+(?:\.\d+)?)', normalized_text),
-            'wastewater_cost': re.findall(r'ATIKSU BEDELI \(TL\)[:]*\s*(\d+(?:\.\d+)?)', normalized_text),
-            'total_bill': re.findall(r'TOPLAM BORC \(TL\)[:]*\s*(\d+(?:\.\d+)?)', normalized_text),
-            'reading_days': re.findall(r'OKUMA GUN SAYISI[:]*\s*(\d+)', normalized_text)
-        }
-
-        # Safe extraction helper
-        def safe_extract(data_list, default='N/A'):
-            return data_list[0] if data_list else default
-
-        # Compute derived metrics
-        total_consumption = float(safe_extract(bill_details['total_consumption'], '0'))
-        water_cost = float(safe_extract(bill_details['water_cost'], '0'))
-        wastewater_cost = float(safe_extract(bill_details['wastewater_cost'], '0'))
-        total_bill = float(safe_extract(bill_details['total_bill'], '0'))
-        reading_days = int(safe_extract(bill_details['reading_days'], '1'))
-
-        # Prevent division by zero
-        cost_per_cubic_meter = water_cost / total_consumption if total_consumption > 0 else 0
-        daily_average = total_consumption / reading_days if reading_days > 0 else 0
+        details = analyzer.bill_details(normalized_text)
+        total_consumption = details['total_consumption']
+        daily_average = details['daily_average']
+        reading_days = details['reading_days']
+        water_cost = details['water_cost']
+        wastewater_cost = details['wastewater_cost']
+        total_bill = details['total_bill']
+        cost_per_cubic_meter = details['cost_per_cubic_meter']
 
         # Structured analysis output
         analysisOutput = f"""Bill Analysis 1 Successfully Processed
 
 Bill Details
-- Fatura Numarası: {safe_extract(bill_details['bill_number'])}
-- Abone Numarası: {safe_extract(bill_details['subscriber_number'])}
-- Fatura Dönemi: {safe_extract(bill_details['billing_period'])}
+- Fatura Numarası: {details['bill_number']}
+- Abone Numarası: {details['subscriber_number']}
+- Fatura Dönemi: {details['billing_period']}
 
 Tüketim Analizi
 - Toplam Tüketim: {total_consumption:.2f} m³
@@ -214,18 +190,7 @@ Ek Açıklamalar:
             'raw_text': normalized_text,
             'analysisOutput': analysisOutput,
             'bill_type': 'water_bill',
-            'details': {
-                'bill_number': safe_extract(bill_details['bill_number']),
-                'subscriber_number': safe_extract(bill_details['subscriber_number']),
-                'billing_period': safe_extract(bill_details['billing_period']),
-                'total_consumption': total_consumption,
-                'water_cost': water_cost,
-                'wastewater_cost': wastewater_cost,
-                'total_bill': total_bill,
-                'reading_days': reading_days,
-                'cost_per_cubic_meter': cost_per_cubic_meter,
-                'daily_average': daily_average
-            }
+            'details': details
         }
 
 def analyze_water_bill(image_path: str) -> Dict[str, Any]:
@@ -1,9 +1,13 @@
 import boto3
 import os
-import re
 import json
 from typing import Dict, List, Union
 from werkzeug.utils import secure_filename
+from utils.bill_parser import parse_bill
+from utils.extraction_cache import cached_extraction
+
+# Bump when the output of _detect_document_text changes
+TEXTRACT_EXTRACTOR_VERSION = 1
 
 class AWSBillAnalyzer:
     def __init__(self, upload_folder, region_name='us-east-1'):
@@ -30,6 +34,13 @@ class AWSBillAnalyzer:
         Returns:
             Dict: Detected text and metadata
         """
+        # Results are cached by content hash, so a re-uploaded document is not sent to Textract again
+        return cached_extraction(
+            document_path, 'aws-textract', TEXTRACT_EXTRACTOR_VERSION,
+            lambda: self._call_textract(document_path)
+        )
+
+    def _call_textract(self, document_path: str) -> Dict:
         # Read document bytes
         with open(document_path, 'rb') as document:
             document_bytes = document.read()
@@ -61,7 +72,7 @@ class AWSBillAnalyzer:
 
     def _parse_bill_details(self, full_text: str) -> Dict[str, str]:
         """
-        Parse bill details from extracted text using advanced regex and pattern matching
+        Parse bill details from extracted text with the shared single-pass bill parser
         
         Args:
             full_text (str): Full extracted text
@@ -69,44 +80,18 @@ class AWSBillAnalyzer:
         Returns:
             Dict of parsed bill details
         """
-        # Predefined regex patterns for bill details
-        patterns = {
-            'total_amount': [
-                r'(?:Total|Toplam)\s*(?:Amount|Tutar)[:]*\s*[₺$]*\s*(\d+(?:\.\d{1,2})?)',
-                r'(?:Fatura|Invoice)\s*(?:Tutarı|Amount)[:]*\s*[₺$]*\s*(\d+(?:\.\d{1,2})?)'
-            ],
-            'billing_period': [
-                r'(?:Billing|Fatura)\s*(?:Period|Dönemi)[:]*\s*(\w+\s*\d{4}\s*-\s*\w+\s*\d{4})',
-                r'(?:Dönem|Period)[:]*\s*(\d{2}/\d{4}\s*-\s*\d{2}/\d{4})'
-            ],
-            'water_consumption': [
-                r'(?:Water|Su)\s*(?:Consumption|Tüketimi)[:]*\s*(\d+(?:\.\d{1,2})?)\s*(?:m3|cubic\s*meters)',
-                r'(?:Tüketim|Consumption)[:]*\s*(\d+(?:\.\d{1,2})?)\s*m3'
-            ],
-            'tax_rate': [
-                r'(?:Tax|Vergi)\s*(?:Rate|Oranı)[:]*\s*(\d+(?:\.\d{1,2})?)%',
-                r'(?:KDV|VAT)\s*(?:Oranı|Rate)[:]*\s*(%\d+(?:\.\d{1,2})?)'
-            ],
-            'customer_name': [
-                r'(?:Müşteri|Customer)\s*(?:Adı|Name)[:]*\s*([A-ZÇŞĞÜİÖa-zçşğüıö\s]+)',
-                r'(?:Ad\s*Soyad|Full\s*Name)[:]*\s*([A-ZÇŞĞÜİÖa-zçşğüıö\s]+)'
-            ],
-            'address': [
-                r'(?:Adres|Address)[:]*\s*([A-ZÇŞĞÜİÖa-zçşğüıö\s\d,.-]+)',
-                r'(?:Lokasyon|Location)[:]*\s*([A-ZÇŞĞÜİÖa-zçşğüıö\s\d,.-]+)'
-            ]
-        }
-        
-        # Extract details
-        bill_details = {}
-        for key, pattern_list in patterns.items():
-            for pattern in pattern_list:
-                match = re.search(pattern, full_text, re.IGNORECASE | re.UNICODE)
-                if match:
-                    bill_details[key] = match.group(1)
-                    break
+        bill = parse_bill(full_text)
         
-        return bill_details
+        # Output key -> utils.bill_parser field; only found fields are returned
+        fields = {
+            'total_amount': 'total_amount',
+            'billing_period': 'billing_period',
+            'water_consumption': 'consumption',
+            'tax_rate': 'tax_rate',
+            'customer_name': 'subscriber_name',
+            'address': 'address'
+        }
+        return {key: bill.text(field) for key, field in fields.items() if field in bill.values}
 
     def process_bill(self, file_path: str) -> Dict[str, Union[str, bool]]:
         """
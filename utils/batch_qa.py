@@ -0,0 +1,294 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Any, Iterator, List, Optional, Tuple
+
+from utils.job_queue import JobQueue
+from utils.turkish_text import search_key
+
+logger = logging.getLogger(__name__)
+
+ROLES = ('education', 'farmer')
+
+JOB_KIND = 'batch_qa'
+
+
+def normalize_question(question: str) -> str:
+    """Collapse whitespace, case and Turkish accents so repeated worksheet questions dedupe."""
+    return search_key(question)
+
+
+def unique_questions(questions: List[str]) -> List[Dict[str, Any]]:
+    """
+    Unique questions in first-seen order, with every position they were asked at
+
+    Returns:
+        Dicts with key (normalized question), question and indices
+    """
+    unique = OrderedDict()
+    for index, question in enumerate(questions):
+        key = normalize_question(question)
+        if key not in unique:
+            unique[key] = {'key': key, 'question': question.strip(), 'indices': []}
+        unique[key]['indices'].append(index)
+    return list(unique.values())
+
+
+class BatchQAService:
+    def __init__(self,
+                 answer_fn: Callable[[str, str], Tuple[Optional[str], Optional[str], str]],
+                 job_queue: JobQueue,
+                 max_workers: int = 4,
+                 cache_size: int = 2048,
+                 timeout: Optional[float] = None,
+                 poll_interval: float = 0.5):
+        """
+        Answer question batches as jobs of the shared job queue
+
+        A batch is a 'batch_qa' job; answers are written to the queue's
+        SQLite database as they complete, so any worker process can report
+        or stream a batch, and a batch interrupted by a worker restart
+        resumes with the questions it had not answered yet.
+
+        Args:
+            answer_fn: Callable (question, role) -> (answer, error, source)
+            job_queue (JobQueue): Queue the batches run on
+            max_workers (int): Questions answered concurrently across all jobs of this process
+            cache_size (int): Answers kept in this process's (role, question) cache
+            timeout (float, optional): Seconds a batch attempt may run; the queue's default when omitted
+            poll_interval (float): Seconds between checks for new answers while streaming
+        """
+        self.answer_fn = answer_fn
+        self.job_queue = job_queue
+        self.cache_size = cache_size
+        self.poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch-qa')
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+        job_queue.register(JOB_KIND, self._run, timeout=timeout)
+
+    def _connection(self) -> sqlite3.Connection:
+        """The job queue's connection for this thread, with the batch tables created on first use."""
+        conn = self.job_queue.connection()
+        if not self._schema_ready:
+            with self._lock:
+                if not self._schema_ready:
+                    self._init_db(conn)
+                    self._schema_ready = True
+        return conn
+
+    def _init_db(self, conn: sqlite3.Connection):
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS batch_jobs (
+                id TEXT PRIMARY KEY,
+                role TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                unique_count INTEGER NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS batch_results (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                result TEXT NOT NULL,
+                UNIQUE (job_id, position)
+            )
+        ''')
+
+    def submit(self, questions: List[str], role: str) -> str:
+        """
+        Queue a batch of questions
+
+        Args:
+            questions (List[str]): Questions in submission order
+            role (str): Chat role answering the questions
+
+        Returns:
+            Job ID to poll or stream
+        """
+        unique = unique_questions(questions)
+        self._expire_jobs()
+        job_id = uuid.uuid4().hex
+        conn = self._connection()
+        # One transaction, so neither a worker nor a status poll sees the job without its batch row
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT INTO batch_jobs (id, role, total, unique_count) VALUES (?, ?, ?, ?)',
+                (job_id, role, len(questions), len(unique))
+            )
+            self.job_queue.enqueue(JOB_KIND, {'job_id': job_id, 'role': role, 'unique': unique}, job_id=job_id)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        logger.info(f"Batch job {job_id}: {len(questions)} questions, {len(unique)} unique")
+        return job_id
+
+    def get_job(self, job_id: str, include_results: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Status of a batch and the answers collected so far, or None if it does not exist
+
+        Args:
+            job_id (str): Job ID returned by submit()
+            include_results (bool): Whether to include the answers
+        """
+        job = self.job_queue.get(job_id, include_result=False)
+        if job is None or job['kind'] != JOB_KIND:
+            return None
+        conn = self._connection()
+        batch = conn.execute('SELECT * FROM batch_jobs WHERE id = ?', (job_id,)).fetchone()
+        if batch is None:
+            return None
+
+        completed = conn.execute('SELECT COUNT(*) FROM batch_results WHERE job_id = ?', (job_id,)).fetchone()[0]
+        data = {
+            'job_id': job_id,
+            'role': batch['role'],
+            'status': job['status'],
+            'total': batch['total'],
+            'unique': batch['unique_count'],
+            'completed': completed
+        }
+        if job['status'] == 'failed':
+            data['error'] = job['error']
+        if include_results:
+            data['results'] = [result for _, result in self._results(job_id)]
+        return data
+
+    def iter_results(self, job_id: str, timeout: float = 300) -> Iterator[Dict[str, Any]]:
+        """
+        Yield answers as they complete, including those already available
+
+        Args:
+            job_id (str): Job ID returned by submit()
+            timeout (float): Seconds to wait for the next answer before giving up
+        """
+        sent, waited = 0, 0.0
+        while True:
+            job = self.job_queue.get(job_id, include_result=False)
+            done = job is None or job['status'] in ('completed', 'failed')
+            pending = self._results(job_id, after=sent)
+            for seq, result in pending:
+                sent = seq
+                yield result
+            if done:
+                return
+            if pending:
+                waited = 0.0
+            elif waited >= timeout:
+                return
+            time.sleep(self.poll_interval)
+            waited += self.poll_interval
+
+    def _results(self, job_id: str, after: int = 0) -> List[Tuple[int, Dict[str, Any]]]:
+        rows = self._connection().execute(
+            'SELECT seq, result FROM batch_results WHERE job_id = ? AND seq > ? ORDER BY seq',
+            (job_id, after)
+        ).fetchall()
+        return [(row['seq'], json.loads(row['result'])) for row in rows]
+
+    def _run(self, payload: Dict[str, Any], progress: Callable) -> Dict[str, Any]:
+        """Job handler: answer the questions of a batch not answered by an earlier attempt."""
+        conn = self._connection()
+        job_id = payload['job_id']
+        role = payload['role']
+        unique = payload['unique']
+        answered = {row['position'] for row in conn.execute(
+            'SELECT position FROM batch_results WHERE job_id = ?', (job_id,)
+        )}
+
+        def record(position, answer, error, source):
+            entry = unique[position]
+            result = {
+                'question': entry['question'],
+                'indices': entry['indices'],
+                'answer': answer,
+                'error': error,
+                'source': source
+            }
+            conn.execute(
+                'INSERT OR IGNORE INTO batch_results (job_id, position, result) VALUES (?, ?, ?)',
+                (job_id, position, json.dumps(result, ensure_ascii=False))
+            )
+            answered.add(position)
+            progress(len(answered) / len(unique))
+
+        futures = {}
+        for position, entry in enumerate(unique):
+            if position in answered:
+                continue
+            cached = self._cached(role, entry['key'])
+            if cached is not None:
+                record(position, cached, None, 'cache')
+            else:
+                futures[self._executor.submit(self._answer, entry, role)] = position
+
+        try:
+            for future in as_completed(futures):
+                record(futures[future], *future.result())
+        finally:
+            for future in futures:
+                future.cancel()
+
+        return {'total': sum(len(entry['indices']) for entry in unique), 'unique': len(unique)}
+
+    def _answer(self, entry: Dict[str, Any], role: str) -> Tuple[Optional[str], Optional[str], str]:
+        try:
+            answer, error, source = self.answer_fn(entry['question'], role)
+        except Exception as e:
+            logger.error(f"Batch question failed: {e}")
+            answer, error, source = None, str(e), 'error'
+
+        if answer and not error:
+            self._store(role, entry['key'], answer)
+        return answer, error, source
+
+    def _cached(self, role: str, key: str) -> Optional[str]:
+        with self._lock:
+            answer = self._cache.get((role, key))
+            if answer is not None:
+                self._cache.move_to_end((role, key))
+            return answer
+
+    def _store(self, role: str, key: str, answer: str):
+        with self._lock:
+            self._cache[(role, key)] = answer
+            self._cache.move_to_end((role, key))
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _expire_jobs(self):
+        """Drop the answers of batches the job queue has already cleaned up."""
+        conn = self._connection()
+        conn.execute('DELETE FROM batch_results WHERE job_id NOT IN (SELECT id FROM jobs)')
+        conn.execute('DELETE FROM batch_jobs WHERE id NOT IN (SELECT id FROM jobs)')
+
+
+def create_batch_qa_service(answer_fn, job_queue: JobQueue) -> BatchQAService:
+    """
+    Factory function to create a BatchQAService from environment settings
+
+    Args:
+        answer_fn: Callable (question, role) -> (answer, error, source)
+        job_queue (JobQueue): Queue the batches run on
+
+    Returns:
+        BatchQAService instance
+    """
+    return BatchQAService(
+        answer_fn,
+        job_queue,
+        max_workers=int(os.getenv('BATCH_QA_CONCURRENCY', '4')),
+        cache_size=int(os.getenv('BATCH_QA_CACHE_SIZE', '2048')),
+        timeout=float(os.getenv('BATCH_QA_TIMEOUT', '1800'))
+    )
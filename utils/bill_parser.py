@@ -0,0 +1,349 @@
+"""
+Single-pass bill field parser
+
+Fields are declared once per provider as FieldSpecs: the labels a value is
+printed after (as regexes over normalized text, where a space means
+"optional whitespace" so OCR text with spaces stripped still matches),
+the kind of value, and how much a match is trusted. Each provider's labels
+are compiled into one alternation; parsing is a single finditer over the
+normalized text, and at each label hit the value regex of its kind is
+matched right after it. Values come back typed: Decimal amounts and
+volumes (m³), dates, ints, strings, each with a confidence score.
+
+Every bill parser in the app (IntelligentBillAnalyzer, AdvancedBillAnalyzer,
+AWSBillAnalyzer, WaterTaxExpert, DetailedBillAnalyzer, bill_report) reads
+its fields from parse_bill and only maps them to its own output keys.
+"""
+import re
+import logging
+from datetime import date, time
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, List, Optional, Pattern, Sequence, Tuple
+
+from utils.turkish_text import fold_ocr_digits, fold_upper, parse_number
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_bill_text(text: str) -> str:
+    """Upper-case ASCII with OCR digit confusions undone; the same length as text so offsets carry over."""
+    return fold_upper(fold_ocr_digits(text))
+
+
+def parse_volume(value: str) -> Decimal:
+    """Decimal m³ from '4', '4.000' or '17,5'; meters print three decimals, never thousands."""
+    return Decimal(value.replace(',', '.'))
+
+
+def parse_date(value: str) -> date:
+    day, month, year = re.split(r'[./-]', value)
+    return date(int(year), int(month), int(day))
+
+
+def parse_time(value: str) -> time:
+    return time(*(int(part) for part in value.split(':')))
+
+
+def parse_period(value: str) -> str:
+    return re.sub(r'\s*-\s*', ' - ', value.strip()) if '/' in value or ' ' in value.strip() else value.strip()
+
+
+# Value regex and converter per field kind
+KINDS: Dict[str, Tuple[str, Callable[[str], Any]]] = {
+    'id': (r'\d{3,}', str),
+    'count': (r'\d+', int),
+    # Grouped thousands first: the plain form would otherwise backtrack to the first digit of '1.250'
+    'amount': (r'\d{1,3}(?:\.\d{3})+,\d{1,2}|\d{1,3}(?:,\d{3})+\.\d{1,2}'
+               r'|\d{1,3}(?:\.\d{3})+(?![\d,])|\d{1,3}(?:,\d{3})+(?![\d.])|\d+(?:[.,]\d{1,2})?(?!\d)', parse_number),
+    'volume': (r'\d+(?:[.,]\d+)?', parse_volume),
+    'percent': (r'%?\s*\d+(?:[.,]\d{1,2})?\s*%?', lambda value: Decimal(value.strip('% ').replace(',', '.'))),
+    'date': (r'\d{2}[./-]\d{2}[./-]\d{4}', parse_date),
+    'time': (r'\d{2}:\d{2}(?::\d{2})?', parse_time),
+    'period': (r'\d{4}-\d{2}|\d{2}/\d{4}\s*-\s*\d{2}/\d{4}|[A-Z]+\s*\d{4}\s*-\s*[A-Z]+\s*\d{4}', parse_period),
+    'text': (r'[^\n]*[^\s\n]', str),
+}
+
+UNITS = {'volume': 'm³', 'amount': 'TL'}
+
+# Between a label and its value; free text must start on the label's line
+_SEPARATOR = re.compile(r'[\s:=₺$]*')
+_TEXT_SEPARATOR = re.compile(r'[ \t:=]*')
+
+# What a space in a label matches
+_LABEL_SPACE = r'[ \t]*'
+
+
+class FieldSpec:
+    def __init__(self, name: str, kind: str, labels: Sequence[str], confidence: float = 1.0,
+                 unit: Optional[str] = None):
+        """
+        How one field is printed on a bill
+
+        Args:
+            name (str): Canonical field name
+            kind (str): Value kind, a key of KINDS
+            labels (list): Label regexes over normalized text; a space matches optional whitespace
+            confidence (float): Trust in a value found after these labels
+            unit (str, optional): Regex that must follow the value, e.g. r'M[3³]'
+        """
+        self.name = name
+        self.kind = kind
+        self.labels = list(labels)
+        self.confidence = confidence
+        self.unit = unit
+        value_pattern, self.convert = KINDS[kind]
+        unit_pattern = rf'\s*(?:{unit})' if unit else ''
+        self.value = re.compile(rf'({value_pattern}){unit_pattern}')
+
+
+class ProviderSpec:
+    def __init__(self, name: str, display_name: str, detect: str, fields: Sequence[FieldSpec]):
+        """
+        A provider's bill: how to recognize it and its own field labels
+
+        Args:
+            name (str): Provider key, e.g. 'aski'
+            display_name (str): Human readable provider name
+            detect (str): Regex over normalized text that identifies the provider
+            fields (list): FieldSpecs tried before the generic ones
+        """
+        self.name = name
+        self.display_name = display_name
+        self.detect = re.compile(detect)
+        self.fields = list(fields)
+
+
+GENERIC_FIELDS = [
+    FieldSpec('bill_number', 'id', ['FATURA NO', 'INVOICE NUMBER', 'INVOICE NO']),
+    FieldSpec('subscriber_no', 'id', ['ABONE NO', 'SUBSCRIBER NUMBER', 'SUBSCRIBER NO']),
+    FieldSpec('contract_no', 'id', ['SOZLESME NO', 'CONTRACT NO']),
+    FieldSpec('subscriber_name', 'text', ['ABONE ADI', 'MUSTERI ADI', 'CUSTOMER NAME', 'AD SOYAD', 'FULL NAME']),
+    FieldSpec('address', 'text', ['ADRESI', r'ADRES(?! ?KODU)', 'ADDRESS', 'LOKASYON', 'LOCATION'], 0.9),
+    FieldSpec('bill_date', 'date', ['FATURA TARIHI', 'INVOICE DATE']),
+    FieldSpec('notification_time', 'time', ['TEBLIGAT SAATI', 'TEBLIG SAATI']),
+    FieldSpec('payment_deadline', 'date', ['SON ODEME TARIHI', 'DUE DATE']),
+    FieldSpec('billing_period', 'period', ['FATURA DONEMI', r'DONEM(?! ?BORCU)', 'BILLING PERIOD', 'PERIOD']),
+    FieldSpec('last_index', 'count', ['SON ENDEKS', 'LAST INDEX']),
+    FieldSpec('first_index', 'count', ['ILK ENDEKS', 'FIRST INDEX']),
+    FieldSpec('consumption', 'volume', [r'TUKETIM \(M[3³]\)', r'CONSUMPTION \(M[3³]\)', 'SU TUKETIMI', 'WATER CONSUMPTION']),
+    FieldSpec('consumption', 'volume', ['TUKETIM', 'CONSUMPTION'], 0.9, unit=r'M[3³]|CUBIC METERS'),
+    FieldSpec('reading_days', 'count', ['OKUMA GUN SAYISI', 'READING DAYS']),
+    FieldSpec('water_cost', 'amount', [r'SU BEDELI \(1\. KADEME\)', r'SU BEDELI \(TL\)', 'SU BEDELI',
+                                       r'WATER COST \(TL\)', 'WATER COST']),
+    FieldSpec('wastewater_cost', 'amount', [r'ATIKSU BEDELI \(TL\)', 'ATIKSU BEDELI',
+                                            r'WASTEWATER COST \(TL\)', 'WASTEWATER COST']),
+    FieldSpec('environment_tax', 'amount', [r'CTV \(CEVRE TEMIZLIK VERGISI\)', r'CTV \(TL\)', 'CEVRE TEMIZLIK VERGISI']),
+    FieldSpec('water_vat', 'amount', [r'SU KDV \(?%1\)?(?: \(TL\))?']),
+    FieldSpec('wastewater_vat', 'amount', [r'ATIKSU KDV \(?%10\)?(?: \(TL\))?']),
+    FieldSpec('total_amount', 'amount', ['TOPLAM TUTAR', 'TOTAL AMOUNT', r'TOTAL BILL(?: \(TL\))?', 'ODENECEK TUTAR',
+                                         r'TOPLAM BORC \(TL\)(?: \(ANAPARA\))?']),
+    FieldSpec('total_amount', 'amount', ['FATURA TUTARI', 'INVOICE AMOUNT'], 0.85),
+    FieldSpec('tax_rate', 'percent', ['VERGI ORANI', 'TAX RATE', 'KDV ORANI', 'VAT RATE']),
+]
+
+PROVIDERS = [
+    ProviderSpec(
+        'aski', 'ASKİ Ankara Su ve Kanalizasyon İdaresi', r'\bASKI\b|ANKARA SU VE KANALIZASYON',
+        [
+            FieldSpec('total_amount', 'amount', ['TOPLAM BORC']),
+            FieldSpec('meter_no', 'id', ['SAYAC NO']),
+            FieldSpec('address_code', 'id', ['ADRES KODU']),
+        ]
+    ),
+]
+
+
+_LOOKAROUND = re.compile(r'\(\?<?[!=][^)]*\)')
+_REGEX_SYNTAX = re.compile(r'\(\?:|[()?*+|]')
+
+
+def _literal_length(label: str) -> int:
+    """Rough length of the text a label regex matches, so longer labels are tried first."""
+    return len(_REGEX_SYNTAX.sub('', _LOOKAROUND.sub('', label)).replace('\\', ''))
+
+
+class _Scanner:
+    def __init__(self, specs: Sequence[FieldSpec]):
+        """
+        All labels of a provider compiled into one alternation, longest labels first
+
+        Labels are grouped under their first letter so the regex engine
+        rejects most branches on one character comparison instead of
+        trying every label at every position.
+        """
+        alternatives = []
+        self.groups: Dict[str, FieldSpec] = {}
+        for spec_index, spec in enumerate(specs):
+            for label in spec.labels:
+                alternatives.append((label, spec_index, spec))
+        alternatives.sort(key=lambda item: (-_literal_length(item[0]), item[1]))
+
+        by_initial: Dict[str, list] = {}
+        for index, (label, _, spec) in enumerate(alternatives):
+            group = f'f{index}'
+            self.groups[group] = spec
+            initial = label[0] if label[0].isalnum() else ''
+            rest = label[1:] if initial else label
+            by_initial.setdefault(initial, []).append(f"(?P<{group}>{rest.replace(' ', _LABEL_SPACE)})")
+
+        parts = [f"{re.escape(initial)}(?:{'|'.join(branches)})" for initial, branches in by_initial.items()]
+        self.pattern: Pattern = re.compile('|'.join(parts))
+
+
+class ParsedBill:
+    def __init__(self, provider: Optional[str] = None):
+        """Typed field values of one bill and how confident each one is."""
+        self.provider = provider
+        self.values: Dict[str, Any] = {}
+        self.confidence: Dict[str, float] = {}
+        self.kinds: Dict[str, str] = {}
+
+    def offer(self, name: str, value: Any, confidence: float, kind: str):
+        """Keep value unless the field already has one at least as confident."""
+        if confidence > self.confidence.get(name, 0.0):
+            self.values[name] = value
+            self.confidence[name] = confidence
+            self.kinds[name] = kind
+
+    def merge(self, other: 'ParsedBill') -> 'ParsedBill':
+        for name, value in other.values.items():
+            self.offer(name, value, other.confidence[name], other.kinds[name])
+        self.provider = self.provider or other.provider
+        return self
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.values.get(name, default)
+
+    def text(self, name: str, default: str = 'N/A') -> str:
+        """A field as the plain string the older parsers returned."""
+        if name not in self.values:
+            return default
+        value = self.values[name]
+        if isinstance(value, date):
+            return value.strftime('%d.%m.%Y')
+        if isinstance(value, time):
+            return value.strftime('%H:%M:%S')
+        return str(value)
+
+    def number(self, name: str, default: float = 0.0) -> float:
+        value = self.values.get(name)
+        return float(value) if isinstance(value, (int, Decimal)) else default
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-safe form: values as strings, plus units and confidences."""
+        return {
+            'provider': self.provider,
+            'fields': {name: self.text(name) for name in self.values},
+            'units': {name: UNITS[kind] for name, kind in self.kinds.items() if kind in UNITS},
+            'confidence': dict(self.confidence)
+        }
+
+
+class BillParser:
+    def __init__(self, providers: Sequence[ProviderSpec] = PROVIDERS,
+                 generic_fields: Sequence[FieldSpec] = GENERIC_FIELDS):
+        """
+        Parser with one compiled scanner per provider plus one for unknown bills
+
+        Args:
+            providers (list): Known providers, tried in order
+            generic_fields (list): Fields every bill is searched for
+        """
+        self.providers = list(providers)
+        self._generic = _Scanner(generic_fields)
+        self._scanners = {provider.name: _Scanner(list(provider.fields) + list(generic_fields))
+                          for provider in self.providers}
+
+    def detect_provider(self, normalized: str) -> Optional[ProviderSpec]:
+        for provider in self.providers:
+            if provider.detect.search(normalized):
+                return provider
+        return None
+
+    def _scan(self, normalized: str, provider: Optional[str]):
+        """
+        Every label hit in normalized text, with the value match after it
+
+        Yields:
+            (FieldSpec, label match, value match or None when what follows
+            the label does not read as the field's kind)
+        """
+        if provider is None:
+            spec = self.detect_provider(normalized)
+            provider = spec.name if spec else None
+        scanner = self._scanners.get(provider, self._generic)
+
+        for label in scanner.pattern.finditer(normalized):
+            spec = scanner.groups[label.lastgroup]
+            separator = _TEXT_SEPARATOR if spec.kind == 'text' else _SEPARATOR
+            start = separator.match(normalized, label.end()).end()
+            yield spec, label, spec.value.match(normalized, start)
+
+    def parse(self, text: str, source_confidence: float = 1.0, provider: Optional[str] = None) -> ParsedBill:
+        """
+        Parse bill text in one pass
+
+        Args:
+            text (str): Bill text from a text layer, OCR or Textract
+            source_confidence (float): Trust in the text itself; multiplies each field's confidence
+            provider (str, optional): Provider key; detected from the text when omitted
+
+        Returns:
+            ParsedBill with typed values and confidences
+        """
+        normalized = normalize_bill_text(text or '')
+        if provider is None:
+            spec = self.detect_provider(normalized)
+            provider = spec.name if spec else None
+        offsets_match = len(normalized) == len(text or '')
+
+        result = ParsedBill(provider)
+        for spec, _, match in self._scan(normalized, provider):
+            if not match:
+                continue
+            raw = match.group(1)
+            if spec.kind == 'text':
+                # Free text keeps its original case and letters
+                raw = text[match.start(1):match.end(1)].strip() if offsets_match else raw.strip()
+            try:
+                value = spec.convert(raw)
+            except (ArithmeticError, InvalidOperation, ValueError):
+                continue
+            result.offer(spec.name, value, round(spec.confidence * source_confidence, 3), spec.kind)
+        return result
+
+    def locate(self, text: str, names: Sequence[str], provider: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Where the values of the named fields are printed in text, e.g. to map them back to OCR word boxes
+
+        Args:
+            text (str): Bill text
+            names (list): Field names to look for
+            provider (str, optional): Provider key; detected from the text when omitted
+
+        Returns:
+            Dicts with field, kind, label_end and value, the (start, end)
+            offsets of the value in text, or None when what follows the
+            label does not read as the field's kind
+        """
+        return [
+            {'field': spec.name, 'kind': spec.kind, 'label_end': label.end(),
+             'value': match.span(1) if match else None}
+            for spec, label, match in self._scan(normalize_bill_text(text or ''), provider) if spec.name in names
+        ]
+
+
+_bill_parser = None
+
+
+def get_bill_parser() -> BillParser:
+    """Get the process-wide BillParser, compiling its scanners on first use."""
+    global _bill_parser
+    if _bill_parser is None:
+        _bill_parser = BillParser()
+    return _bill_parser
+
+
+def parse_bill(text: str, source_confidence: float = 1.0, provider: Optional[str] = None) -> ParsedBill:
+    """Parse bill text with the shared parser; see BillParser.parse."""
+    return get_bill_parser().parse(text, source_confidence, provider)
@@ -0,0 +1,238 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from utils.bill_parser import parse_bill
+
+# Field labels for the rendered report, per output language
+LABELS = {
+    'en': {
+        'bill_details': 'Bill Details',
+        'bill_number': 'Bill Number',
+        'date': 'Date',
+        'account_number': 'Account Number',
+        'customer': 'Customer Information',
+        'name': 'Name',
+        'address': 'Address',
+        'consumption': 'Water Consumption',
+        'total_consumption': 'Total Consumption',
+        'billing_period': 'Billing Period',
+        'reading_days': 'Reading Days',
+        'financial': 'Financial Summary',
+        'water_charge': 'Water Charge',
+        'sewage_charge': 'Sewage Charge',
+        'total_bill': 'Total Bill',
+        'tips': 'Water Conservation Tips',
+        'missing': 'Not found',
+        'closing': 'By implementing these recommendations, you can reduce water consumption '
+                   'and lower your utility expenses.'
+    },
+    'tr': {
+        'bill_details': 'Fatura Bilgileri',
+        'bill_number': 'Fatura No',
+        'date': 'Tarih',
+        'account_number': 'Abone No',
+        'customer': 'Abone Bilgileri',
+        'name': 'Ad Soyad',
+        'address': 'Adres',
+        'consumption': 'Su Tüketimi',
+        'total_consumption': 'Toplam Tüketim',
+        'billing_period': 'Fatura Dönemi',
+        'reading_days': 'Okuma Gün Sayısı',
+        'financial': 'Mali Özet',
+        'water_charge': 'Su Bedeli',
+        'sewage_charge': 'Atıksu Bedeli',
+        'total_bill': 'Toplam Tutar',
+        'tips': 'Su Tasarrufu Önerileri',
+        'missing': 'Bulunamadı',
+        'closing': 'Bu önerileri uygulayarak su tüketiminizi ve faturanızı azaltabilirsiniz.'
+    }
+}
+
+# Used when the LLM is unavailable; never cached so the next request retries
+FALLBACK_TIPS = {
+    'en': [
+        "Check taps, toilets and pipes for leaks and repair them promptly.",
+        "Install low-flow showerheads and faucet aerators to cut usage by up to 30%.",
+        "Run washing machines and dishwashers only with full loads."
+    ],
+    'tr': [
+        "Musluk, rezervuar ve boruları sızıntıya karşı kontrol edip hemen onartın.",
+        "Düşük akışlı duş başlığı ve musluk perlatörü takarak tüketimi %30'a kadar azaltın.",
+        "Çamaşır ve bulaşık makinelerini yalnızca tam doluyken çalıştırın."
+    ]
+}
+
+def parse_bill_fields(bill_text: str) -> Dict[str, Any]:
+    """
+    Extract the report fields from bill text with the shared bill parser
+
+    Args:
+        bill_text (str): Extracted bill text
+
+    Returns:
+        Dict of report fields, None where a field was not found
+    """
+    bill = parse_bill(bill_text)
+
+    def text(name):
+        return bill.text(name) if name in bill.values else None
+
+    consumption = bill.get('consumption')
+    return {
+        'bill_number': text('bill_number'),
+        'date': text('bill_date'),
+        'account_number': text('subscriber_no'),
+        'name': text('subscriber_name'),
+        'address': text('address'),
+        'billing_period': text('billing_period'),
+        'total_consumption': float(consumption) if consumption is not None else None,
+        'reading_days': bill.get('reading_days'),
+        'water_charge': _money(bill.get('water_cost')),
+        'sewage_charge': _money(bill.get('wastewater_cost')),
+        'total_bill': _money(bill.get('total_amount'))
+    }
+
+
+def _money(value) -> Optional[float]:
+    try:
+        return round(float(value), 2) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def has_core_fields(fields: Dict[str, Any]) -> bool:
+    """Whether enough was parsed to render a report without the LLM."""
+    return fields.get('total_bill') is not None or fields.get('total_consumption') is not None
+
+
+def consumption_bucket(consumption: Optional[float]) -> str:
+    """Bucket monthly consumption (m³) so similar bills share cached tips."""
+    if consumption is None:
+        return 'unknown'
+    if consumption <= 5:
+        return 'low'
+    if consumption <= 10:
+        return 'moderate'
+    if consumption <= 20:
+        return 'high'
+    return 'very_high'
+
+
+def household_bucket(household_size) -> str:
+    """Bucket household size for the tips cache key."""
+    try:
+        size = int(household_size)
+    except (TypeError, ValueError):
+        return 'unknown'
+    if size <= 2:
+        return str(max(size, 1))
+    return '3-4' if size <= 4 else '5+'
+
+
+def season_for(billing_period: Optional[str], today: datetime = None) -> str:
+    """Season of the billing period ('YYYY-MM'), or of today if unknown."""
+    month = None
+    if billing_period:
+        try:
+            month = int(billing_period.split('-')[1])
+        except (IndexError, ValueError):
+            month = None
+    if month is None:
+        month = (today or datetime.now()).month
+
+    return {12: 'winter', 1: 'winter', 2: 'winter',
+            3: 'spring', 4: 'spring', 5: 'spring',
+            6: 'summer', 7: 'summer', 8: 'summer'}.get(month, 'autumn')
+
+
+def tips_profile(fields: Dict[str, Any], household_size=None, language: str = 'en') -> Tuple[str, str, str, str]:
+    """
+    Cache key for the conservation tips section
+
+    Args:
+        fields (Dict): Parsed bill fields
+        household_size: Number of people in the household, if known
+        language (str): Output language
+
+    Returns:
+        Tuple of (consumption bucket, household bucket, season, language)
+    """
+    return (
+        consumption_bucket(fields.get('total_consumption')),
+        household_bucket(household_size),
+        season_for(fields.get('billing_period')),
+        language if language in LABELS else 'en'
+    )
+
+
+class TipsCache:
+    def __init__(self, max_entries: int = 256):
+        """
+        Bounded LRU cache of generated tips keyed by tips_profile()
+
+        Args:
+            max_entries (int): Maximum number of profiles kept
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[str]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, tips: str):
+        with self._lock:
+            self._entries[key] = tips
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def render_bill_report(fields: Dict[str, Any], tips: str, language: str = 'en') -> str:
+    """
+    Render the structured bill report from parsed fields
+
+    Args:
+        fields (Dict): Parsed bill fields
+        tips (str): Conservation tips section body
+        language (str): Output language
+
+    Returns:
+        Report text in the same layout the LLM was asked to produce
+    """
+    labels = LABELS.get(language, LABELS['en'])
+
+    def show(key, suffix=''):
+        value = fields.get(key)
+        if value is None:
+            return labels['missing']
+        if isinstance(value, float):
+            value = f"{value:.2f}" if suffix == ' TRY' else f"{value:g}"
+        return f"{value}{suffix}"
+
+    def section(title, rows):
+        lines = [title, '-' * len(title)]
+        lines.extend(f"- {labels[key]}: {show(key, suffix)}" for key, suffix in rows)
+        return '\n'.join(lines)
+
+    sections = [
+        section(labels['bill_details'], [('bill_number', ''), ('date', ''), ('account_number', '')]),
+        section(labels['customer'], [('name', ''), ('address', '')]),
+        section(labels['consumption'], [('total_consumption', ' m³'), ('billing_period', ''), ('reading_days', '')]),
+        section(labels['financial'], [('water_charge', ' TRY'), ('sewage_charge', ' TRY'), ('total_bill', ' TRY')]),
+        '\n'.join([labels['tips'], '-' * len(labels['tips']), tips.strip()]),
+        labels['closing']
+    ]
+    return '\n\n'.join(sections)
+
+
+def fallback_tips(language: str = 'en') -> str:
+    """Static tips section used when no generated tips are available."""
+    tips = FALLBACK_TIPS.get(language, FALLBACK_TIPS['en'])
+    return '\n'.join(f"{i}. {tip}" for i, tip in enumerate(tips, 1))
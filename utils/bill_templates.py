@@ -0,0 +1,277 @@
+"""
+Region-of-interest OCR for bills with a known printed layout
+
+A BillTemplate describes one provider's bill: anchor words that only occur
+once on the page, and the boxes its fields are printed in, both in the
+pixel frame of a reference scan. A page is OCRed once at low resolution to
+find the anchors; a template matches when enough of its anchors are found
+where the layout puts them, and the fitted scale and offset map the field
+boxes onto the page. Each field is then OCRed alone as a single line with a
+character whitelist for its kind, which is much faster and more reliable
+than searching full-page OCR text with regexes.
+
+Pages that match no template, or where too few fields validate, return
+None so callers fall back to full-page OCR. Further layouts (ISKI, ...) are
+added with register_template.
+"""
+import os
+import re
+import time
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from utils.bill_parser import KINDS
+from utils.ocr_engine import get_ocr_engine
+from utils.turkish_text import fold_upper, parse_number
+
+logger = logging.getLogger(__name__)
+
+# 'auto' uses templates only with the warm tesserocr engine (one tesseract
+# process per field would be slower than one full page), 'on' always, 'off' never
+OCR_TEMPLATES = os.getenv('OCR_TEMPLATES', 'auto').lower()
+
+# Anchors are found on a copy scaled by this factor
+_ANCHOR_SCALE = 0.5
+
+# Largest anchor misplacement after fitting, as a fraction of the page height
+_MAX_ANCHOR_ERROR = 0.03
+
+Box = Tuple[float, float, float, float]
+
+# Character whitelist and validating pattern per field kind
+FIELD_KINDS = {
+    'digits': ('0123456789', re.compile(r'\d+')),
+    # Amounts as the bill parser reads them, so '1.234,56' is not cut to 1.23
+    'decimal': ('0123456789.,', re.compile(KINDS['amount'][0])),
+    'date': ('0123456789.', re.compile(r'\d{2}\.\d{2}\.\d{4}')),
+    'period': ('0123456789-', re.compile(r'\d{4}-\d{2}')),
+}
+
+_NOT_ALNUM = re.compile(r'[^A-Z0-9]')
+
+
+def fold_word(text: str) -> str:
+    """Upper-case ASCII letters and digits of an OCR word, for anchor comparison."""
+    return _NOT_ALNUM.sub('', fold_upper(text))
+
+
+class FieldRegion:
+    def __init__(self, name: str, label: str, box: Box, kind: str = 'digits', suffix: str = ''):
+        """
+        Where one field of a bill is printed
+
+        Args:
+            name (str): Field key in the extracted result
+            label (str): Label the field is written with in the returned text
+            box (tuple): (left, top, right, bottom) in reference pixels
+            kind (str): One of FIELD_KINDS
+            suffix (str): Unit appended in the returned text, e.g. ' m³'
+        """
+        self.name = name
+        self.label = label
+        self.box = box
+        self.kind = kind
+        self.suffix = suffix
+
+    def parse(self, text: str) -> Optional[str]:
+        """The validated value in an OCRed region, or None."""
+        pattern = FIELD_KINDS[self.kind][1]
+        match = pattern.search(re.sub(r'\s+', '', text))
+        if not match:
+            return None
+        value = match.group(0)
+        return str(parse_number(value)) if self.kind == 'decimal' else value
+
+
+class BillTemplate:
+    def __init__(self, name: str, title: str, size: Tuple[int, int], anchors: Dict[str, Box],
+                 fields: Sequence[FieldRegion], min_anchors: int = 3, min_fields: int = 6):
+        """
+        A provider's bill layout
+
+        Args:
+            name (str): Template identifier, e.g. 'aski'
+            title (str): Heading written at the top of the returned text
+            size (tuple): (width, height) of the reference scan the boxes are measured on
+            anchors (dict): Folded anchor word -> its box in the reference scan
+            fields (list): FieldRegion per extracted field
+            min_anchors (int): Anchors that must be found for the layout to match
+            min_fields (int): Fields that must validate, otherwise full-page OCR is used
+        """
+        self.name = name
+        self.title = title
+        self.size = size
+        self.anchors = anchors
+        self.fields = list(fields)
+        self.min_anchors = min_anchors
+        self.min_fields = min_fields
+
+    def register(self, words: List[Dict[str, Any]], page_height: int) -> Optional[Tuple[float, float, float]]:
+        """
+        Fit the reference frame to a page from the anchor words found on it
+
+        Args:
+            words (list): OCR words with boxes, in page pixels
+            page_height (int): Height of the page in pixels
+
+        Returns:
+            (scale, dx, dy) mapping reference pixels to page pixels, or None
+        """
+        found = {}
+        for word in words:
+            key = fold_word(word['text'])
+            if key in self.anchors and key not in found:
+                found[key] = (word['left'] + word['width'] / 2, word['top'] + word['height'] / 2)
+        if len(found) < self.min_anchors:
+            return None
+
+        reference = [((box[0] + box[2]) / 2, (box[1] + box[3]) / 2) for box in (self.anchors[key] for key in found)]
+        page = list(found.values())
+
+        # Least-squares uniform scale and offset; the page is already deskewed
+        count = len(page)
+        rx = sum(x for x, _ in reference) / count
+        ry = sum(y for _, y in reference) / count
+        px = sum(x for x, _ in page) / count
+        py = sum(y for _, y in page) / count
+        spread = sum((x - rx) ** 2 + (y - ry) ** 2 for x, y in reference)
+        if not spread:
+            return None
+        scale = sum((x - rx) * (u - px) + (y - ry) * (v - py)
+                    for (x, y), (u, v) in zip(reference, page)) / spread
+        if scale <= 0:
+            return None
+        dx, dy = px - scale * rx, py - scale * ry
+
+        error = max(((scale * x + dx - u) ** 2 + (scale * y + dy - v) ** 2) ** 0.5
+                    for (x, y), (u, v) in zip(reference, page))
+        if error > _MAX_ANCHOR_ERROR * page_height:
+            return None
+        return scale, dx, dy
+
+    def render(self, values: Dict[str, str]) -> str:
+        """Extracted fields as 'Label: value' lines, the form the bill parsers read."""
+        lines = [self.title]
+        lines += [f"{field.label}: {values[field.name]}{field.suffix}" for field in self.fields if field.name in values]
+        return '\n'.join(lines)
+
+
+# Measured on a 300 DPI Ankara ASKI "Su Tüketim Faturası"
+ASKI_TEMPLATE = BillTemplate(
+    name='aski',
+    title='ASKİ Ankara Su ve Kanalizasyon İdaresi - Su Tüketim Faturası',
+    size=(2481, 4842),
+    anchors={
+        'FATURASI': (1320, 680, 1770, 780),
+        'SOZLESME': (920, 1130, 1240, 1210),
+        'KONUT1': (1540, 1820, 1840, 1920),
+        'ODEME': (75, 2595, 245, 2690),
+        'BILGILERI': (1190, 2760, 1490, 2840),
+        'KIYAS': (90, 3305, 240, 3395),
+        'ADRES': (1275, 3305, 1425, 3395),
+        'DETAYI': (1265, 3555, 1460, 3635),
+        'KURUMLAR': (870, 4365, 1170, 4435),
+    },
+    fields=[
+        FieldRegion('bill_number', 'Fatura No', (570, 800, 1040, 945)),
+        FieldRegion('bill_date', 'Fatura Tarihi', (570, 935, 1070, 1065), 'date'),
+        FieldRegion('subscriber_no', 'Abone No', (120, 1235, 620, 1380)),
+        FieldRegion('contract_no', 'Sözleşme No', (990, 1235, 1590, 1380)),
+        FieldRegion('period', 'Dönem', (1835, 1235, 2235, 1380), 'period'),
+        FieldRegion('payment_deadline', 'Son Ödeme Tarihi', (1370, 2560, 1940, 2690), 'date'),
+        FieldRegion('total_bill', 'Toplam Tutar', (1860, 2225, 2310, 2445), 'decimal'),
+        FieldRegion('last_index', 'Son Endeks', (620, 2845, 1040, 2990)),
+        FieldRegion('first_index', 'İlk Endeks', (620, 2990, 1040, 3120)),
+        FieldRegion('total_consumption', 'Tüketim', (620, 3135, 1040, 3285), suffix=' m³'),
+        FieldRegion('last_reading_date', 'Son Okuma Tarihi', (1860, 2845, 2440, 2980), 'date'),
+        FieldRegion('first_reading_date', 'İlk Okuma Tarihi', (1860, 2990, 2440, 3125), 'date'),
+        FieldRegion('reading_days', 'Okuma Gün Sayısı', (1860, 3135, 2200, 3285)),
+        FieldRegion('water_cost', 'Su Bedeli (1. Kademe)', (620, 3890, 1040, 4040), 'decimal'),
+        FieldRegion('wastewater_cost', 'Atıksu Bedeli', (620, 4040, 1040, 4140), 'decimal'),
+        FieldRegion('environment_tax', 'ÇTV (Çevre Temizlik Vergisi)', (245, 4505, 620, 4640), 'decimal'),
+        FieldRegion('water_vat_1', 'Su KDV (%1)', (700, 4505, 950, 4640), 'decimal'),
+        FieldRegion('wastewater_vat_10', 'Atıksu KDV (%10)', (1170, 4510, 1430, 4645), 'decimal'),
+    ]
+)
+
+TEMPLATES: List[BillTemplate] = [ASKI_TEMPLATE]
+
+
+def register_template(template: BillTemplate):
+    """Add a bill layout to the templates tried on every page."""
+    TEMPLATES.append(template)
+
+
+def templates_enabled(engine=None) -> bool:
+    if OCR_TEMPLATES == 'off':
+        return False
+    if OCR_TEMPLATES == 'on':
+        return True
+    return (engine or get_ocr_engine()).name == 'tesserocr'
+
+
+def _crop(gray, box: Box, transform: Tuple[float, float, float]):
+    scale, dx, dy = transform
+    height, width = gray.shape[:2]
+    left, top, right, bottom = box
+    x0, x1 = max(0, int(scale * left + dx)), min(width, int(scale * right + dx))
+    y0, y1 = max(0, int(scale * top + dy)), min(height, int(scale * bottom + dy))
+    if x1 - x0 < 4 or y1 - y0 < 4:
+        return None
+    return gray[y0:y1, x0:x1]
+
+
+def extract_with_templates(gray, engine=None) -> Optional[Dict[str, Any]]:
+    """
+    OCR only the field regions of a page whose layout is known
+
+    Args:
+        gray: Preprocessed grayscale page as numpy array
+        engine (optional): OCR engine; the current thread's when omitted
+
+    Returns:
+        Dict with template, fields, text and seconds, or None when no
+        template matched or too few fields could be read
+    """
+    import cv2
+
+    engine = engine or get_ocr_engine()
+    started = time.perf_counter()
+    height, width = gray.shape[:2]
+
+    small = cv2.resize(gray, (int(width * _ANCHOR_SCALE), int(height * _ANCHOR_SCALE)), interpolation=cv2.INTER_AREA)
+    words = [
+        dict(word, left=word['left'] / _ANCHOR_SCALE, top=word['top'] / _ANCHOR_SCALE,
+             width=word['width'] / _ANCHOR_SCALE, height=word['height'] / _ANCHOR_SCALE)
+        for word in engine.words(small, psm=11)
+    ]
+
+    for template in TEMPLATES:
+        transform = template.register(words, height)
+        if transform is None:
+            continue
+
+        values = {}
+        for field in template.fields:
+            region = _crop(gray, field.box, transform)
+            if region is None:
+                continue
+            whitelist = FIELD_KINDS[field.kind][0]
+            value = field.parse(engine.image_to_string(region, psm=7, whitelist=whitelist))
+            if value is not None:
+                values[field.name] = value
+
+        seconds = round(time.perf_counter() - started, 3)
+        if len(values) < template.min_fields:
+            logger.info(f"{template.name} layout matched but only {len(values)} fields were read; using full-page OCR")
+            return None
+
+        logger.info(f"Read {len(values)}/{len(template.fields)} {template.name} fields from regions in {seconds:.2f}s")
+        return {
+            'template': template.name,
+            'fields': values,
+            'text': template.render(values),
+            'seconds': seconds
+        }
+
+    return None
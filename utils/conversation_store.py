@@ -0,0 +1,179 @@
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Conversation:
+    """Turns of a single chat session, stored as (user, bot) tuples."""
+
+    __slots__ = ('turns', 'last_access', 'lock')
+
+    def __init__(self, max_turns: int):
+        self.turns = deque(maxlen=max_turns)
+        self.last_access = time.monotonic()
+        self.lock = threading.Lock()
+
+
+class ConversationStore:
+    def __init__(self,
+                 max_sessions: int = 1000,
+                 idle_ttl: int = 1800,
+                 max_turns: int = 10,
+                 max_chars: int = 2000,
+                 persist_path: Optional[str] = None):
+        """
+        Per-session conversation history with LRU and idle-TTL eviction
+
+        Args:
+            max_sessions (int): Sessions kept in memory before the least recently used is evicted
+            idle_ttl (int): Seconds of inactivity after which a session is dropped
+            max_turns (int): Turns kept per session
+            max_chars (int): Characters kept per message
+            persist_path (str, optional): SQLite file for write-behind persistence, None to disable
+        """
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_turns = max_turns
+        self.max_chars = max_chars
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.persist_path = persist_path
+        self._pending = None
+        if persist_path:
+            self._pending = queue.Queue(maxsize=10000)
+            threading.Thread(target=self._writer, name='chat-history-writer', daemon=True).start()
+
+    def _conversation(self, session_id: str, create: bool = True) -> Optional[Conversation]:
+        now = time.monotonic()
+        with self._lock:
+            conversation = self._sessions.get(session_id)
+            if conversation is not None and now - conversation.last_access > self.idle_ttl:
+                del self._sessions[session_id]
+                conversation = None
+
+            if conversation is None:
+                if not create:
+                    return None
+                conversation = Conversation(self.max_turns)
+                self._sessions[session_id] = conversation
+
+            conversation.last_access = now
+            self._sessions.move_to_end(session_id)
+            self._evict(now)
+            return conversation
+
+    def _evict(self, now: float):
+        # Oldest entries sit at the front, so expired sessions are popped from there
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or now - oldest.last_access > self.idle_ttl:
+                del self._sessions[oldest_id]
+            else:
+                break
+
+    def get_history(self, session_id: str) -> List[Dict[str, str]]:
+        """
+        Snapshot of a session's turns in the bots' history format
+
+        Args:
+            session_id (str): Chat session ID
+
+        Returns:
+            List of {'user', 'bot'} dicts, oldest first
+        """
+        conversation = self._conversation(session_id, create=False)
+        if conversation is None:
+            return []
+        with conversation.lock:
+            return [{'user': user, 'bot': bot} for user, bot in conversation.turns]
+
+    def append(self, session_id: str, user_message: str, bot_message: str, role: str = 'general'):
+        """
+        Record a completed turn for a session
+
+        Args:
+            session_id (str): Chat session ID
+            user_message (str): User's message
+            bot_message (str): Bot's response
+            role (str): Chat role, stored with persisted rows
+        """
+        user_message = user_message[:self.max_chars]
+        bot_message = (bot_message or '')[:self.max_chars]
+
+        conversation = self._conversation(session_id)
+        with conversation.lock:
+            conversation.turns.append((user_message, bot_message))
+
+        if self._pending is not None:
+            try:
+                self._pending.put_nowait((role, session_id, user_message, bot_message))
+            except queue.Full:
+                logger.warning("Chat history write queue full, dropping turn")
+
+    def clear(self, session_id: str):
+        """Forget a session's in-memory history."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def _writer(self):
+        conn = sqlite3.connect(self.persist_path)
+        conn.execute('''CREATE TABLE IF NOT EXISTS chat_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    role TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    is_user BOOLEAN NOT NULL,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                )''')
+        conn.commit()
+
+        while True:
+            batch = [self._pending.get()]
+            # Drain whatever else is waiting so bursts become one transaction
+            while len(batch) < 500:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            rows = []
+            for role, session_id, user_message, bot_message in batch:
+                rows.append((role, session_id, user_message, True))
+                rows.append((role, session_id, bot_message, False))
+
+            try:
+                conn.executemany(
+                    'INSERT INTO chat_history (role, user_id, message, is_user) VALUES (?, ?, ?, ?)',
+                    rows
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Chat history persistence error: {e}")
+
+
+def create_conversation_store() -> ConversationStore:
+    """
+    Factory function to create a ConversationStore from environment settings
+
+    Returns:
+        ConversationStore instance
+    """
+    persist = os.getenv('CHAT_HISTORY_PERSIST', 'False').lower() == 'true'
+    return ConversationStore(
+        max_sessions=int(os.getenv('CHAT_MAX_SESSIONS', '1000')),
+        idle_ttl=int(os.getenv('CHAT_SESSION_TTL', '1800')),
+        max_turns=int(os.getenv('CHAT_MAX_TURNS', '10')),
+        persist_path=os.getenv('CHAT_HISTORY_DB', 'chat_history.db') if persist else None
+    )
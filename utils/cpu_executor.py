@@ -0,0 +1,301 @@
+import os
+import sys
+import time
+import socket
+import logging
+import threading
+import subprocess
+from collections import Counter
+from multiprocessing.connection import Connection
+from typing import Callable, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Worker processes start here so `utils.cpu_tasks` is importable
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class CPUBusy(Exception):
+    """Raised when too many CPU tasks are already waiting; maps to HTTP 429."""
+
+    def __init__(self, task_type: str, retry_after: int = 5):
+        super().__init__(f"Too many {task_type} tasks queued, try again shortly")
+        self.task_type = task_type
+        self.retry_after = retry_after
+
+
+class CPUTaskTimeout(Exception):
+    """Raised when a CPU task runs past its timeout; its worker process is killed."""
+
+
+# True in CPU worker processes, which run one task at a time
+_in_worker = False
+
+
+def in_worker_process() -> bool:
+    """Whether this process is a CPU worker rather than a (multi-threaded) app process."""
+    return _in_worker
+
+
+def _worker_main(conn):
+    """Child process loop: run (fn, args, kwargs) messages until the pipe closes."""
+    global _in_worker
+
+    _in_worker = True
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        if message is None:
+            return
+
+        fn, args, kwargs = message
+        try:
+            conn.send((True, fn(*args, **kwargs)))
+        except Exception as e:
+            try:
+                conn.send((False, e))
+            except Exception:
+                # The exception itself could not be pickled
+                conn.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+class _Worker:
+    def __init__(self):
+        # A fresh interpreter rather than fork: request threads may hold locks,
+        # and spawn would re-import the app as __main__
+        parent_sock, child_sock = socket.socketpair()
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'utils.cpu_executor', str(child_sock.fileno())],
+            pass_fds=(child_sock.fileno(),), cwd=PROJECT_DIR
+        )
+        child_sock.close()
+        self.conn = Connection(parent_sock.detach())
+        self.tasks = 0
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait(timeout=5)
+        self.conn.close()
+
+
+class CPUExecutor:
+    def __init__(self,
+                 max_workers: int = 2,
+                 limits: Optional[Dict[str, int]] = None,
+                 timeouts: Optional[Dict[str, float]] = None,
+                 default_timeout: float = 60,
+                 max_queue: int = 8,
+                 queue_timeout: float = 30,
+                 max_tasks_per_worker: int = 100):
+        """
+        Process pool for OCR, PDF parsing and plotting shared by all endpoints
+
+        Work runs in separate processes so it neither holds the GIL of the
+        request threads nor lets one pathological file hang a worker: a
+        task past its timeout has its process killed and replaced.
+
+        Args:
+            max_workers (int): Worker processes; 0 runs tasks inline
+            limits (dict): Concurrent tasks allowed per task type
+            timeouts (dict): Seconds per task type before the task is killed
+            default_timeout (float): Timeout for task types not in timeouts
+            max_queue (int): Tasks of one type allowed to wait before CPUBusy
+            queue_timeout (float): Seconds a queued task waits for a slot
+            max_tasks_per_worker (int): Tasks before a worker process is recycled
+        """
+        self.max_workers = max_workers
+        self.limits = limits or {}
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_tasks_per_worker = max_tasks_per_worker
+
+        self._slots = threading.BoundedSemaphore(max(max_workers, 1))
+        self._type_slots = {}
+        self._idle = []
+        self._waiting = Counter()
+        self._running = Counter()
+        self._lock = threading.Lock()
+
+    def _type_slot(self, task_type: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if task_type not in self._type_slots:
+                limit = self.limits.get(task_type, self.max_workers)
+                self._type_slots[task_type] = threading.BoundedSemaphore(max(1, min(limit, self.max_workers)))
+            return self._type_slots[task_type]
+
+    def run(self, task_type: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) on a worker process and wait for the result
+
+        fn and its arguments must be picklable (a module-level function).
+
+        Args:
+            task_type (str): Task type used for concurrency caps and timeouts
+
+        Raises:
+            CPUBusy: Too many tasks of this type are already waiting
+            CPUTaskTimeout: The task ran past its timeout and was killed
+        """
+        if self.max_workers <= 0:
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            if self._waiting[task_type] >= self.max_queue:
+                raise CPUBusy(task_type)
+            self._waiting[task_type] += 1
+
+        type_slot = self._type_slot(task_type)
+        deadline = time.monotonic() + self.queue_timeout
+        acquired_type = acquired_global = False
+        try:
+            acquired_type = type_slot.acquire(timeout=self.queue_timeout)
+            if acquired_type:
+                acquired_global = self._slots.acquire(timeout=max(0, deadline - time.monotonic()))
+        finally:
+            with self._lock:
+                self._waiting[task_type] -= 1
+                if acquired_global:
+                    self._running[task_type] += 1
+
+        if not acquired_global:
+            if acquired_type:
+                type_slot.release()
+            raise CPUBusy(task_type)
+
+        try:
+            return self._execute(task_type, fn, args, kwargs)
+        finally:
+            with self._lock:
+                self._running[task_type] -= 1
+            self._slots.release()
+            type_slot.release()
+
+    def _execute(self, task_type: str, fn: Callable, args, kwargs) -> Any:
+        timeout = self.timeouts.get(task_type, self.default_timeout)
+        worker = self._checkout()
+        started = time.perf_counter()
+        try:
+            worker.conn.send((fn, args, kwargs))
+            if not worker.conn.poll(timeout):
+                worker.kill()
+                worker = None
+                raise CPUTaskTimeout(f"{task_type} task exceeded {timeout:g}s and was stopped")
+            ok, value = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            if worker is not None:
+                worker.kill()
+                worker = None
+            raise RuntimeError(f"CPU worker for {task_type} task exited: {e}")
+        finally:
+            if worker is not None:
+                self._checkin(worker)
+
+        logger.debug(f"{task_type} task finished in {time.perf_counter() - started:.2f}s")
+        if not ok:
+            raise value
+        return value
+
+    def _checkout(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.is_alive():
+                    return worker
+                worker.kill()
+        return _Worker()
+
+    def _checkin(self, worker: _Worker):
+        worker.tasks += 1
+        if worker.tasks >= self.max_tasks_per_worker:
+            worker.stop()
+            return
+        with self._lock:
+            self._idle.append(worker)
+
+    def stats(self) -> Dict[str, Any]:
+        """Running and waiting tasks per type, and idle worker processes."""
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'idle': len(self._idle),
+                'running': {k: v for k, v in self._running.items() if v},
+                'waiting': {k: v for k, v in self._waiting.items() if v}
+            }
+
+    def shutdown(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+
+
+def _parse_mapping(value: str, cast) -> Dict[str, Any]:
+    """Parse "ocr=2,pdf=2,plot=1" into a dict."""
+    mapping = {}
+    for item in value.split(','):
+        if '=' in item:
+            key, number = item.split('=', 1)
+            mapping[key.strip()] = cast(number)
+    return mapping
+
+
+def create_cpu_executor() -> CPUExecutor:
+    """
+    Factory function to create a CPUExecutor from environment settings
+
+    Returns:
+        Configured CPUExecutor instance
+    """
+    return CPUExecutor(
+        max_workers=int(os.getenv('CPU_WORKERS', str(min(4, os.cpu_count() or 1)))),
+        limits=_parse_mapping(os.getenv('CPU_TASK_LIMITS', 'ocr=2,pdf=2,plot=1,pdf_ocr=4'), int),
+        timeouts=_parse_mapping(os.getenv('CPU_TASK_TIMEOUTS', 'ocr=90,pdf=30,plot=20,pdf_ocr=60'), float),
+        default_timeout=float(os.getenv('CPU_TASK_TIMEOUT', '60')),
+        max_queue=int(os.getenv('CPU_MAX_QUEUE', '8')),
+        queue_timeout=float(os.getenv('CPU_QUEUE_TIMEOUT', '30')),
+        max_tasks_per_worker=int(os.getenv('CPU_MAX_TASKS_PER_WORKER', '100'))
+    )
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_cpu_executor() -> CPUExecutor:
+    """Return the process-wide CPU executor, creating it on first use."""
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = create_cpu_executor()
+    return _executor
+
+
+def run_cpu_task(task_type: str, fn: Callable, *args, **kwargs) -> Any:
+    """Run a task on the shared CPU executor; see CPUExecutor.run."""
+    return get_cpu_executor().run(task_type, fn, *args, **kwargs)
+
+
+if __name__ == '__main__':
+    # Run the loop from the importable module, whose flag tasks check through in_worker_process()
+    from utils.cpu_executor import _worker_main as worker_main
+    worker_main(Connection(int(sys.argv[1])))
@@ -0,0 +1,388 @@
+"""
+CPU-heavy work run on the shared CPU executor (utils/cpu_executor.py)
+
+Functions here run in worker processes, so they must stay module-level
+and take and return picklable values. Heavy libraries are imported inside
+each function to keep the web process import light.
+"""
+import io
+import base64
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# A file path, or the file's bytes for uploads that were never written to disk
+Source = Union[str, bytes]
+
+
+def _open_source(source: Source):
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else open(source, 'rb')
+
+
+def pdf_pages(source: Source, pages: Optional[List[int]] = None) -> List[str]:
+    """
+    Extract the text of each page of a PDF with the configured backend (utils/pdf_text.py)
+
+    Args:
+        source: PDF path or bytes
+        pages (list, optional): 1-based page numbers; all pages when omitted
+
+    Returns:
+        List of page texts ('' for pages without a text layer)
+    """
+    from utils.pdf_text import get_pdf_backend, memory_cap
+
+    with memory_cap():
+        return get_pdf_backend().page_texts(source, pages)
+
+
+def pdf_page_count(source: Source) -> int:
+    """Number of pages in a PDF path or bytes."""
+    from utils.pdf_text import get_pdf_backend, memory_cap
+
+    with memory_cap():
+        return get_pdf_backend().page_count(source)
+
+
+def _resolve(obj):
+    return obj.get_object() if hasattr(obj, 'get_object') else obj
+
+
+def _multiply(m: List[float], n: List[float]) -> List[float]:
+    """PDF matrix product m x n, each given as [a b c d e f]."""
+    return [
+        m[0] * n[0] + m[1] * n[2], m[0] * n[1] + m[1] * n[3],
+        m[2] * n[0] + m[3] * n[2], m[2] * n[1] + m[3] * n[3],
+        m[4] * n[0] + m[5] * n[2] + n[4], m[4] * n[1] + m[5] * n[3] + n[5]
+    ]
+
+
+# Path painting operators; text converted to outlines shows up as thousands of these
+_PAINT_OPERATORS = {b'f', b'F', b'f*', b'B', b'B*', b'b', b'b*', b'S', b's'}
+
+
+def _page_drawing(reader, page) -> Dict[str, Any]:
+    """Fonts, share of the page covered by images, and path painting count of one page."""
+    from PyPDF2.generic import ContentStream
+
+    box = page.mediabox
+    page_area = float(box.width) * float(box.height) or 1.0
+    totals = {'fonts': 0, 'image_area': 0.0, 'paint_ops': 0}
+
+    def walk(content, resources, ctm, depth):
+        resources = _resolve(resources) or {}
+        totals['fonts'] += len(_resolve(resources.get('/Font')) or {})
+        xobjects = _resolve(resources.get('/XObject')) or {}
+        stack = []
+        for operands, operator in ContentStream(content, reader).operations:
+            if operator == b'q':
+                stack.append(ctm)
+            elif operator == b'Q':
+                ctm = stack.pop() if stack else ctm
+            elif operator == b'cm':
+                ctm = _multiply([float(value) for value in operands], ctm)
+            elif operator in _PAINT_OPERATORS:
+                totals['paint_ops'] += 1
+            elif operator == b'INLINE IMAGE':
+                totals['image_area'] += abs(ctm[0] * ctm[3] - ctm[1] * ctm[2])
+            elif operator == b'Do':
+                xobject = _resolve(xobjects.get(operands[0]))
+                if xobject is None:
+                    continue
+                if xobject.get('/Subtype') == '/Image':
+                    # Images are drawn into the unit square, so their page area is the CTM's determinant
+                    totals['image_area'] += abs(ctm[0] * ctm[3] - ctm[1] * ctm[2])
+                elif xobject.get('/Subtype') == '/Form' and depth < 3:
+                    matrix = [float(value) for value in xobject.get('/Matrix', [1, 0, 0, 1, 0, 0])]
+                    walk(xobject, xobject.get('/Resources') or resources, _multiply(matrix, ctm), depth + 1)
+
+    contents = page.get_contents()
+    if contents is not None:
+        walk(contents, page.get('/Resources'), [1.0, 0.0, 0.0, 1.0, 0.0, 0.0], 0)
+    return {
+        'fonts': totals['fonts'],
+        'image_coverage': round(min(1.0, totals['image_area'] / page_area), 3),
+        'paint_ops': totals['paint_ops']
+    }
+
+
+def pdf_page_profiles(source: Source, pages: Optional[List[int]] = None, min_chars: int = 200) -> List[Dict[str, Any]]:
+    """
+    Text layer and text-layer signals of each page, for routing pages to an extractor
+
+    Text comes from the configured backend. Drawing signals (fonts, image
+    coverage, path painting) are measured with PyPDF2, and only on pages
+    with fewer than min_chars characters of text: a page with a full text
+    layer is read directly whatever else is on it.
+
+    Args:
+        source: PDF path or bytes
+        pages (list, optional): 1-based page numbers; all pages when omitted
+        min_chars (int): Non-space characters at which a text layer is trusted
+
+    Returns:
+        Dicts with page, text and chars, plus fonts, image_coverage and
+        paint_ops for pages below min_chars
+    """
+    from utils.pdf_text import get_pdf_backend, memory_cap
+
+    with memory_cap():
+        backend = get_pdf_backend()
+        numbers = pages if pages is not None else range(1, backend.page_count(source) + 1)
+        profiles = [
+            {'page': number, 'text': text, 'chars': len(''.join(text.split()))}
+            for number, text in zip(numbers, backend.page_texts(source, numbers))
+        ]
+
+        thin = [profile for profile in profiles if profile['chars'] < min_chars]
+        if thin:
+            import PyPDF2
+
+            with _open_source(source) as f:
+                reader = PyPDF2.PdfReader(f)
+                for profile in thin:
+                    profile.update(_page_drawing(reader, reader.pages[profile['page'] - 1]))
+        return profiles
+
+
+def pdf_page_document(source: Source, page_number: int) -> bytes:
+    """One page of a PDF as a PDF of its own, e.g. for single-page Textract calls."""
+    import PyPDF2
+
+    with _open_source(source) as f:
+        writer = PyPDF2.PdfWriter()
+        writer.add_page(PyPDF2.PdfReader(f).pages[page_number - 1])
+        output = io.BytesIO()
+        writer.write(output)
+        return output.getvalue()
+
+
+def _pdf_region_renderer(source: Source, page_number: int, dpi: int, shape):
+    """
+    Renderer that rasterizes regions of a PDF page again at a higher resolution
+
+    Used to re-read weak OCR words (utils/ocr_layout.py) from the PDF itself
+    rather than from an enlarged raster. None when pypdfium2 is not
+    installed, or when its page frame differs from the rasterized page's
+    (rotated pages, a crop box smaller than the media box).
+    """
+    try:
+        import pypdfium2
+    except ImportError:
+        return None
+
+    def open_page():
+        document = pypdfium2.PdfDocument(bytes(source) if isinstance(source, (bytes, bytearray)) else source)
+        return document, document[page_number - 1]
+
+    document, page = open_page()
+    try:
+        width, height = page.get_size()
+        frame = (round(height * dpi / 72), round(width * dpi / 72))
+        if page.get_rotation() or max(abs(a - b) for a, b in zip(frame, shape[:2])) > 2:
+            return None
+    finally:
+        document.close()
+
+    def render(box, scale: float):
+        document, page = open_page()
+        try:
+            left, top, right, bottom = (value * 72 / dpi for value in box)
+            bitmap = page.render(scale=dpi * scale / 72, grayscale=True,
+                                 crop=(left, height - bottom, width - right, top))
+            return bitmap.to_numpy().copy()
+        finally:
+            document.close()
+
+    return render
+
+
+def ocr_pdf_page(source: Source, page_number: int, dpi: int = 300) -> str:
+    """
+    Rasterize one page of a PDF and OCR it with Tesseract
+
+    Only the requested page is rendered, so pages of one document can be
+    OCRed by separate workers at the same time. Pages with a known bill
+    layout are read region by region (see ocr_bill_page); weak field values
+    of other pages are re-rendered from the PDF at a higher resolution.
+
+    Args:
+        source: PDF path or bytes
+        page_number (int): 1-based page number
+        dpi (int): Rasterization resolution
+    """
+    import numpy as np
+    from pdf2image import convert_from_bytes, convert_from_path
+
+    options = dict(dpi=dpi, first_page=page_number, last_page=page_number, grayscale=True)
+    if isinstance(source, (bytes, bytearray)):
+        images = convert_from_bytes(source, **options)
+    else:
+        images = convert_from_path(source, **options)
+    if not images:
+        return ''
+    try:
+        gray = np.asarray(images[0])
+        return ocr_bill_page(gray, _pdf_region_renderer(source, page_number, dpi, gray.shape))
+    finally:
+        images[0].close()
+
+
+def ocr_image(source: Source) -> str:
+    """Tesseract OCR of an image path or bytes after in-memory preprocessing."""
+    from utils.image_preprocessing import preprocess_for_ocr
+    from utils.ocr_engine import image_to_string
+
+    return image_to_string(preprocess_for_ocr(source))
+
+
+def preprocess_bill_image(source: Source):
+    """
+    Normalize, deskew and binarize a scanned bill for OCR in memory
+
+    Returns:
+        Preprocessed image as numpy array
+    """
+    from utils.image_preprocessing import preprocess_for_ocr
+
+    return preprocess_for_ocr(source)
+
+
+def ocr_bill_layout(gray, render=None) -> Dict[str, Any]:
+    """
+    OCR a bill page into words with boxes and confidences, re-reading weak field values
+
+    Args:
+        gray: Grayscale page as numpy array
+        render (callable, optional): Renders page regions at a higher
+            resolution; the page image is enlarged when omitted
+
+    Returns:
+        Dict with text, words, mean_conf, weak_regions, refined and seconds
+        (see utils/ocr_layout.read_page)
+    """
+    from utils.ocr_layout import read_page
+
+    return read_page(gray, render=render)
+
+
+def ocr_bill_page(gray, render=None) -> str:
+    """
+    OCR a bill page, reading only the field regions when its layout is known
+
+    Args:
+        gray: Grayscale page as numpy array
+        render (callable, optional): Renders page regions at a higher resolution for re-OCR
+
+    Returns:
+        'Label: value' lines for template matches, full-page OCR text otherwise
+    """
+    from utils.bill_templates import extract_with_templates, templates_enabled
+
+    if templates_enabled():
+        result = extract_with_templates(gray)
+        if result is not None:
+            return result['text']
+    return ocr_bill_layout(gray, render)['text']
+
+
+def ocr_bill_image(source: Source) -> str:
+    """
+    Preprocess a scanned bill and run Tesseract on it
+
+    Args:
+        source: Image path or bytes
+    """
+    return ocr_bill_page(preprocess_bill_image(source))
+
+
+def _figure_png_base64(plt) -> str:
+    buf = io.BytesIO()
+    plt.savefig(buf, format='png')
+    return base64.b64encode(buf.getvalue()).decode('utf-8')
+
+
+def render_chart(data: Any, chart_type: str, path: str) -> str:
+    """
+    Draw a bar, pie or line chart of data and save it as an image
+
+    Returns:
+        The path written
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(10, 6))
+    plt.title('Data Visualization')
+
+    if chart_type == 'bar':
+        categories = list(data.keys()) if isinstance(data, dict) else range(len(data))
+        values = list(data.values()) if isinstance(data, dict) else data
+        plt.bar(categories, values)
+        plt.xlabel('Categories')
+        plt.ylabel('Values')
+
+    elif chart_type == 'pie':
+        categories = list(data.keys()) if isinstance(data, dict) else range(len(data))
+        values = list(data.values()) if isinstance(data, dict) else data
+        plt.pie(values, labels=categories, autopct='%1.1f%%')
+
+    elif chart_type == 'line':
+        plt.plot(data)
+        plt.xlabel('Index')
+        plt.ylabel('Value')
+
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+    return path
+
+
+def render_graph_code(graph_code: str) -> str:
+    """
+    Execute model-generated matplotlib code and return the figure as base64 PNG
+
+    Runs in a worker process, so code that loops forever is killed by the
+    executor timeout instead of hanging a request thread.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import numpy as np
+    import pandas as pd
+
+    if not graph_code.strip():
+        raise ValueError("Empty graph code")
+
+    namespace = {'plt': plt, 'pd': pd, 'np': np}
+    try:
+        exec(graph_code, namespace)
+        plt.tight_layout()
+        return _figure_png_base64(plt)
+    finally:
+        plt.close('all')
+
+
+def render_default_graph() -> str:
+    """Fallback bar chart as base64 PNG."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import pandas as pd
+
+    plt.figure(figsize=(10, 6))
+    default_data = pd.DataFrame({
+        'Category': ['A', 'B', 'C'],
+        'Values': [10, 15, 7]
+    })
+    plt.bar(default_data['Category'], default_data['Values'])
+    plt.title('Fallback Graph')
+    plt.xlabel('Categories')
+    plt.ylabel('Values')
+    plt.tight_layout()
+    try:
+        return _figure_png_base64(plt)
+    finally:
+        plt.close()
@@ -0,0 +1,226 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A file path or the file's bytes
+Source = Union[str, bytes, bytearray, memoryview]
+
+
+def content_digest(source: Source) -> str:
+    """SHA-256 of a file path or of in-memory bytes."""
+    if isinstance(source, str):
+        digest = hashlib.sha256()
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    return hashlib.sha256(source).hexdigest()
+
+
+class ExtractionCache:
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        On-disk cache of extracted document text, keyed by content hash
+
+        Each entry is one JSON file named after the SHA-256 of the document
+        and the extractor name and version, so bumping an extractor's
+        version retires its old entries. Hits refresh the file's mtime and
+        the least recently used entries are deleted once the directory
+        grows past max_bytes. Entries are written atomically, so several
+        worker processes can share the directory.
+
+        Args:
+            directory (str): Cache directory
+            max_bytes (int): Size the directory is trimmed back under
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest: str, extractor: str, version: int) -> str:
+        return os.path.join(self.directory, digest[:2], f"{digest}.{extractor}.v{version}.json")
+
+    def get(self, digest: str, extractor: str, version: int) -> Optional[Any]:
+        """
+        Cached extraction for a document, or None
+
+        Args:
+            digest (str): SHA-256 of the document
+            extractor (str): Extractor name
+            version (int): Extractor version
+        """
+        path = self._path(digest, extractor, version)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            self._misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache entry {path}: {e}")
+            self._discard(path)
+            self._misses += 1
+            return None
+        self._hits += 1
+        return value['value']
+
+    def put(self, digest: str, extractor: str, version: int, value: Any):
+        """Store an extraction result; value must be JSON-serializable."""
+        path = self._path(digest, extractor, version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({'extractor': extractor, 'version': version, 'value': value},
+                          ensure_ascii=False).encode('utf-8')
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.entry-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._discard(tmp_path)
+            raise
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def get_or_extract(self, source: Source, extractor: str, version: int,
+                       extract: Callable[[], Any], digest: Optional[str] = None) -> Any:
+        """
+        Return the cached extraction of source, running extract() on a miss
+
+        Exceptions from extract() propagate and nothing is cached, so only
+        successful extractions are stored.
+
+        Args:
+            source: Document path or bytes
+            extractor (str): Extractor name
+            version (int): Extractor version; bump it when the output changes
+            extract (callable): Produces the value on a miss
+            digest (str, optional): Precomputed SHA-256 of source
+        """
+        digest = digest or content_digest(source)
+        value = self.get(digest, extractor, version)
+        if value is not None:
+            logger.debug(f"Extraction cache hit: {extractor} {digest[:12]}")
+            return value
+
+        value = extract()
+        try:
+            self.put(digest, extractor, version, value)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not cache {extractor} result: {e}")
+        return value
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _discard(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until the cache is under 90% of max_bytes
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * 0.9
+            removed = 0
+            for path, size, _ in entries:
+                if total <= target:
+                    break
+                self._discard(path)
+                total -= size
+                removed += 1
+            self._size = total
+        if removed:
+            logger.info(f"Extraction cache evicted {removed} entries")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit and miss counts of this process and the cache size on disk."""
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            return {'hits': self._hits, 'misses': self._misses, 'bytes': self._size, 'max_bytes': self.max_bytes}
+
+
+def create_extraction_cache() -> Optional[ExtractionCache]:
+    """
+    Factory function to create an ExtractionCache from environment settings
+
+    Returns:
+        Configured ExtractionCache, or None if EXTRACTION_CACHE_ENABLED is off
+    """
+    if os.getenv('EXTRACTION_CACHE_ENABLED', 'True').lower() not in ('1', 'true', 'yes'):
+        return None
+    return ExtractionCache(
+        directory=os.getenv('EXTRACTION_CACHE_DIR', os.path.join(PROJECT_DIR, 'cache', 'extraction')),
+        max_bytes=int(float(os.getenv('EXTRACTION_CACHE_MAX_MB', '512')) * 1024 * 1024)
+    )
+
+
+_cache = None
+_cache_created = False
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Return the process-wide extraction cache, creating it on first use."""
+    global _cache, _cache_created
+
+    if not _cache_created:
+        with _cache_lock:
+            if not _cache_created:
+                try:
+                    _cache = create_extraction_cache()
+                except OSError as e:
+                    logger.error(f"Extraction cache unavailable: {e}")
+                    _cache = None
+                _cache_created = True
+    return _cache
+
+
+def cached_extraction(source: Source, extractor: str, version: int,
+                      extract: Callable[[], Any], digest: Optional[str] = None) -> Any:
+    """Run extract() through the shared extraction cache; see ExtractionCache.get_or_extract."""
+    cache = get_extraction_cache()
+    if cache is None:
+        return extract()
+    return cache.get_or_extract(source, extractor, version, extract, digest)
@@ -0,0 +1,166 @@
+"""
+HTTP caching for GET endpoints and pages
+
+Views declare a @cache_policy; init_http_cache installs an after_request
+hook that gives their 200 responses a weak ETag, answers matching
+If-None-Match requests with 304, and sets Cache-Control (with
+stale-while-revalidate / stale-if-error) and a Surrogate-Key header the
+nginx front end caches and purges on. Large text and JSON responses are
+compressed with brotli or gzip, whichever the client accepts.
+"""
+import os
+import gzip
+import hashlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from flask import request, session, current_app
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.getenv('HTTP_COMPRESS_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.getenv('HTTP_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('HTTP_BROTLI_QUALITY', '5'))
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'text/html', 'text/plain', 'text/css',
+    'application/javascript', 'text/javascript', 'image/svg+xml'
+}
+
+SurrogateKeys = Union[Iterable[str], Callable[[Dict[str, str]], Iterable[str]]]
+
+
+class CachePolicy:
+    def __init__(self, max_age: int, stale_while_revalidate: int = 0, stale_if_error: int = 0,
+                 private: bool = False, surrogate_keys: SurrogateKeys = ()):
+        """
+        Caching rules for the responses of one view
+
+        Args:
+            max_age (int): Seconds a response is fresh
+            stale_while_revalidate (int): Seconds a stale response may be served while it is refreshed
+            stale_if_error (int): Seconds a stale response may be served when the origin fails
+            private (bool): Only the browser may cache, not nginx
+            surrogate_keys: Keys tagging the response in the shared cache, or a
+                function from the query arguments to keys
+        """
+        self.max_age = max_age
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_if_error = stale_if_error
+        self.private = private
+        self.surrogate_keys = surrogate_keys
+
+    def cache_control(self) -> str:
+        directives = ['private' if self.private else 'public', f'max-age={self.max_age}']
+        if self.stale_while_revalidate:
+            directives.append(f'stale-while-revalidate={self.stale_while_revalidate}')
+        if self.stale_if_error:
+            directives.append(f'stale-if-error={self.stale_if_error}')
+        return ', '.join(directives)
+
+    def keys(self, args: Dict[str, str]) -> List[str]:
+        keys = self.surrogate_keys(args) if callable(self.surrogate_keys) else self.surrogate_keys
+        return [key for key in keys if key]
+
+    def headers(self, args: Dict[str, str]) -> Dict[str, str]:
+        """Cache-Control and, for shared responses, Surrogate-Key headers."""
+        headers = {'Cache-Control': self.cache_control()}
+        keys = self.keys(args)
+        if keys and not self.private:
+            headers['Surrogate-Key'] = ' '.join(keys)
+        return headers
+
+
+def cache_policy(max_age: int, stale_while_revalidate: int = 0, stale_if_error: int = 0,
+                 private: bool = False, surrogate_keys: SurrogateKeys = ()):
+    """
+    Declare the caching rules of a view; place it below @app.route
+
+    Args:
+        max_age (int): Seconds a response is fresh
+        stale_while_revalidate (int): Seconds a stale response may be served while it is refreshed
+        stale_if_error (int): Seconds a stale response may be served when the origin fails
+        private (bool): Only the browser may cache, not nginx
+        surrogate_keys: Keys tagging the response, or a function from the query arguments to keys
+    """
+    def decorator(view):
+        view.cache_policy = CachePolicy(max_age, stale_while_revalidate, stale_if_error, private, surrogate_keys)
+        return view
+    return decorator
+
+
+def etag_for(body: bytes) -> str:
+    """Hash used as the (weak) ETag of a response body."""
+    return hashlib.sha1(body).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag value."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate.strip('"') == etag:
+            return True
+    return False
+
+
+def compress(body: bytes, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+    """
+    Compress a body with the best encoding the client accepts
+
+    Returns:
+        (body, encoding); encoding is None when the body was left as is
+    """
+    if len(body) < COMPRESS_MIN_BYTES or not accept_encoding:
+        return body, None
+    accepted = {item.split(';')[0].strip().lower() for item in accept_encoding.split(',')}
+    if brotli is not None and 'br' in accepted:
+        return brotli.compress(body, quality=BROTLI_QUALITY), 'br'
+    if 'gzip' in accepted:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), 'gzip'
+    return body, None
+
+
+def _view_policy() -> Optional[CachePolicy]:
+    view = current_app.view_functions.get(request.endpoint) if request.endpoint else None
+    return getattr(view, 'cache_policy', None)
+
+
+def _apply_cache_policy(response):
+    if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+        return response
+    if response.is_streamed or response.direct_passthrough:
+        return response
+
+    policy = _view_policy()
+    if policy is not None:
+        if session.modified:
+            # The response carries a new session cookie and must not be shared
+            response.headers['Cache-Control'] = 'private, no-cache'
+        else:
+            response.set_etag(etag_for(response.get_data()), weak=True)
+            response.headers.update(policy.headers(request.args))
+            response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+
+    if response.mimetype in COMPRESSIBLE_TYPES and 'Content-Encoding' not in response.headers:
+        body, encoding = compress(response.get_data(), request.headers.get('Accept-Encoding', ''))
+        if encoding:
+            response.set_data(body)
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_http_cache(app):
+    """Install ETag, Cache-Control and compression handling on a Flask app."""
+    app.after_request(_apply_cache_policy)
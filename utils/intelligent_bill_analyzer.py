@@ -1,28 +1,23 @@
 import os
-import re
 import json
 import logging
 import boto3
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Union, Any
-from PIL import Image
-import pytesseract
-import cv2
-import PyPDF2
 import traceback
+from utils.cpu_executor import run_cpu_task, CPUBusy
+from utils.cpu_tasks import pdf_pages, ocr_bill_image, preprocess_bill_image
+from utils.extraction_cache import cached_extraction, content_digest, get_extraction_cache
+from utils.bill_parser import parse_bill
+from utils.progressive_extraction import IncrementalFieldParser, extract_until_complete, iter_pdf_text
+from utils.turkish_text import search_key
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bill_analysis.log', mode='a', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger('IntelligentBillAnalyzer')
 
+# Bump when the output of analyze_document_with_textract or the OCR fallback changes
+BILL_EXTRACTOR_VERSION = 11
+
 class IntelligentBillAnalyzer:
     def __init__(self, upload_folder='uploads'):
         """
@@ -37,26 +32,17 @@ class IntelligentBillAnalyzer:
         # Initialize AWS Textract client
         try:
             self.textract_client = boto3.client('textract')
-            logger.info("AWS Textract client initialized successfully")
+            logger.debug("AWS Textract client initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Textract client: {e}")
             self.textract_client = None
         
-        # Predefined bill parsing patterns (extensible)
-        self.bill_patterns = {
+        # Output key -> utils.bill_parser field, per bill type (extensible)
+        self.bill_fields = {
             'water_bill': {
-                'total_amount': [
-                    r'(?:Toplam|Total)\s*(?:Tutar|Amount)[:]*\s*[₺$]*\s*(\d+(?:\.\d{1,2})?)',
-                    r'(?:Fatura|Invoice)\s*(?:Tutarı|Amount)[:]*\s*[₺$]*\s*(\d+(?:\.\d{1,2})?)'
-                ],
-                'billing_period': [
-                    r'(?:Dönem|Period)[:]*\s*(\d{2}/\d{4}\s*-\s*\d{02}/\d{4})',
-                    r'(?:Fatura|Billing)\s*(?:Dönemi|Period)[:]*\s*(\w+\s*\d{4}\s*-\s*\w+\s*\d{4})'
-                ],
-                'water_consumption': [
-                    r'(?:Su\s*Tüketimi|Water\s*Consumption)[:]*\s*(\d+(?:\.\d{1,2})?)\s*m3',
-                    r'(?:Tüketim|Consumption)[:]*\s*(\d+(?:\.\d{1,2})?)\s*(?:m3|cubic\s*meters)'
-                ]
+                'total_amount': 'total_amount',
+                'billing_period': 'billing_period',
+                'water_consumption': 'consumption'
             }
         }
 
@@ -64,41 +50,17 @@ class IntelligentBillAnalyzer:
         """
         Preprocess image for better text extraction
         
+        Decodes at reduced size, normalizes to OCR_TARGET_DPI, deskews and
+        binarizes, without writing anything to disk.
+        
         Args:
             image_path (str): Path to input image
         
         Returns:
             Preprocessed image as numpy array
         """
-        logger.info(f"Preprocessing image: {image_path}")
-        
-        # Read image
-        image = cv2.imread(image_path)
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        
-        # Apply thresholding to preprocess the image
-        gray = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
-        
-        # Apply deskewing
-        coords = np.column_stack(np.where(gray > 0))
-        angle = cv2.minAreaRect(coords)[-1]
-        
-        # Rotate the image to deskew
-        if angle < -45:
-            angle = -(90 + angle)
-        else:
-            angle = -angle
-        
-        (h, w) = image.shape[:2]
-        center = (w // 2, h // 2)
-        M = cv2.getRotationMatrix2D(center, angle, 1.0)
-        rotated = cv2.warpAffine(gray, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
-        
-        logger.info(f"Image preprocessing completed")
-        
-        return rotated
+        logger.debug(f"Preprocessing image: {image_path}")
+        return preprocess_bill_image(image_path)
 
     def extract_text_with_tesseract(self, image_path: str) -> str:
         """
@@ -110,25 +72,20 @@ class IntelligentBillAnalyzer:
         Returns:
             Extracted text
         """
-        logger.info(f"Attempting Tesseract OCR on: {image_path}")
+        logger.debug(f"Attempting Tesseract OCR on: {image_path}")
         
-        # Preprocess image
-        preprocessed_image = self.preprocess_image(image_path)
-        
-        # Save preprocessed image for debugging
-        preprocessed_path = os.path.join(self.upload_folder, 'preprocessed.jpg')
-        cv2.imwrite(preprocessed_path, preprocessed_image)
-        logger.info(f"Preprocessed image saved: {preprocessed_path}")
-        
-        # Extract text with Tesseract
-        text = pytesseract.image_to_string(preprocessed_image)
-        logger.info(f"Tesseract OCR text length: {len(text)}")
+        # Preprocess in memory and OCR on the shared CPU executor
+        text = cached_extraction(
+            image_path, 'bill-ocr', BILL_EXTRACTOR_VERSION,
+            lambda: run_cpu_task('ocr', ocr_bill_image, image_path)
+        )
+        logger.debug(f"Tesseract OCR text length: {len(text)}")
         
         return text
 
     def extract_text_from_pdf(self, pdf_path: str) -> str:
         """
-        Extract text from PDF using PyPDF2
+        Extract text from PDF with the configured text backend
         
         Args:
             pdf_path (str): Path to PDF file
@@ -136,34 +93,45 @@ class IntelligentBillAnalyzer:
         Returns:
             Extracted text from PDF
         """
-        logger.info(f"Extracting text from PDF: {pdf_path}")
+        full_text = "".join(page + "\n" for page in self.extract_pdf_page_texts(pdf_path))
+        logger.debug(f"PDF text extraction completed. Length: {len(full_text)} characters")
+        return full_text
+
+    def extract_pdf_page_texts(self, pdf_path: str) -> List[str]:
+        """
+        Extract the text layer of each PDF page with the configured text backend
         
-        try:
-            with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                full_text = ""
-                
-                for page in reader.pages:
-                    full_text += page.extract_text() + "\n"
-                
-                logger.info(f"PDF text extraction completed. Length: {len(full_text)} characters")
-                return full_text
+        Args:
+            pdf_path (str): Path to PDF file
+        
+        Returns:
+            Text per page ('' for scanned pages), or an empty list if the PDF could not be read
+        """
+        logger.debug(f"Extracting text from PDF: {pdf_path}")
         
+        try:
+            return run_cpu_task('pdf', pdf_pages, pdf_path)
+        except CPUBusy:
+            raise
         except Exception as e:
             logger.error(f"PDF text extraction failed: {e}")
-            return ""
+            return []
 
     def analyze_document_with_textract(self, file_path: str) -> Dict[str, Any]:
         """
         Analyze document using AWS Textract with comprehensive logging
         
+        Successful analyses, text and Textract blocks included, are cached
+        by content hash, so a re-uploaded bill costs no PDF parsing, OCR or
+        Textract call.
+        
         Args:
             file_path (str): Path to input document
         
         Returns:
             Comprehensive document analysis
         """
-        logger.info(f"Analyzing document: {file_path}")
+        logger.debug(f"Analyzing document: {file_path}")
         
         # Validate file exists
         if not os.path.exists(file_path):
@@ -173,26 +141,48 @@ class IntelligentBillAnalyzer:
                 'error': f"File not found: {file_path}"
             }
         
+        cache = get_extraction_cache()
+        if cache is None:
+            return self._analyze_document(file_path)
+        
+        digest = content_digest(file_path)
+        cached = cache.get(digest, 'bill-document', BILL_EXTRACTOR_VERSION)
+        if cached is not None:
+            logger.debug(f"Using cached analysis for {file_path}")
+            return cached
+        
+        result = self._analyze_document(file_path)
+        if result.get('success'):
+            try:
+                cache.put(digest, 'bill-document', BILL_EXTRACTOR_VERSION, result)
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f"Could not cache document analysis: {e}")
+        return result
+
+    def _analyze_document(self, file_path: str) -> Dict[str, Any]:
         # Determine file type
         file_ext = os.path.splitext(file_path)[1].lower()
         
-        # Fallback text extraction for PDFs
+        # PDFs are read page by page, each page by its text layer, local OCR
+        # or Textract, only until the required bill fields are found
         if file_ext == '.pdf':
-            full_text = self.extract_text_from_pdf(file_path)
-            
-            if full_text:
-                return {
-                    'success': True,
-                    'full_text': full_text,
-                    'extraction_method': 'PyPDF2'
-                }
+            try:
+                textract = self.textract_page_text if self.textract_client is not None else None
+                chunks = iter_pdf_text(file_path, textract=textract)
+                result = extract_until_complete(chunks, self.field_parser())
+                if result['full_text'].strip():
+                    return dict(result, success=True)
+            except CPUBusy:
+                raise
+            except Exception as pdf_error:
+                logger.warning(f"Local PDF extraction failed, trying Textract: {pdf_error}")
         
         # Read file bytes
         try:
             with open(file_path, 'rb') as document:
                 document_bytes = document.read()
             
-            logger.info(f"File read successfully. Size: {len(document_bytes)} bytes")
+            logger.debug(f"File read successfully. Size: {len(document_bytes)} bytes")
         except Exception as read_error:
             logger.error(f"Error reading file: {read_error}")
             return {
@@ -222,7 +212,7 @@ class IntelligentBillAnalyzer:
                 if block['BlockType'] == 'LINE'
             ])
             
-            logger.info(f"Textract analysis completed. Extracted text length: {len(full_text)}")
+            logger.debug(f"Textract analysis completed. Extracted text length: {len(full_text)}")
             
             return {
                 'success': True,
@@ -237,7 +227,7 @@ class IntelligentBillAnalyzer:
             # Fallback to Tesseract OCR
             try:
                 fallback_text = self.extract_text_with_tesseract(file_path)
-                logger.info(f"Fallback OCR text length: {len(fallback_text)}")
+                logger.debug(f"Fallback OCR text length: {len(fallback_text)}")
                 
                 return {
                     'success': False,
@@ -245,6 +235,8 @@ class IntelligentBillAnalyzer:
                     'fallback_text': fallback_text,
                     'extraction_method': 'Tesseract'
                 }
+            except CPUBusy:
+                raise
             except Exception as ocr_error:
                 logger.error(f"Fallback OCR failed: {ocr_error}")
                 return {
@@ -252,9 +244,36 @@ class IntelligentBillAnalyzer:
                     'error': f"Textract and OCR failed: {textract_error}, {ocr_error}"
                 }
 
+    def textract_page_text(self, document: bytes) -> str:
+        """
+        Text of a single-page document with Textract, one line per text line
+        
+        Args:
+            document (bytes): Single-page PDF, PNG or JPEG
+        
+        Returns:
+            str: Detected text
+        """
+        response = self.textract_client.detect_document_text(Document={'Bytes': document})
+        return '\n'.join(
+            block['Text'] for block in response.get('Blocks', []) if block['BlockType'] == 'LINE'
+        )
+
+    def field_parser(self, bill_type: str = 'water_bill') -> IncrementalFieldParser:
+        """
+        Incremental parser for the fields of a bill type
+        
+        Args:
+            bill_type (str): Key of self.bill_fields
+        
+        Returns:
+            IncrementalFieldParser requiring every field of the bill type
+        """
+        return IncrementalFieldParser(list(self.bill_fields[bill_type].values()))
+
     def parse_bill_details(self, text: str) -> Dict[str, str]:
         """
-        Parse bill details using regex and machine learning
+        Parse bill details with the shared single-pass bill parser
         
         Args:
             text (str): Input text from bill
@@ -262,24 +281,19 @@ class IntelligentBillAnalyzer:
         Returns:
             Parsed bill details
         """
-        logger.info("Parsing bill details")
-        
-        details = {}
+        logger.debug("Parsing bill details")
         
         # Detect bill type (can be enhanced with ML)
         bill_type = 'water_bill'  # Default assumption
         
-        if bill_type in self.bill_patterns:
-            patterns = self.bill_patterns[bill_type]
-            
-            for key, pattern_list in patterns.items():
-                for pattern in pattern_list:
-                    match = re.search(pattern, text, re.IGNORECASE | re.UNICODE)
-                    if match:
-                        details[key] = match.group(1)
-                        break
+        bill = parse_bill(text)
+        details = {
+            key: bill.text(field)
+            for key, field in self.bill_fields.get(bill_type, {}).items()
+            if field in bill.values
+        }
         
-        logger.info(f"Bill details parsed: {details}")
+        logger.debug(f"Bill details parsed: {details}")
         
         return details
 
@@ -293,7 +307,7 @@ class IntelligentBillAnalyzer:
         Returns:
             Comprehensive bill insights
         """
-        logger.info("Generating bill insights")
+        logger.debug("Generating bill insights")
         
         insights = {
             'summary': 'Detailed Bill Breakdown',
@@ -321,7 +335,7 @@ class IntelligentBillAnalyzer:
             insights['error'] = str(e)
             logger.error(f"Error generating bill insights: {e}")
         
-        logger.info(f"Bill insights generated: {insights}")
+        logger.debug(f"Bill insights generated: {insights}")
         
         return insights
 
@@ -335,7 +349,7 @@ class IntelligentBillAnalyzer:
         Returns:
             Comprehensive bill analysis
         """
-        logger.info(f"Processing bill: {file_path}")
+        logger.debug(f"Processing bill: {file_path}")
         
         # Textract document analysis
         textract_result = self.analyze_document_with_textract(file_path)
@@ -353,7 +367,7 @@ class IntelligentBillAnalyzer:
         # Generate insights
         bill_insights = self.generate_bill_insights(bill_details)
         
-        logger.info(f"Bill processing completed: {bill_insights}")
+        logger.debug(f"Bill processing completed: {bill_insights}")
         
         return {
             'success': True,
@@ -505,8 +519,8 @@ class IntelligentBillAnalyzer:
             str: Detailed bill analysis with optional privacy protection
         """
         try:
-            # Basic text preprocessing
-            bill_text = bill_text.lower().strip()
+            # Case- and accent-insensitive text, so 'SU FATURASI' matches too
+            bill_text = search_key(bill_text)
             
             # Privacy-aware analysis
             if privacy_mode:
@@ -524,11 +538,11 @@ class IntelligentBillAnalyzer:
             insights = []
             
             # Detect bill type
-            if 'water' in bill_text or 'su faturası' in bill_text:
+            if 'water' in bill_text or 'su faturasi' in bill_text:
                 insights.append("📊 Water Bill Detected")
             
             # Consumption analysis
-            if 'tüketim' in bill_text or 'consumption' in bill_text:
+            if 'tuketim' in bill_text or 'consumption' in bill_text:
                 insights.append("💧 Consumption Detected: Analyzing water usage patterns")
             
             # Financial insights
@@ -556,76 +570,27 @@ class IntelligentBillAnalyzer:
         Returns:
             Comprehensive bill analysis dictionary
         """
-        logger.info("Starting bill analysis")
+        logger.debug("Starting bill analysis")
         logger.debug(f"Input bill text: {bill_text}")
 
         try:
-            # Comprehensive regex patterns for bill details
-            patterns = {
-                'bill_number': [
-                    r'FATURA NO[:]*\s*(\d+)', 
-                    r'Invoice Number[:]*\s*(\d+)'
-                ],
-                'subscriber_number': [
-                    r'ABONE NO[:]*\s*(\d+)', 
-                    r'Subscriber Number[:]*\s*(\d+)'
-                ],
-                'billing_period': [
-                    r'DÖNEM[:]*\s*(\d{4}-\d{2})', 
-                    r'Billing Period[:]*\s*(\d{4}-\d{2})'
-                ],
-                'total_consumption': [
-                    r'TÜKETIM \(m3\)[:]*\s*(\d+(?:\.\d+)?)', 
-                    r'Consumption \(m3\)[:]*\s*(\d+(?:\.\d+)?)'
-                ],
-                'water_cost': [
-                    r'SU BEDELİ \(TL\)[:]*\s*(\d+(?:\.\d+)?)', 
-                    r'Water Cost \(TL\)[:]*\s*(\d+(?:\.\d+)?)'
-                ],
-                'wastewater_cost': [
-                    r'ATIKSU BEDELİ \(TL\)[:]*\s*(\d+(?:\.\d+)?)', 
-                    r'Wastewater Cost \(TL\)[:]*\s*(\d+(?:\.\d+)?)'
-                ],
-                'total_bill': [
-                    r'TOPLAM BORC \(TL\)[:]*\s*(\d+(?:\.\d+)?)', 
-                    r'Total Bill \(TL\)[:]*\s*(\d+(?:\.\d+)?)'
-                ],
-                'reading_days': [
-                    r'OKUMA GÜN SAYISI[:]*\s*(\d+)', 
-                    r'Reading Days[:]*\s*(\d+)'
-                ]
-            }
-
-            # Function to safely extract first match from multiple patterns
-            def safe_extract(key, default='N/A'):
-                for pattern in patterns[key]:
-                    matches = re.findall(pattern, bill_text, re.IGNORECASE)
-                    if matches:
-                        logger.info(f"Found {key} using pattern: {pattern}")
-                        return matches[0]
-                logger.warning(f"No match found for {key}")
-                return default
-
-            # Extract bill details
+            bill = parse_bill(bill_text)
             bill_details = {
-                key: safe_extract(key) for key in patterns.keys()
+                'bill_number': bill.text('bill_number'),
+                'subscriber_number': bill.text('subscriber_no'),
+                'billing_period': bill.text('billing_period')
             }
-
-            # Convert numeric values safely
-            def safe_float(value, default=0.0):
-                try:
-                    return float(value) if value != 'N/A' else default
-                except ValueError:
-                    logger.error(f"Could not convert {value} to float")
-                    return default
+            for field in ('bill_number', 'subscriber_no', 'billing_period', 'consumption', 'water_cost',
+                          'wastewater_cost', 'total_amount', 'reading_days'):
+                if field not in bill.values:
+                    logger.warning(f"No match found for {field}")
 
             # Compute metrics
-            total_consumption = safe_float(bill_details['total_consumption'])
-            water_cost = safe_float(bill_details['water_cost'])
-            wastewater_cost = safe_float(bill_details['wastewater_cost'])
-            total_bill = safe_float(bill_details['total_bill'])
-            reading_days = re.findall(r'OKUMA GÜN SAYISI[:]*\s*(\d+)', bill_text)
-            reading_days = int(safe_float(bill_details['reading_days'], default=1))
+            total_consumption = bill.number('consumption')
+            water_cost = bill.number('water_cost')
+            wastewater_cost = bill.number('wastewater_cost')
+            total_bill = bill.number('total_amount')
+            reading_days = bill.get('reading_days') or 1
 
             # Prevent division by zero
             cost_per_cubic_meter = water_cost / total_consumption if total_consumption > 0 else 0
@@ -652,7 +617,7 @@ Additional Insights:
 - Reading Period: {reading_days} days
 """
 
-            logger.info("Bill analysis completed successfully")
+            logger.debug("Bill analysis completed successfully")
 
             return {
                 'raw_text': bill_text,
@@ -683,26 +648,15 @@ Please check the input text and try again.""",
 
 def analyze_bill(file_path: str, log_level=logging.INFO) -> Dict:
     """
-    Convenient function to analyze a bill with configurable logging
+    Convenient function to analyze a bill
     
     Args:
         file_path (str): Path to bill document
-        log_level (int): Logging level
+        log_level (int): Unused; logger levels come from LOG_LEVEL and LOG_LEVELS
     
     Returns:
         Comprehensive bill analysis
     """
-    # Configure logging
-    logging.basicConfig(
-        level=log_level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler('bill_analysis.log', mode='a', encoding='utf-8'),
-            logging.StreamHandler()
-        ]
-    )
-    logger = logging.getLogger('IntelligentBillAnalyzer')
-    
     try:
         # Validate file path
         if not os.path.exists(file_path):
@@ -714,9 +668,9 @@ def analyze_bill(file_path: str, log_level=logging.INFO) -> Dict:
         
         # Log file details
         file_stats = os.stat(file_path)
-        logger.info(f"Analyzing file: {file_path}")
-        logger.info(f"File size: {file_stats.st_size} bytes")
-        logger.info(f"File extension: {os.path.splitext(file_path)[1]}")
+        logger.debug(f"Analyzing file: {file_path}")
+        logger.debug(f"File size: {file_stats.st_size} bytes")
+        logger.debug(f"File extension: {os.path.splitext(file_path)[1]}")
         
         # Initialize analyzer
         analyzer = IntelligentBillAnalyzer()
@@ -726,7 +680,7 @@ def analyze_bill(file_path: str, log_level=logging.INFO) -> Dict:
         
         # Additional logging
         if result.get('success', False):
-            logger.info("Bill analysis completed successfully")
+            logger.debug("Bill analysis completed successfully")
         else:
             logger.warning(f"Bill analysis failed: {result.get('error', 'Unknown error')}")
         
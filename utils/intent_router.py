@@ -0,0 +1,291 @@
+import re
+import logging
+from typing import Dict, Any, Optional, Tuple
+
+from utils.turkish_text import search_key
+from utils.water_tariffs import TARIFFS, calculate_charge, resolve_provider
+
+logger = logging.getLogger(__name__)
+
+# Coordinates for common cities so most weather questions skip geocoding
+KNOWN_CITIES = {
+    'ankara': ('Ankara', 39.9334, 32.8597),
+    'istanbul': ('İstanbul', 41.0082, 28.9784),
+    'izmir': ('İzmir', 38.4237, 27.1428),
+    'bursa': ('Bursa', 40.1885, 29.0610),
+    'antalya': ('Antalya', 36.8969, 30.7133),
+    'konya': ('Konya', 37.8746, 32.4932),
+    'adana': ('Adana', 37.0000, 35.3213),
+    'eskisehir': ('Eskişehir', 39.7767, 30.5206),
+    'kayseri': ('Kayseri', 38.7312, 35.4787),
+    'gaziantep': ('Gaziantep', 37.0662, 37.3833)
+}
+
+TURKISH_CHARS = re.compile(r'[çğıöşüÇĞİÖŞÜ]')
+TURKISH_WORDS = re.compile(r'\b(?:ne|kadar|mı|mi|mu|mü|yarın|bugün|fatura|faturam|yağmur|hava|tarife)\b', re.IGNORECASE)
+
+VOLUME = re.compile(
+    r'(\d+(?:[.,]\d+)?)\s*(?:m³|m3|metreküp|metre\s*küp|cubic\s*met(?:er|re)s?|ton)',
+    re.IGNORECASE
+)
+# Money or tariff wording; a bare "how much" also asks about concrete, pools or crops
+TARIFF_CUE = re.compile(
+    r'\b(?:tarif\w*|aski|askı|iski|cost|costs|price|pay|charge|bill|'
+    r'how\s+much\s+(?:is|would|will)|ne\s+kadar\s+(?:olur|eder|tutar)|'
+    r'fatura\w*|tutar\w*|öde\w*|fiyat\w*|ücret\w*|tl)\b',
+    re.IGNORECASE
+)
+PROVIDER = re.compile(r'\b(aski|askı|iski|İSKİ|ASKİ)\b', re.IGNORECASE)
+
+# Advice and explanation questions are the LLM's job even when they mention a bill or volume
+ADVICE = re.compile(
+    r'\b(?:reduce|lower|save|saving|cut|why|how\s+(?:can|could|do|should)\s+(?:i|we)|tips?|'
+    r'düşür\w*|azalt\w*|tasarruf\w*|neden|niye|nasıl)\b',
+    re.IGNORECASE
+)
+
+WEATHER_CUE = re.compile(
+    r'\b(?:rain|rains|raining|rainy|weather|forecast|precipitation|'
+    r'yağmur|yağış\w*|yağacak|hava\s*durumu\w*|hava\s*tahmini)\b',
+    re.IGNORECASE
+)
+WHEN_TODAY = re.compile(r'\b(?:today|tonight|bugün|bu\s+akşam|bu\s+gece)\b', re.IGNORECASE)
+WHEN_TOMORROW = re.compile(r'\b(?:tomorrow|yarın)\b', re.IGNORECASE)
+WHEN_WEEK = re.compile(
+    r'\b(?:(?:this|next|coming)\s+week|next\s+(?:few|7|seven)\s+days|bu\s+hafta|önümüzdeki\s+(?:hafta|günlerde)|haftaya)\b',
+    re.IGNORECASE
+)
+CITY = re.compile(r"\b(?:in|at|for)\s+([A-ZÇĞİÖŞÜ][\wçğıöşü]+)|\b([A-ZÇĞİÖŞÜ][\wçğıöşü]+)(?:'?(?:da|de|ta|te|için))\b")
+
+BILL_CUE = re.compile(r'\b(?:bill|fatura\w*)\b', re.IGNORECASE)
+BILL_QUESTION = re.compile(
+    r'\b(?:total|amount|how\s+much|owe|toplam|tutar\w*|ne\s+kadar|borç\w*|consumption|tüketim\w*)\b',
+    re.IGNORECASE
+)
+
+
+def is_turkish(message: str) -> bool:
+    """Rough language check used to pick the answer template."""
+    return bool(TURKISH_CHARS.search(message) or TURKISH_WORDS.search(message))
+
+
+def fold_city(name: str) -> str:
+    """Fold a Turkish city name to the ASCII key used in KNOWN_CITIES."""
+    return search_key(name)
+
+
+class IntentRouter:
+    def __init__(self, weather_service=None, bill_parser=None):
+        """
+        Initialize the deterministic intent router
+
+        Args:
+            weather_service: WeatherService used for forecast questions
+            bill_parser: Callable mapping bill text to a details dict
+        """
+        self.weather_service = weather_service
+        self.bill_parser = bill_parser
+
+    def detect(self, message: str, has_bill: bool = False) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Detect an intent that a deterministic engine can answer
+
+        Args:
+            message (str): User message
+            has_bill (bool): Whether bill text accompanies the message
+
+        Returns:
+            Tuple of (intent, slots), or None for free-form chat
+        """
+        advice = ADVICE.search(message)
+
+        # Only an uploaded bill can be read; without one a bill question is for the LLM
+        if has_bill and not advice and BILL_CUE.search(message) and BILL_QUESTION.search(message):
+            return 'bill', {}
+
+        volume = VOLUME.search(message)
+        if volume and not advice and TARIFF_CUE.search(message):
+            provider = PROVIDER.search(message)
+            return 'tariff', {
+                'volume': float(volume.group(1).replace(',', '.')),
+                'provider': provider.group(1) if provider else None
+            }
+
+        # A forecast needs both a weather word and a day to forecast
+        if WEATHER_CUE.search(message):
+            if WHEN_WEEK.search(message):
+                days = 7
+            elif WHEN_TOMORROW.search(message):
+                days = 1
+            elif WHEN_TODAY.search(message):
+                days = 0
+            else:
+                return None
+            city = CITY.search(message)
+            return 'weather', {
+                'city': (city.group(1) or city.group(2)) if city else None,
+                'day': days
+            }
+
+        return None
+
+    def route(self, message: str, bill_text: str = None) -> Optional[Dict[str, Any]]:
+        """
+        Answer a message from a deterministic engine if possible
+
+        Args:
+            message (str): User message
+            bill_text (str, optional): Extracted text of an uploaded bill
+
+        Returns:
+            Dict with intent, response and data, or None to fall through to the LLM
+        """
+        if not message:
+            return None
+
+        detected = self.detect(message, has_bill=bool(bill_text))
+        if not detected:
+            return None
+
+        intent, slots = detected
+        # City names like İzmir carry Turkish letters regardless of the user's language
+        turkish = is_turkish(message.replace(slots.get('city') or '', ''))
+        handlers = {
+            'tariff': self._answer_tariff,
+            'bill': self._answer_bill,
+            'weather': self._answer_weather
+        }
+
+        try:
+            result = handlers[intent](slots, turkish, message=message, bill_text=bill_text)
+        except Exception as e:
+            logger.warning(f"Intent '{intent}' engine failed, falling back to LLM: {e}")
+            return None
+
+        if result is None:
+            return None
+
+        response, data = result
+        logger.debug(f"Routed message to '{intent}' engine")
+        return {'intent': intent, 'response': response, 'data': data}
+
+    def _answer_tariff(self, slots, turkish, **kwargs):
+        provider = resolve_provider(slots['provider'])
+        if provider not in TARIFFS:
+            return None
+
+        charge = calculate_charge(slots['volume'], provider)
+        if not charge['verified']:
+            # Higher tiers are not from the published tariff; don't present a guess as a bill
+            logger.debug(f"{slots['volume']} m³ reaches unverified {provider} tiers, falling back to LLM")
+            return None
+        volume = f"{charge['volume_m3']:g}"
+
+        if turkish:
+            response = (
+                f"{charge['provider']} tarifesine göre {volume} m³ tüketim için tahmini fatura:\n"
+                f"- Su bedeli: {charge['water_cost']:.2f} TL\n"
+                f"- Atıksu bedeli: {charge['wastewater_cost']:.2f} TL\n"
+                f"- ÇTV: {charge['environment_tax']:.2f} TL\n"
+                f"- KDV: {charge['water_vat'] + charge['wastewater_vat']:.2f} TL\n"
+                f"Toplam: {charge['total']:.2f} TL ({charge['effective']} tarifesi)"
+            )
+        else:
+            response = (
+                f"Estimated charge for {volume} m³ on the {charge['provider']} tariff:\n"
+                f"- Water: {charge['water_cost']:.2f} TL\n"
+                f"- Wastewater: {charge['wastewater_cost']:.2f} TL\n"
+                f"- Environmental tax (ÇTV): {charge['environment_tax']:.2f} TL\n"
+                f"- VAT: {charge['water_vat'] + charge['wastewater_vat']:.2f} TL\n"
+                f"Total: {charge['total']:.2f} TL ({charge['effective']} tariff)"
+            )
+
+        return response, charge
+
+    def _answer_bill(self, slots, turkish, message='', bill_text=None, **kwargs):
+        text = bill_text or message
+        details = self.bill_parser(text) if self.bill_parser else {}
+        total = details.get('total_bill')
+
+        if not total or total in ('0.00', 'Bulunamadı'):
+            # Nothing to read the answer from; point the user at the bill analyzer
+            if turkish:
+                return ("Faturanızın toplamını görebilmem için lütfen faturanızı "
+                        "Su Faturası sayfasından yükleyin."), details
+            return ("To read your bill total, please upload your bill on the "
+                    "Water Tax page."), details
+
+        consumption = details.get('total_consumption', 'N/A')
+        if turkish:
+            response = f"Fatura toplamınız: {total} TL. Tüketim: {consumption} m³."
+            if details.get('payment_deadline') not in (None, 'Bulunamadı'):
+                response += f" Son ödeme tarihi: {details['payment_deadline']}."
+        else:
+            response = f"Your bill total is {total} TL for {consumption} m³."
+            if details.get('payment_deadline') not in (None, 'Bulunamadı'):
+                response += f" Payment is due on {details['payment_deadline']}."
+
+        return response, details
+
+    def _answer_weather(self, slots, turkish, **kwargs):
+        if self.weather_service is None or not slots['city']:
+            return None
+
+        known = KNOWN_CITIES.get(fold_city(slots['city']))
+        if known:
+            name, lat, lon = known
+        else:
+            place = self.weather_service.geocode(slots['city'])
+            if not place:
+                return None
+            name, lat, lon = place['name'], place['lat'], place['lon']
+
+        forecast = self.weather_service.get_daily_forecast(lat, lon, days=7)
+        if not forecast:
+            return None
+
+        if slots['day'] == 7:
+            days = forecast
+        else:
+            days = forecast[slots['day']:slots['day'] + 1]
+
+        lines = []
+        for day in days:
+            probability = day['precipitation_probability'] or 0
+            amount = day['precipitation_sum'] or 0
+            if turkish:
+                lines.append(f"{day['date']}: %{probability} yağış olasılığı, {amount} mm, "
+                             f"{day['temperature_min']}–{day['temperature_max']} °C")
+            else:
+                lines.append(f"{day['date']}: {probability}% chance of rain, {amount} mm, "
+                             f"{day['temperature_min']}–{day['temperature_max']} °C")
+
+        rainy = any((day['precipitation_sum'] or 0) >= 2 for day in days)
+        if turkish:
+            advice = ("Yağış bekleniyor, sulamayı erteleyebilirsiniz." if rainy
+                      else "Önemli yağış beklenmiyor; sulamayı sabah erken veya akşam yapın.")
+            response = f"{name} hava tahmini:\n" + "\n".join(lines) + f"\n{advice}"
+        else:
+            advice = ("Rain is expected, so you can postpone irrigation." if rainy
+                      else "No significant rain expected; irrigate early morning or evening.")
+            response = f"Forecast for {name}:\n" + "\n".join(lines) + f"\n{advice}"
+
+        return response, {'location': name, 'forecast': days}
+
+
+def create_intent_router(weather_service=None) -> IntentRouter:
+    """
+    Factory function to create an IntentRouter wired to the local engines
+
+    Args:
+        weather_service: Optional WeatherService instance
+
+    Returns:
+        IntentRouter instance
+    """
+    from utils.water_tax_expert import create_water_expert
+
+    return IntentRouter(
+        weather_service=weather_service,
+        bill_parser=create_water_expert('bill_analysis').extract_bill_details
+    )
@@ -0,0 +1,449 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from typing import Callable, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobFailed(Exception):
+    """Raised by a handler for failures that retrying cannot fix."""
+
+
+class JobTimeout(Exception):
+    """Raised from progress() once a job has run past its timeout."""
+
+
+# Seconds a job's lease outlives its timeout, so the watchdog of the process
+# running it times it out before another process may take the job over
+LEASE_GRACE = 60
+
+
+class JobQueue:
+    def __init__(self,
+                 db_path: str = 'jobs.db',
+                 workers: int = 2,
+                 max_attempts: int = 3,
+                 timeout: float = 600,
+                 result_ttl: int = 3600,
+                 poll_interval: float = 1.0,
+                 retry_delay: float = 5.0):
+        """
+        Durable background job queue stored in SQLite
+
+        Jobs survive worker restarts: a job whose worker disappears is
+        picked up again once its lease (started + timeout + LEASE_GRACE)
+        expires. Within a process a watchdog enforces the timeout: a job
+        still running past it is failed, not retried, since its thread
+        cannot be stopped, and the stuck thread is replaced by a fresh
+        worker. Several processes may share the same database file.
+
+        Args:
+            db_path (str): SQLite database file
+            workers (int): Worker threads in this process
+            max_attempts (int): Default attempts before a job is marked failed
+            timeout (float): Default seconds a single attempt may run
+            result_ttl (int): Seconds finished jobs are kept
+            poll_interval (float): Seconds between polls for new jobs
+            retry_delay (float): Base delay before a retry, doubled per attempt
+        """
+        self.db_path = db_path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+
+        self._handlers = {}
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._threads = []
+        self._spawned = 0
+        self._active = {}
+        self._retired = set()
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        self._last_cleanup = 0.0
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        This thread's connection to the queue database, opened (and the schema created) on first use
+
+        Job kinds that keep their own tables in the queue's database use it,
+        so their writes can share a transaction with enqueue().
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            if not self._schema_ready:
+                with self._lock:
+                    if not self._schema_ready:
+                        self._init_db(conn)
+                        self._schema_ready = True
+        return conn
+
+    def _init_db(self, conn: sqlite3.Connection):
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress REAL DEFAULT 0,
+                message TEXT,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                timeout REAL NOT NULL,
+                created REAL NOT NULL,
+                available_at REAL NOT NULL,
+                started REAL,
+                lease_until REAL,
+                finished REAL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, available_at)')
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any], Callable], Dict[str, Any]],
+                 timeout: Optional[float] = None, max_attempts: Optional[int] = None):
+        """
+        Register the handler for a job kind
+
+        The handler is called as handler(payload, progress) and returns the
+        JSON-serializable result. progress(fraction, message=None) records
+        progress and raises JobTimeout once the attempt is out of time.
+        Raise JobFailed for errors that should not be retried.
+
+        Args:
+            kind (str): Job kind passed to enqueue()
+            handler: Callable (payload, progress) -> result dict
+            timeout (float, optional): Seconds per attempt for this kind
+            max_attempts (int, optional): Attempts for this kind
+        """
+        self._handlers[kind] = {
+            'handler': handler,
+            'timeout': timeout or self.timeout,
+            'max_attempts': max_attempts or self.max_attempts
+        }
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None) -> str:
+        """
+        Queue a job, starting this process's workers if they are not running yet
+
+        Args:
+            kind (str): Registered job kind
+            payload (dict): JSON-serializable arguments. Paths listed under
+                payload['files'] are deleted once the job finishes.
+            job_id (str, optional): ID to queue the job under, for handlers
+                that need it in their payload; a new one when omitted
+
+        Returns:
+            Job ID
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        options = self._handlers[kind]
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        self.connection().execute(
+            '''INSERT INTO jobs (id, kind, payload, status, max_attempts, timeout, created, available_at)
+               VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)''',
+            (job_id, kind, json.dumps(payload, ensure_ascii=False),
+             options['max_attempts'], options['timeout'], now, now)
+        )
+        self.start()
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str, include_result: bool = True, raw_result: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Return the public view of a job, or None if it does not exist
+
+        Args:
+            job_id (str): Job ID returned by enqueue()
+            include_result (bool): Whether to include the result of a completed job
+            raw_result (bool): Return the result as its stored JSON string instead of decoding it
+        """
+        row = self.connection().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+
+        job = {
+            'job_id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'progress': round(row['progress'] or 0, 3),
+            'message': row['message'],
+            'attempts': row['attempts'],
+            'max_attempts': row['max_attempts'],
+            'created': row['created'],
+            'started': row['started'],
+            'finished': row['finished'],
+            'error': row['error']
+        }
+        if include_result and row['status'] == 'completed' and row['result'] is not None:
+            job['result'] = row['result'] if raw_result else json.loads(row['result'])
+        return job
+
+    def start(self):
+        """Start the worker threads and the watchdog; later calls are no-ops."""
+        with self._lock:
+            if self._threads or self.workers <= 0:
+                return
+            for _ in range(self.workers):
+                self._spawn_worker()
+            threading.Thread(target=self._watch, name='job-watchdog', daemon=True).start()
+        logger.info(f"Job queue started with {self.workers} workers on {self.db_path}")
+
+    def _spawn_worker(self):
+        # Called with self._lock held
+        thread = threading.Thread(target=self._work, name=f'job-worker-{self._spawned}', daemon=True)
+        self._spawned += 1
+        self._threads.append(thread)
+        thread.start()
+
+    def _work(self):
+        current = threading.current_thread()
+        while True:
+            if current in self._retired:
+                # Replaced by the watchdog while stuck in a timed-out job
+                with self._lock:
+                    self._retired.discard(current)
+                    self._threads.remove(current)
+                return
+            try:
+                self._maybe_cleanup()
+                job = self._claim()
+                if job is None:
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+                    continue
+                self._run(job)
+            except Exception as e:
+                logger.error(f"Job worker error: {e}")
+                time.sleep(self.poll_interval)
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Atomically take the oldest runnable job, first recovering expired leases."""
+        conn = self.connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            expired = conn.execute(
+                "SELECT id, attempts, max_attempts, payload FROM jobs WHERE status = 'running' AND lease_until < ?",
+                (now,)
+            ).fetchall()
+            for row in expired:
+                self._retry_or_fail(conn, row['id'], row['attempts'], row['max_attempts'],
+                                    row['payload'], 'Timed out', retryable=True)
+
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND available_at <= ? ORDER BY created LIMIT 1",
+                (time.time(),)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    '''UPDATE jobs SET status = 'running', attempts = attempts + 1, started = ?,
+                       lease_until = ?, error = NULL WHERE id = ?''',
+                    (now, now + row['timeout'] + LEASE_GRACE, row['id'])
+                )
+                row = conn.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone()
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return row
+
+    def _run(self, job: sqlite3.Row):
+        """Run one attempt of a job, visible to the watchdog while it runs."""
+        current = threading.current_thread()
+        self._active[job['id']] = {'thread': current, 'attempt': job['attempts'],
+                                   'deadline': job['started'] + job['timeout'], 'timeout': job['timeout']}
+        try:
+            self._attempt(job)
+        finally:
+            entry = self._active.get(job['id'])
+            if entry is not None and entry['thread'] is current:
+                self._active.pop(job['id'], None)
+
+    def _attempt(self, job: sqlite3.Row):
+        job_id, attempt = job['id'], job['attempts']
+        deadline = job['started'] + job['timeout']
+        conn = self.connection()
+
+        def progress(fraction: float, message: Optional[str] = None):
+            conn.execute(
+                "UPDATE jobs SET progress = ?, message = ? WHERE id = ? AND attempts = ? AND status = 'running'",
+                (max(0.0, min(float(fraction), 1.0)), message, job_id, attempt)
+            )
+            if time.time() > deadline:
+                raise JobTimeout(f"Job exceeded its {job['timeout']:g}s timeout")
+
+        options = self._handlers.get(job['kind'])
+        started = time.perf_counter()
+        try:
+            if options is None:
+                raise JobFailed(f"No handler registered for job kind {job['kind']}")
+            result = options['handler'](json.loads(job['payload']), progress)
+            updated = conn.execute(
+                "UPDATE jobs SET status = 'completed', result = ?, progress = 1, finished = ?, lease_until = NULL "
+                "WHERE id = ? AND attempts = ? AND status = 'running'",
+                (json.dumps(result, ensure_ascii=False, default=str), time.time(), job_id, attempt)
+            ).rowcount
+            if updated:
+                self._remove_files(conn, job_id, job['payload'])
+            logger.info(f"Job {job_id} ({job['kind']}) completed in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            retryable = not isinstance(e, JobFailed)
+            logger.warning(f"Job {job_id} ({job['kind']}) attempt {attempt} failed: {e}")
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                current = conn.execute('SELECT status, attempts FROM jobs WHERE id = ?', (job_id,)).fetchone()
+                # Skip if the lease already expired and another worker took the job over
+                if current is not None and current['status'] == 'running' and current['attempts'] == attempt:
+                    self._retry_or_fail(conn, job_id, attempt, job['max_attempts'], job['payload'],
+                                        str(e), retryable)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+    def _watch(self):
+        """Fail this process's jobs that run past their timeout and replace their stuck threads."""
+        while True:
+            time.sleep(self.poll_interval)
+            now = time.time()
+            for job_id, entry in list(self._active.items()):
+                if now > entry['deadline']:
+                    try:
+                        self._time_out(job_id, entry)
+                    except Exception as e:
+                        logger.error(f"Job watchdog error: {e}")
+
+    def _time_out(self, job_id: str, entry: Dict[str, Any]):
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            current = conn.execute(
+                'SELECT status, attempts, max_attempts, payload FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+            timed_out = (current is not None and current['status'] == 'running'
+                         and current['attempts'] == entry['attempt'])
+            if timed_out:
+                # Failed rather than retried: the handler cannot be stopped and would
+                # run alongside the next attempt
+                self._retry_or_fail(conn, job_id, entry['attempt'], current['max_attempts'], current['payload'],
+                                    f"Timed out after {entry['timeout']:g}s", retryable=False)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        if self._active.get(job_id) is entry:
+            self._active.pop(job_id, None)
+        if timed_out:
+            logger.warning(f"Job {job_id} ran past its {entry['timeout']:g}s timeout; "
+                           f"replacing its worker thread {entry['thread'].name}")
+            with self._lock:
+                self._retired.add(entry['thread'])
+                self._spawn_worker()
+
+    def _retry_or_fail(self, conn: sqlite3.Connection, job_id: str, attempts: int, max_attempts: int,
+                       payload: str, error: str, retryable: bool):
+        if retryable and attempts < max_attempts:
+            delay = self.retry_delay * (2 ** (attempts - 1))
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', available_at = ?, lease_until = NULL, error = ? WHERE id = ?",
+                (time.time() + delay, error, job_id)
+            )
+        else:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished = ?, lease_until = NULL, error = ? WHERE id = ?",
+                (time.time(), error, job_id)
+            )
+            self._remove_files(conn, job_id, payload)
+
+    def _remove_files(self, conn: sqlite3.Connection, job_id: str, payload: str):
+        try:
+            files = json.loads(payload).get('files', [])
+        except (ValueError, AttributeError):
+            return
+        for entry in files:
+            path = entry.get('path') if isinstance(entry, dict) else entry
+            if not path or not os.path.exists(path):
+                continue
+            # Uploads are named by content hash, so the file may be shared with another
+            # job, or with one about to be enqueued if it was uploaded again just now;
+            # such files are left for the TTL cleanup
+            in_use = conn.execute(
+                "SELECT 1 FROM jobs WHERE status IN ('queued', 'running') AND id != ? AND instr(payload, ?) > 0",
+                (job_id, json.dumps(path)[1:-1])
+            ).fetchone()
+            if in_use or time.time() - os.path.getmtime(path) < 60:
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove job file {path}: {e}")
+
+    def _maybe_cleanup(self):
+        now = time.time()
+        if now - self._last_cleanup < 60:
+            return
+        self._last_cleanup = now
+        self.cleanup(now)
+
+    def cleanup(self, now: Optional[float] = None) -> int:
+        """
+        Delete finished jobs older than the result TTL
+
+        Returns:
+            Number of jobs removed
+        """
+        now = now or time.time()
+        conn = self.connection()
+        cutoff = now - self.result_ttl
+        rows = conn.execute(
+            "SELECT id, payload FROM jobs WHERE status IN ('completed', 'failed') AND finished < ?",
+            (cutoff,)
+        ).fetchall()
+        for row in rows:
+            self._remove_files(conn, row['id'], row['payload'])
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND finished < ?",
+            (cutoff,)
+        )
+        return len(rows)
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs in each state."""
+        rows = self.connection().execute('SELECT status, COUNT(*) AS n FROM jobs GROUP BY status').fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+
+def create_job_queue() -> JobQueue:
+    """
+    Factory function to create a JobQueue from environment settings
+
+    Returns:
+        Configured JobQueue instance (workers not yet started)
+    """
+    return JobQueue(
+        db_path=os.getenv('JOB_QUEUE_DB', 'jobs.db'),
+        workers=int(os.getenv('JOB_WORKERS', '2')),
+        max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', '3')),
+        timeout=float(os.getenv('JOB_TIMEOUT', '600')),
+        result_ttl=int(os.getenv('JOB_RESULT_TTL', '3600')),
+        poll_interval=float(os.getenv('JOB_POLL_INTERVAL', '1.0')),
+        retry_delay=float(os.getenv('JOB_RETRY_DELAY', '5'))
+    )
@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import traceback
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+
+# Attributes every LogRecord has; anything else was passed via extra= and is logged as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'sampled_out'}
+
+
+def truncate(value: str, limit: int) -> str:
+    """Cut a string to limit characters, noting how much was dropped."""
+    if limit and len(value) > limit:
+        return f"{value[:limit]}... [{len(value) - limit} more chars]"
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the standard fields plus any extra= fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName
+        }
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        if getattr(record, 'sampled_out', 0):
+            entry['sampled_out'] = record.sampled_out
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, max_per_interval: int = 20, interval: float = 60, max_level: int = logging.INFO):
+        """
+        Rate-limit verbose records per call site
+
+        Records at or below max_level from the same logger and line are let
+        through max_per_interval times per interval; the rest are dropped
+        and counted on the next record that gets through.
+
+        Args:
+            max_per_interval (int): Records allowed per call site and interval
+            interval (float): Window length in seconds
+            max_level (int): Highest level that is sampled
+        """
+        super().__init__()
+        self.max_per_interval = max_per_interval
+        self.interval = interval
+        self.max_level = max_level
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level or self.max_per_interval <= 0:
+            return True
+
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            started, count, dropped = self._windows.get(key, (now, 0, 0))
+            if now - started >= self.interval:
+                started, count = now, 0
+            if count >= self.max_per_interval:
+                self._windows[key] = (started, count, dropped + 1)
+                return False
+            self._windows[key] = (started, count + 1, 0)
+
+        if dropped:
+            record.sampled_out = dropped
+        return True
+
+
+class TruncatingQueueHandler(QueueHandler):
+    def __init__(self, log_queue, max_length: int = 2000):
+        """
+        Queue handler that renders and truncates records on the calling thread
+
+        Only a short, argument-free record is queued, so large payloads are
+        neither kept alive nor written on the request path.
+
+        Args:
+            log_queue: Queue shared with the QueueListener
+            max_length (int): Longest message or traceback kept
+        """
+        super().__init__(log_queue)
+        self.max_length = max_length
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = truncate(record.getMessage(), self.max_length)
+        record.args = None
+        if record.exc_info:
+            record.exc_text = truncate(''.join(traceback.format_exception(*record.exc_info)), self.max_length * 4)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Drop rather than block a request thread when the writer falls behind
+            pass
+
+
+def parse_levels(value: str) -> Dict[str, int]:
+    """Parse "werkzeug=WARNING,utils.job_queue=DEBUG" into logger levels."""
+    levels = {}
+    for item in value.split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+def configure_logging():
+    """
+    Install the process-wide logging setup from environment settings
+
+    Every logger propagates to a single QueueHandler on the root logger; a
+    QueueListener thread does the formatting and writing to stderr and,
+    if LOG_FILE_PATH is set, a rotating file. Later calls are no-ops.
+    """
+    global _listener
+
+    with _lock:
+        if _listener is not None:
+            return
+
+        log_queue = queue.Queue(maxsize=int(os.getenv('LOG_QUEUE_SIZE', '10000')))
+        if os.getenv('LOG_FORMAT', 'json').lower() == 'json':
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+        handlers = []
+        console = logging.StreamHandler(sys.stderr)
+        console.setFormatter(formatter)
+        handlers.append(console)
+
+        log_file = os.getenv('LOG_FILE_PATH', '')
+        if log_file:
+            os.makedirs(os.path.dirname(os.path.abspath(log_file)), exist_ok=True)
+            file_handler = RotatingFileHandler(
+                log_file,
+                maxBytes=int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+                backupCount=int(os.getenv('LOG_BACKUP_COUNT', '5')),
+                encoding='utf-8'
+            )
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
+
+        queue_handler = TruncatingQueueHandler(log_queue, max_length=int(os.getenv('LOG_MAX_LENGTH', '2000')))
+        queue_handler.addFilter(SamplingFilter(
+            max_per_interval=int(os.getenv('LOG_SAMPLE_MAX', '20')),
+            interval=float(os.getenv('LOG_SAMPLE_INTERVAL', '60'))
+        ))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(logging.getLevelName(os.getenv('LOG_LEVEL', 'INFO').upper()))
+
+        levels = {'werkzeug': logging.WARNING, 'urllib3': logging.WARNING, 'botocore': logging.WARNING,
+                  'matplotlib': logging.WARNING, 'PIL': logging.WARNING}
+        levels.update(parse_levels(os.getenv('LOG_LEVELS', '')))
+        for name, level in levels.items():
+            logging.getLogger(name).setLevel(level)
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
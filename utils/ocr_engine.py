@@ -0,0 +1,203 @@
+"""
+Warm Tesseract engines for OCR
+
+pytesseract starts a tesseract process for every image, which reloads the
+language data and round-trips the image through temp files each time. When
+the tesserocr binding is installed, each CPU worker process keeps one
+PyTessBaseAPI loaded with OCR_LANGUAGES for its whole life and hands it the
+image buffer directly. Without tesserocr (or when its language data cannot
+be loaded) the same interface runs pytesseract instead.
+"""
+import os
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tesseract languages, '+'-separated; languages without installed data are dropped
+OCR_LANGUAGES = os.getenv('OCR_LANGUAGES', 'tur+eng')
+
+# 'auto' prefers tesserocr, 'tesserocr' or 'pytesseract' force one backend
+OCR_BACKEND = os.getenv('OCR_BACKEND', 'auto').lower()
+
+# Tesseract page segmentation mode (3 = fully automatic)
+OCR_PSM = int(os.getenv('OCR_PSM', '3'))
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+
+def _select_languages(wanted: str, available: List[str]) -> str:
+    languages = [language for language in wanted.split('+') if language in available]
+    if not languages:
+        logger.warning(f"None of the OCR languages {wanted} are installed; using eng")
+        return 'eng'
+    if len(languages) < len(wanted.split('+')):
+        logger.warning(f"Some OCR languages in {wanted} are not installed; using {'+'.join(languages)}")
+    return '+'.join(languages)
+
+
+def _to_array(image):
+    """Grayscale or RGB uint8 numpy array from a PIL image or array."""
+    import numpy as np
+
+    if hasattr(image, 'mode'):
+        if image.mode not in ('L', 'RGB'):
+            image = image.convert('RGB')
+        image = np.asarray(image)
+    return np.ascontiguousarray(image, dtype=np.uint8)
+
+
+class TesserocrEngine:
+    name = 'tesserocr'
+
+    def __init__(self, languages: str = OCR_LANGUAGES, psm: int = OCR_PSM):
+        """
+        A loaded Tesseract API that is reused for every image
+
+        Args:
+            languages (str): '+'-separated Tesseract languages
+            psm (int): Page segmentation mode
+        """
+        _, available = tesserocr.get_languages()
+        self.languages = _select_languages(languages, available)
+        self.psm = psm
+        self.api = tesserocr.PyTessBaseAPI(lang=self.languages, psm=psm)
+
+    def _set_image(self, image, psm: Optional[int], whitelist: Optional[str]):
+        pixels = _to_array(image)
+        height, width = pixels.shape[:2]
+        channels = 1 if pixels.ndim == 2 else pixels.shape[2]
+        self.api.SetPageSegMode(self.psm if psm is None else psm)
+        self.api.SetVariable('tessedit_char_whitelist', whitelist or '')
+        self.api.SetImageBytes(pixels.tobytes(), width, height, channels, width * channels)
+
+    def image_to_string(self, image, psm: Optional[int] = None, whitelist: Optional[str] = None) -> str:
+        """OCR a numpy array or PIL image without copying it through a file."""
+        self._set_image(image, psm, whitelist)
+        try:
+            return self.api.GetUTF8Text()
+        finally:
+            self.api.Clear()
+
+    def words(self, image, psm: Optional[int] = None, whitelist: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Recognized words with their pixel boxes, confidences (0-100) and line numbers."""
+        self._set_image(image, psm, whitelist)
+        try:
+            self.api.Recognize()
+            words = []
+            iterator = self.api.GetIterator()
+            level = tesserocr.RIL.WORD
+            line = -1
+            for word in tesserocr.iterate_level(iterator, level):
+                if word.IsAtBeginningOf(tesserocr.RIL.TEXTLINE):
+                    line += 1
+                text = word.GetUTF8Text(level)
+                box = word.BoundingBox(level)
+                if text and box:
+                    left, top, right, bottom = box
+                    words.append({'text': text, 'left': left, 'top': top, 'width': right - left,
+                                  'height': bottom - top, 'conf': word.Confidence(level), 'line': max(line, 0)})
+            return words
+        finally:
+            self.api.Clear()
+
+    def close(self):
+        self.api.End()
+
+
+class PytesseractEngine:
+    name = 'pytesseract'
+
+    def __init__(self, languages: str = OCR_LANGUAGES, psm: int = OCR_PSM):
+        """
+        Tesseract through pytesseract, one tesseract process per image
+
+        Args:
+            languages (str): '+'-separated Tesseract languages
+            psm (int): Page segmentation mode
+        """
+        import pytesseract
+
+        self._pytesseract = pytesseract
+        try:
+            available = pytesseract.get_languages(config='')
+        except Exception:
+            available = languages.split('+')
+        self.languages = _select_languages(languages, available)
+        self.psm = psm
+
+    def _config(self, psm: Optional[int], whitelist: Optional[str] = None) -> str:
+        config = f'--psm {self.psm if psm is None else psm}'
+        if whitelist:
+            config += f' -c tessedit_char_whitelist={whitelist}'
+        return config
+
+    def image_to_string(self, image, psm: Optional[int] = None, whitelist: Optional[str] = None) -> str:
+        return self._pytesseract.image_to_string(image, lang=self.languages, config=self._config(psm, whitelist))
+
+    def words(self, image, psm: Optional[int] = None, whitelist: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Recognized words with their pixel boxes, confidences (0-100) and line numbers, from Tesseract's TSV output."""
+        data = self._pytesseract.image_to_data(image, lang=self.languages, config=self._config(psm, whitelist),
+                                               output_type=self._pytesseract.Output.DICT)
+        lines: Dict[tuple, int] = {}
+        words = []
+        for i, text in enumerate(data['text']):
+            if not text.strip():
+                continue
+            line = lines.setdefault((data['block_num'][i], data['par_num'][i], data['line_num'][i]), len(lines))
+            words.append({'text': text, 'left': data['left'][i], 'top': data['top'][i], 'width': data['width'][i],
+                          'height': data['height'][i], 'conf': float(data['conf'][i]), 'line': line})
+        return words
+
+    def close(self):
+        pass
+
+
+def create_ocr_engine(backend: str = OCR_BACKEND):
+    """
+    Create an OCR engine for the configured backend
+
+    Args:
+        backend (str): 'auto', 'tesserocr' or 'pytesseract'
+
+    Returns:
+        TesserocrEngine, or PytesseractEngine when tesserocr is unavailable
+    """
+    if backend in ('auto', 'tesserocr') and tesserocr is not None:
+        try:
+            return TesserocrEngine()
+        except RuntimeError as e:
+            logger.warning(f"Could not start tesserocr, falling back to pytesseract: {e}")
+    elif backend == 'tesserocr':
+        logger.warning("tesserocr is not installed, falling back to pytesseract")
+    return PytesseractEngine()
+
+
+# One engine per thread: CPU worker processes run a single task thread, so
+# this is one warm engine per worker; inline execution gets one per request thread
+_engines = threading.local()
+
+
+def get_ocr_engine():
+    """Get the OCR engine of the current thread, creating it on first use."""
+    engine = getattr(_engines, 'engine', None)
+    if engine is None:
+        engine = _engines.engine = create_ocr_engine()
+        logger.info(f"Started {engine.name} OCR engine ({engine.languages}) in process {os.getpid()}")
+    return engine
+
+
+def image_to_string(image, psm: Optional[int] = None, whitelist: Optional[str] = None) -> str:
+    """
+    OCR a numpy array or PIL image with the current thread's engine
+
+    Args:
+        image: Numpy array or PIL image
+        psm (int, optional): Page segmentation mode for this image only
+        whitelist (str, optional): The only characters Tesseract may output
+    """
+    return get_ocr_engine().image_to_string(image, psm, whitelist)
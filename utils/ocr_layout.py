@@ -0,0 +1,266 @@
+"""
+Word-level bill OCR with selective re-OCR of weak field values
+
+Full-page OCR returns Tesseract's words with their boxes and confidences
+(the TSV output) rather than plain text. The page text is rebuilt from the
+words, the bill parser locates the values of OCR_REFINE_FIELDS in it, and
+each value with a word under OCR_REFINE_MIN_CONF is read again on its own:
+only its box is rendered at OCR_REFINE_SCALE times the resolution (from the
+PDF itself when a renderer is given, otherwise by upscaling the page
+image) and OCRed as a single line with the field kind's character
+whitelist, then as a block. The most confident reading that still parses as
+the field's kind replaces the value in the weak words; text of those words
+outside the value, e.g. the label of "TUTAR:1.234,5S", is kept.
+
+A hard page costs one full-page OCR plus a few small crops, instead of a
+second OCR of the whole page at a higher resolution.
+"""
+import os
+import re
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils.bill_parser import KINDS, get_bill_parser, normalize_bill_text
+from utils.ocr_engine import get_ocr_engine
+
+logger = logging.getLogger(__name__)
+
+# Fields whose values are re-read when OCR is unsure of them; empty disables re-OCR
+OCR_REFINE_FIELDS = [name.strip() for name in
+                     os.getenv('OCR_REFINE_FIELDS', 'total_amount,billing_period,consumption').split(',')
+                     if name.strip()]
+
+# Tesseract word confidence (0-100) below which a field value is re-read
+OCR_REFINE_MIN_CONF = float(os.getenv('OCR_REFINE_MIN_CONF', '70'))
+
+# Resolution multiplier weak regions are re-read at
+OCR_REFINE_SCALE = float(os.getenv('OCR_REFINE_SCALE', '2'))
+
+# Most regions re-read per page, weakest first
+OCR_REFINE_MAX_REGIONS = int(os.getenv('OCR_REFINE_MAX_REGIONS', '6'))
+
+# Page segmentation modes tried on a region: a single text line, then a uniform block
+_REFINE_PSMS = (7, 6)
+
+# Characters Tesseract may output when re-reading a value of each kind
+_WHITELISTS = {
+    'id': '0123456789',
+    'count': '0123456789',
+    'amount': '0123456789.,',
+    'volume': '0123456789.,',
+    'date': '0123456789./-',
+    'time': '0123456789:',
+}
+
+_VALUE_PATTERNS = {kind: re.compile(pattern) for kind, (pattern, _) in KINDS.items()}
+
+# (left, top, right, bottom) in page pixels
+Box = Tuple[int, int, int, int]
+
+# Renders a box of the page at a multiple of the page's resolution, as a grayscale array
+Renderer = Callable[[Box, float], Any]
+
+
+def layout_text(words: Sequence[Dict[str, Any]]) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    Page text with one line per OCR line
+
+    Returns:
+        The text, and the (start, end) offsets of each word in it
+    """
+    parts, spans = [], []
+    offset, line = 0, None
+    for word in words:
+        if parts:
+            parts.append(' ' if word['line'] == line else '\n')
+            offset += 1
+        line = word['line']
+        parts.append(word['text'])
+        spans.append((offset, offset + len(word['text'])))
+        offset += len(word['text'])
+    return ''.join(parts), spans
+
+
+def upscale_region(gray) -> Renderer:
+    """Renderer that crops the page image and enlarges the crop."""
+    def render(box: Box, scale: float):
+        import cv2
+
+        left, top, right, bottom = box
+        return cv2.resize(gray[top:bottom, left:right], None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+
+    return render
+
+
+def weak_regions(words: Sequence[Dict[str, Any]], spans: Sequence[Tuple[int, int]], text: str,
+                 fields: Sequence[str] = OCR_REFINE_FIELDS,
+                 min_conf: float = OCR_REFINE_MIN_CONF) -> List[Dict[str, Any]]:
+    """
+    Field values OCR is unsure of, weakest first
+
+    A value is the words its parsed span covers; when what follows a label
+    does not parse as the field's kind, it is the next word on the label's
+    line. Values whose words all reach min_conf are left alone.
+
+    Returns:
+        Dicts with field, kind, words (indices into words), conf (the lowest
+        word confidence), and prefix and suffix, the text of the first and
+        last word before and after the value
+    """
+    regions, taken = [], set()
+    for hit in get_bill_parser().locate(text, fields):
+        if hit['value'] is not None:
+            start, end = hit['value']
+            indices = [i for i, (first, last) in enumerate(spans) if first < end and last > start]
+        else:
+            after = [i for i, (first, _) in enumerate(spans) if first >= hit['label_end']][:1]
+            indices = [i for i in after if '\n' not in text[hit['label_end']:spans[i][0]]]
+        if not indices or taken.intersection(indices):
+            continue
+
+        conf = min(words[i]['conf'] for i in indices)
+        if conf >= min_conf:
+            continue
+        taken.update(indices)
+        prefix = suffix = ''
+        if hit['value'] is not None:
+            prefix = text[spans[indices[0]][0]:max(start, spans[indices[0]][0])]
+            suffix = text[min(end, spans[indices[-1]][1]):spans[indices[-1]][1]]
+        regions.append({'field': hit['field'], 'kind': hit['kind'], 'words': indices, 'conf': conf,
+                        'prefix': prefix, 'suffix': suffix})
+
+    regions.sort(key=lambda region: region['conf'])
+    return regions
+
+
+def _value_box(region: Dict[str, Any], words: Sequence[Dict[str, Any]], shape) -> Box:
+    """
+    Bounding box of a region's value, padded by half a line height and clipped to the page
+
+    Where the value starts or ends inside a word, the box is cut at the
+    value's share of the word's characters and not padded on that side, so
+    the crop leaves out the label or unit glued to it.
+    """
+    weak = [words[i] for i in region['words']]
+    left = min(word['left'] for word in weak)
+    top = min(word['top'] for word in weak)
+    right = max(word['left'] + word['width'] for word in weak)
+    bottom = max(word['top'] + word['height'] for word in weak)
+    pad = max(4, max(word['height'] for word in weak) // 2)
+    pad_left = pad_right = pad
+    if region.get('prefix'):
+        first = weak[0]
+        left = first['left'] + first['width'] * len(region['prefix']) // len(first['text'])
+        pad_left = 0
+    if region.get('suffix'):
+        last = weak[-1]
+        right = last['left'] + last['width'] - last['width'] * len(region['suffix']) // len(last['text'])
+        pad_right = 0
+    height, width = shape[:2]
+    return max(0, left - pad_left), max(0, top - pad), min(width, right + pad_right), min(height, bottom + pad)
+
+
+def reread_region(region: Dict[str, Any], words: Sequence[Dict[str, Any]], shape, render: Renderer,
+                  engine=None, scale: float = OCR_REFINE_SCALE) -> Optional[Dict[str, Any]]:
+    """
+    OCR one weak field value again at a higher resolution
+
+    Args:
+        region (dict): From weak_regions
+        words (list): The page's OCR words
+        shape (tuple): Page image shape
+        render (callable): Renderer of page regions
+        engine (optional): OCR engine; the current thread's when omitted
+        scale (float): Resolution multiplier
+
+    Returns:
+        One word in page pixels replacing the region's words, with the new
+        reading between the region's prefix and suffix, or None when no
+        reading parsed as the field's kind more confidently
+    """
+    engine = engine or get_ocr_engine()
+    weak = [words[i] for i in region['words']]
+    box = _value_box(region, words, shape)
+    if box[2] - box[0] < 4 or box[3] - box[1] < 4:
+        return None
+    image = render(box, scale)
+
+    kind = region['kind']
+    whitelist = _WHITELISTS.get(kind)
+    best, best_conf = None, region['conf']
+    for psm in _REFINE_PSMS:
+        candidate = engine.words(image, psm=psm, whitelist=whitelist)
+        if not candidate:
+            continue
+        separator = '' if whitelist else ' '
+        text = separator.join(word['text'].strip() for word in candidate)
+        conf = min(word['conf'] for word in candidate)
+        if conf > best_conf and _VALUE_PATTERNS[kind].fullmatch(normalize_bill_text(text)):
+            best, best_conf = text, conf
+        if best_conf >= OCR_REFINE_MIN_CONF:
+            break
+
+    if best is None:
+        return None
+    left, top = min(word['left'] for word in weak), min(word['top'] for word in weak)
+    return {
+        'text': region.get('prefix', '') + best + region.get('suffix', ''),
+        'left': left,
+        'top': top,
+        'width': max(word['left'] + word['width'] for word in weak) - left,
+        'height': max(word['top'] + word['height'] for word in weak) - top,
+        'conf': best_conf,
+        'line': weak[0]['line'],
+        'refined': True
+    }
+
+
+def read_page(gray, engine=None, fields: Sequence[str] = OCR_REFINE_FIELDS,
+              render: Optional[Renderer] = None) -> Dict[str, Any]:
+    """
+    OCR a page into words and re-read the weak values of the given fields
+
+    Args:
+        gray: Grayscale page as numpy array
+        engine (optional): OCR engine; the current thread's when omitted
+        fields (list): Bill fields whose weak values are re-read
+        render (callable, optional): Renders page regions at a higher
+            resolution, e.g. from the source PDF; upscales gray when omitted
+
+    Returns:
+        Dict with text, words (text, box, conf, line), mean_conf, weak and
+        refined region counts, and seconds
+    """
+    engine = engine or get_ocr_engine()
+    started = time.perf_counter()
+    words = engine.words(gray)
+    text, spans = layout_text(words)
+
+    regions = weak_regions(words, spans, text, fields)[:OCR_REFINE_MAX_REGIONS] if fields else []
+    render = render or upscale_region(gray)
+    replacements = {}
+    for region in regions:
+        word = reread_region(region, words, gray.shape, render, engine)
+        if word is not None:
+            replacements[region['words'][0]] = word
+            replacements.update({i: None for i in region['words'][1:]})
+
+    if replacements:
+        words = [replacements.get(i, word) for i, word in enumerate(words)]
+        words = [word for word in words if word is not None]
+        text, _ = layout_text(words)
+
+    confidences = [word['conf'] for word in words if word['conf'] >= 0]
+    seconds = round(time.perf_counter() - started, 3)
+    refined = sum(1 for word in replacements.values() if word is not None)
+    if regions:
+        logger.info(f"Re-read {refined}/{len(regions)} weak field values of a page in {seconds:.2f}s")
+    return {
+        'text': text,
+        'words': words,
+        'mean_conf': round(sum(confidences) / len(confidences), 1) if confidences else 0.0,
+        'weak_regions': len(regions),
+        'refined': refined,
+        'seconds': seconds
+    }
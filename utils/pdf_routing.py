@@ -0,0 +1,78 @@
+"""
+Per-page extractor routing for PDFs
+
+Bills often mix a digital first page with scanned attachments, so one
+decision per document either OCRs pages that have a perfectly good text
+layer or misses the scanned ones. Each page is classified from its
+profile (cpu_tasks.pdf_page_profiles) instead:
+
+    text      enough characters in the text layer, or fonts on a page that
+              images do not cover: read the text layer directly (free)
+    skip      no text, no images and next to no drawing: a blank page
+    ocr       a scanned or image-only page: rasterize and OCR locally
+    textract  same, when local OCR is not installed, or when local OCR
+              returned next to nothing for the page
+
+Pages are routed to the cheapest extractor that can read them and merged
+back in page order by progressive_extraction.iter_pdf_text.
+"""
+import os
+import shutil
+from typing import Any, Dict
+
+from utils.ocr_engine import tesserocr
+
+# Non-space characters at which a page's text layer is trusted as is
+PDF_TEXT_MIN_CHARS = int(os.getenv('PDF_TEXT_MIN_CHARS', '200'))
+
+# Share of a page covered by images above which a thin text layer is treated as a scan
+PDF_SCAN_COVERAGE = float(os.getenv('PDF_SCAN_COVERAGE', '0.3'))
+
+# Path painting operators above which a page without fonts or images is
+# assumed to carry text converted to outlines, rather than be blank
+PDF_VECTOR_TEXT_OPS = int(os.getenv('PDF_VECTOR_TEXT_OPS', '500'))
+
+# Local OCR output shorter than this (non-space characters) is retried with Textract
+PDF_OCR_MIN_CHARS = int(os.getenv('PDF_OCR_MIN_CHARS', '40'))
+
+ROUTE_TEXT = 'text'
+ROUTE_SKIP = 'skip'
+ROUTE_OCR = 'ocr'
+ROUTE_TEXTRACT = 'textract'
+
+
+def local_ocr_available() -> bool:
+    """Whether PDF pages can be rasterized (poppler) and OCRed (Tesseract) here."""
+    return bool(shutil.which('pdftoppm')) and (tesserocr is not None or bool(shutil.which('tesseract')))
+
+
+def classify_page(profile: Dict[str, Any], local_ocr: bool = True, textract: bool = False) -> str:
+    """
+    Pick the cheapest extractor that can read a page
+
+    Args:
+        profile (dict): Page profile from cpu_tasks.pdf_page_profiles
+        local_ocr (bool): Whether local OCR is available
+        textract (bool): Whether Textract may be called
+
+    Returns:
+        One of ROUTE_TEXT, ROUTE_SKIP, ROUTE_OCR, ROUTE_TEXTRACT
+    """
+    chars = profile['chars']
+    if chars >= PDF_TEXT_MIN_CHARS:
+        return ROUTE_TEXT
+
+    coverage = profile.get('image_coverage', 0.0)
+    if chars and profile.get('fonts') and coverage < PDF_SCAN_COVERAGE:
+        return ROUTE_TEXT
+    if not chars and not coverage and profile.get('paint_ops', 0) < PDF_VECTOR_TEXT_OPS:
+        return ROUTE_SKIP
+
+    if textract and not local_ocr:
+        return ROUTE_TEXTRACT
+    return ROUTE_OCR
+
+
+def needs_textract(ocr_text: str) -> bool:
+    """Whether local OCR of a page came back too short to trust."""
+    return len(''.join(ocr_text.split())) < PDF_OCR_MIN_CHARS
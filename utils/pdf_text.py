@@ -0,0 +1,206 @@
+"""
+Pluggable PDF text-layer extraction backends
+
+Every text-layer read (read_file_content, IntelligentBillAnalyzer,
+process_farmer_file, progressive bill extraction) goes through
+cpu_tasks.pdf_pages, which uses the backend chosen here:
+
+    pdfium    pypdfium2, Chrome's PDF engine; C speed, Apache/BSD licensed
+    pymupdf   PyMuPDF (MuPDF); similar speed, AGPL licensed, so it is
+              only used when installed deliberately
+    pypdf2    PyPDF2, pure Python; always available, slowest
+
+PDF_TEXT_BACKEND=auto picks the first installed of pdfium, pymupdf and
+pypdf2. Extraction runs sandboxed in CPU worker processes: a worker that
+runs past the 'pdf' task timeout is killed, and memory_cap limits how much
+address space a malformed or hostile PDF can make it map. With CPU_WORKERS=0
+extraction runs inline in the app process and is not capped. Compare the
+backends with "Catch Bugs/benchmark_pdf_backends.py".
+"""
+import io
+import os
+import logging
+from contextlib import contextmanager
+from typing import List, Optional, Sequence, Union
+
+logger = logging.getLogger(__name__)
+
+# 'auto', or one of BACKENDS to force it
+PDF_TEXT_BACKEND = os.getenv('PDF_TEXT_BACKEND', 'auto').lower()
+
+# Address space (MB) an extraction may add to its worker before allocations fail; 0 disables
+PDF_EXTRACT_MAX_MB = int(os.getenv('PDF_EXTRACT_MAX_MB', '1024'))
+
+# A file path, or the file's bytes
+Source = Union[str, bytes]
+
+
+def _address_space() -> Optional[int]:
+    """Bytes of address space this process maps, where /proc is available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@contextmanager
+def memory_cap(extra_mb: int = PDF_EXTRACT_MAX_MB):
+    """
+    Limit the process's address space to its current size plus extra_mb
+
+    Allocations past the cap fail (MemoryError, or an error from the PDF
+    library) instead of the worker growing until the container is OOM
+    killed. The previous limit is restored afterwards, so the worker can
+    go on serving other task types.
+
+    The limit applies to the whole process, so it is only set in CPU worker
+    processes, which run one task at a time; elsewhere (CPU_WORKERS=0, where
+    tasks run inline on request threads) this is a no-op.
+    """
+    from utils.cpu_executor import in_worker_process
+
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    capped = resource is not None and extra_mb > 0 and in_worker_process()
+    current = _address_space() if capped else None
+    if current is None:
+        yield
+        return
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = current + extra_mb * 1024 * 1024
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    try:
+        yield
+    finally:
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+def _page_numbers(pages: Optional[Sequence[int]], count: int) -> List[int]:
+    return list(pages) if pages is not None else list(range(1, count + 1))
+
+
+class PdfiumBackend:
+    name = 'pdfium'
+
+    def __init__(self):
+        import pypdfium2
+        self.pdfium = pypdfium2
+
+    def _open(self, source: Source):
+        return self.pdfium.PdfDocument(bytes(source) if isinstance(source, (bytes, bytearray)) else source)
+
+    def page_count(self, source: Source) -> int:
+        document = self._open(source)
+        try:
+            return len(document)
+        finally:
+            document.close()
+
+    def page_texts(self, source: Source, pages: Optional[Sequence[int]] = None) -> List[str]:
+        """Text of each page, '' for pages without a text layer."""
+        document = self._open(source)
+        try:
+            texts = []
+            for number in _page_numbers(pages, len(document)):
+                page = document[number - 1]
+                textpage = page.get_textpage()
+                try:
+                    texts.append(textpage.get_text_range().replace('\r\n', '\n'))
+                finally:
+                    textpage.close()
+                    page.close()
+            return texts
+        finally:
+            document.close()
+
+
+class PyMuPDFBackend:
+    name = 'pymupdf'
+
+    def __init__(self):
+        import pymupdf
+        self.pymupdf = pymupdf
+
+    def _open(self, source: Source):
+        if isinstance(source, (bytes, bytearray)):
+            return self.pymupdf.open(stream=bytes(source), filetype='pdf')
+        return self.pymupdf.open(source)
+
+    def page_count(self, source: Source) -> int:
+        with self._open(source) as document:
+            return document.page_count
+
+    def page_texts(self, source: Source, pages: Optional[Sequence[int]] = None) -> List[str]:
+        """Text of each page, '' for pages without a text layer."""
+        with self._open(source) as document:
+            return [document[number - 1].get_text() for number in _page_numbers(pages, document.page_count)]
+
+
+class PyPDF2Backend:
+    name = 'pypdf2'
+
+    def __init__(self):
+        import PyPDF2
+        self.PyPDF2 = PyPDF2
+
+    def _open(self, source: Source):
+        return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else open(source, 'rb')
+
+    def page_count(self, source: Source) -> int:
+        with self._open(source) as f:
+            return len(self.PyPDF2.PdfReader(f).pages)
+
+    def page_texts(self, source: Source, pages: Optional[Sequence[int]] = None) -> List[str]:
+        """Text of each page, '' for pages without a text layer."""
+        with self._open(source) as f:
+            reader = self.PyPDF2.PdfReader(f)
+            return [reader.pages[number - 1].extract_text() or ''
+                    for number in _page_numbers(pages, len(reader.pages))]
+
+
+BACKENDS = {
+    'pdfium': PdfiumBackend,
+    'pymupdf': PyMuPDFBackend,
+    'pypdf2': PyPDF2Backend,
+}
+
+
+def create_pdf_backend(name: str = PDF_TEXT_BACKEND):
+    """
+    Factory function to create a PDF text backend
+
+    Args:
+        name (str): 'auto' or a key of BACKENDS
+
+    Returns:
+        The backend; for 'auto', the first of BACKENDS whose library is installed
+    """
+    if name != 'auto':
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown PDF_TEXT_BACKEND {name!r}; use auto or one of {', '.join(BACKENDS)}")
+        return BACKENDS[name]()
+
+    for backend in BACKENDS.values():
+        try:
+            return backend()
+        except ImportError:
+            continue
+    raise ImportError("No PDF text backend is installed (pypdfium2, pymupdf or PyPDF2)")
+
+
+_backend = None
+
+
+def get_pdf_backend():
+    """Get this process's PDF text backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        _backend = create_pdf_backend()
+        logger.info(f"PDF text backend: {_backend.name}")
+    return _backend
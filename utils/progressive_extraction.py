@@ -0,0 +1,194 @@
+"""
+Progressive bill text extraction
+
+Bills put the total, consumption and period on the first page, so reading
+and OCRing every page of a statement before parsing wastes most of the
+work. iter_pdf_text yields a PDF's text page by page, each page routed to
+the cheapest extractor that can read it (see utils/pdf_routing.py); an
+IncrementalFieldParser is fed each page, and extraction stops (cancelling
+pages not yet OCRed) once every required field has been found with enough
+confidence.
+"""
+import os
+import logging
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from utils import cpu_tasks
+from utils.bill_parser import ParsedBill, parse_bill
+from utils.cpu_executor import run_cpu_task
+from utils.pdf_ocr import iter_pdf_ocr
+from utils.pdf_routing import (
+    PDF_TEXT_MIN_CHARS, ROUTE_OCR, ROUTE_TEXT, ROUTE_TEXTRACT, classify_page, local_ocr_available, needs_textract
+)
+
+logger = logging.getLogger(__name__)
+
+# Lowest confidence at which a field counts as found
+BILL_FIELD_MIN_CONFIDENCE = float(os.getenv('BILL_FIELD_MIN_CONFIDENCE', '0.75'))
+
+# Trust in text by where it came from; a text layer is exact, OCR is not
+SOURCE_CONFIDENCE = {'Text layer': 1.0, 'Textract': 0.95, 'Tesseract': 0.9}
+
+# Characters of the previous page kept so a match may span a page break
+_CARRY_OVER = 200
+
+
+class IncrementalFieldParser:
+    def __init__(self, required: Sequence[str], min_confidence: float = BILL_FIELD_MIN_CONFIDENCE,
+                 provider: Optional[str] = None):
+        """
+        Bill field parser fed one chunk of text at a time
+
+        Args:
+            required (list): utils.bill_parser field names that complete the parse
+            min_confidence (float): Confidence a required field needs to count as found
+            provider (str, optional): Provider key; detected from the text when omitted
+        """
+        self.required = list(required)
+        self.min_confidence = min_confidence
+        self.bill = ParsedBill(provider)
+        self._tail = ''
+
+    def feed(self, text: str, source_confidence: float = 1.0) -> bool:
+        """
+        Parse one more chunk; a field keeps its most confident value
+
+        Returns:
+            True when every required field is found
+        """
+        window = self._tail + text
+        self._tail = text[-_CARRY_OVER:]
+        self.bill.merge(parse_bill(window, source_confidence, self.bill.provider))
+        return self.complete
+
+    @property
+    def fields(self) -> Dict[str, str]:
+        return {name: self.bill.text(name) for name in self.bill.values}
+
+    @property
+    def confidence(self) -> Dict[str, float]:
+        return dict(self.bill.confidence)
+
+    @property
+    def missing(self) -> List[str]:
+        return [name for name in self.required if self.bill.confidence.get(name, 0.0) < self.min_confidence]
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing
+
+
+def iter_pdf_text(pdf_path: str, digest: Optional[str] = None,
+                  textract: Optional[Callable[[bytes], str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the text of a PDF page by page, each page read by the cheapest extractor that can
+
+    Pages are routed by pdf_routing.classify_page: text layers are read
+    directly, blank pages are skipped, scanned pages are OCRed locally in
+    parallel, and pages local OCR cannot read (or cannot run on) go to
+    Textract one page at a time. The first page is profiled on its own so a
+    one-page answer costs one page. Pages are yielded in page order; closing
+    the generator cancels OCR not yet started.
+
+    Args:
+        pdf_path (str): Path to the PDF
+        digest (str, optional): Precomputed SHA-256 of the PDF, for the OCR cache
+        textract (callable, optional): Single-page PDF bytes -> text; Textract is not used without it
+
+    Yields:
+        Dicts with page, page_count, text, method and, for OCRed pages, seconds and cached
+    """
+    count = run_cpu_task('pdf', cpu_tasks.pdf_page_count, pdf_path)
+    if not count:
+        return
+
+    local_ocr = local_ocr_available()
+
+    def route(profile):
+        return classify_page(profile, local_ocr, textract is not None)
+
+    def textract_chunk(page):
+        document = run_cpu_task('pdf', cpu_tasks.pdf_page_document, pdf_path, page)
+        return {'page': page, 'page_count': count, 'text': textract(document), 'method': 'Textract'}
+
+    profiles = {1: run_cpu_task('pdf', cpu_tasks.pdf_page_profiles, pdf_path, [1], PDF_TEXT_MIN_CHARS)[0]}
+    if route(profiles[1]) == ROUTE_TEXT:
+        yield {'page': 1, 'page_count': count, 'text': profiles[1]['text'], 'method': 'Text layer'}
+
+    rest = list(range(2, count + 1))
+    if rest:
+        for profile in run_cpu_task('pdf', cpu_tasks.pdf_page_profiles, pdf_path, rest, PDF_TEXT_MIN_CHARS):
+            profiles[profile['page']] = profile
+    routes = {page: route(profile) for page, profile in profiles.items()}
+    logger.info(f"PDF page routes: {routes}")
+
+    scanned = [page for page in range(1, count + 1) if routes[page] == ROUTE_OCR]
+    ocr = iter_pdf_ocr(pdf_path, scanned, digest=digest) if scanned else iter(())
+    try:
+        for page in range(1, count + 1):
+            if routes[page] == ROUTE_OCR:
+                result = next(ocr)
+                if textract is not None and needs_textract(result['text']):
+                    logger.info(f"Local OCR read too little of page {page}; using Textract")
+                    yield textract_chunk(page)
+                else:
+                    yield {'page': page, 'page_count': count, 'text': result['text'], 'method': 'Tesseract',
+                           'seconds': result['seconds'], 'cached': result['cached']}
+            elif routes[page] == ROUTE_TEXTRACT:
+                yield textract_chunk(page)
+            elif routes[page] == ROUTE_TEXT and page > 1:
+                yield {'page': page, 'page_count': count, 'text': profiles[page]['text'], 'method': 'Text layer'}
+    finally:
+        if scanned:
+            ocr.close()
+
+
+def extract_until_complete(chunks: Iterable[Dict[str, Any]], parser: IncrementalFieldParser) -> Dict[str, Any]:
+    """
+    Feed text chunks to a parser until its required fields are found
+
+    Args:
+        chunks: Chunks as yielded by iter_pdf_text
+        parser (IncrementalFieldParser): Parser to feed
+
+    Returns:
+        Dict with full_text, extraction_method, fields, and the pages read with the method of each
+    """
+    texts, methods, ocr_seconds, page_methods = [], [], [], []
+    page_count = 0
+    stopped_early = False
+    try:
+        for chunk in chunks:
+            texts.append(chunk['text'])
+            page_count = chunk['page_count']
+            page_methods.append({'page': chunk['page'], 'method': chunk['method']})
+            if chunk['method'] not in methods:
+                methods.append(chunk['method'])
+            if chunk['method'] == 'Tesseract':
+                ocr_seconds.append(chunk['seconds'])
+
+            if parser.feed(chunk['text'], SOURCE_CONFIDENCE.get(chunk['method'], 1.0)):
+                # Skipped blank pages do not count as unread
+                stopped_early = chunk['page'] < page_count
+                break
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+    if stopped_early:
+        logger.info(f"Required bill fields found after {len(texts)} of {page_count} pages")
+
+    result = {
+        'full_text': "".join(text + "\n" for text in texts),
+        'extraction_method': '+'.join(methods),
+        'fields': parser.fields,
+        'field_confidence': parser.confidence,
+        'pages_read': len(texts),
+        'page_count': page_count,
+        'page_methods': page_methods,
+        'stopped_early': stopped_early
+    }
+    if ocr_seconds:
+        result['ocr_metrics'] = {'pages': len(ocr_seconds), 'page_seconds_total': round(sum(ocr_seconds), 3)}
+    return result
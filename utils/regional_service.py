@@ -9,54 +9,65 @@ class RegionalService:
         self.weather_api_key = os.getenv('WEATHER_API_KEY', 'your_weather_api_key')
         self.dam_api_key = os.getenv('DAM_API_KEY', 'your_dam_api_key')
         
+    def weather_forecast_url(self, lat, lon):
+        """OpenWeatherMap 5 günlük tahmin adresi"""
+        return f"http://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}&appid={self.weather_api_key}&units=metric"
+
+    def recommendation_from_forecast(self, data):
+        """Tahmin verisinden sulama tavsiyesi oluşturur"""
+        # Önümüzdeki 24 saat için yağış kontrolü
+        next_24h = data['list'][:8]  # 3 saatlik aralıklarla 24 saat
+        rain_expected = any('rain' in period for period in next_24h)
+        temp = next_24h[0]['main']['temp']
+        humidity = next_24h[0]['main']['humidity']
+        
+        # Sulama tavsiyesi oluştur
+        if rain_expected:
+            return {
+                "recommendation": "Irrigation not recommended. Rain expected in the next 24 hours.",
+                "details": {
+                    "temperature": temp,
+                    "humidity": humidity,
+                    "rain_forecast": True
+                }
+            }
+        elif temp > 30:
+            return {
+                "recommendation": "Early morning or evening irrigation recommended due to high temperature.",
+                "details": {
+                    "temperature": temp,
+                    "humidity": humidity,
+                    "rain_forecast": False
+                }
+            }
+        else:
+            return {
+                "recommendation": "Normal irrigation schedule can be followed.",
+                "details": {
+                    "temperature": temp,
+                    "humidity": humidity,
+                    "rain_forecast": False
+                }
+            }
+
+    def weather_error(self, error):
+        """Hava durumu alınamadığında dönen tavsiye"""
+        return {
+            "error": str(error),
+            "recommendation": "Unable to fetch weather data. Please check manually."
+        }
+
     def get_weather_recommendation(self, lat, lon):
         """Hava durumu verilerine göre sulama tavsiyesi oluşturur"""
         try:
             # OpenWeatherMap API'den hava durumu verilerini al
-            url = f"http://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}&appid={self.weather_api_key}&units=metric"
-            response = requests.get(url)
+            response = requests.get(self.weather_forecast_url(lat, lon))
             data = response.json()
             
             if response.status_code == 200:
-                # Önümüzdeki 24 saat için yağış kontrolü
-                next_24h = data['list'][:8]  # 3 saatlik aralıklarla 24 saat
-                rain_expected = any('rain' in period for period in next_24h)
-                temp = next_24h[0]['main']['temp']
-                humidity = next_24h[0]['main']['humidity']
-                
-                # Sulama tavsiyesi oluştur
-                if rain_expected:
-                    return {
-                        "recommendation": "Irrigation not recommended. Rain expected in the next 24 hours.",
-                        "details": {
-                            "temperature": temp,
-                            "humidity": humidity,
-                            "rain_forecast": True
-                        }
-                    }
-                elif temp > 30:
-                    return {
-                        "recommendation": "Early morning or evening irrigation recommended due to high temperature.",
-                        "details": {
-                            "temperature": temp,
-                            "humidity": humidity,
-                            "rain_forecast": False
-                        }
-                    }
-                else:
-                    return {
-                        "recommendation": "Normal irrigation schedule can be followed.",
-                        "details": {
-                            "temperature": temp,
-                            "humidity": humidity,
-                            "rain_forecast": False
-                        }
-                    }
+                return self.recommendation_from_forecast(data)
         except Exception as e:
-            return {
-                "error": str(e),
-                "recommendation": "Unable to fetch weather data. Please check manually."
-            }
+            return self.weather_error(e)
 
     def get_dam_status(self, region_id):
         """Baraj doluluk oranlarını getirir"""
@@ -94,7 +105,10 @@ class RegionalService:
 
     def get_regional_insights(self, lat, lon, region_id):
         """Tüm bölgesel içgörüleri bir arada getirir"""
-        weather_data = self.get_weather_recommendation(lat, lon)
+        return self.build_insights(self.get_weather_recommendation(lat, lon), region_id)
+
+    def build_insights(self, weather_data, region_id):
+        """Hava durumu tavsiyesini baraj durumuyla birleştirir"""
         dam_data = self.get_dam_status(region_id)
         
         return {
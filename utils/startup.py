@@ -0,0 +1,98 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Lazy:
+    def __init__(self, factory: Callable[[], Any], accept: Optional[Callable[[Any], bool]] = None):
+        """
+        Value built by factory on first use, shared by all threads
+
+        A value that accept rejects, or a factory that raises, is not kept:
+        the next get() builds it again, e.g. once Ollama is back up.
+
+        Args:
+            factory: Zero-argument callable creating the value
+            accept (callable, optional): Whether a built value may be cached; any value when omitted
+        """
+        self.factory = factory
+        self.accept = accept
+        self._value = None
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._initialized
+
+    def get(self):
+        if self._initialized:
+            return self._value
+        with self._lock:
+            if self._initialized:
+                return self._value
+            value = self.factory()
+            if self.accept is None or self.accept(value):
+                self._value = value
+                self._initialized = True
+            return value
+
+
+class Warmup:
+    def __init__(self):
+        """Named start-up tasks run in order on a background thread."""
+        self._tasks = OrderedDict()
+        self._status = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, name: str, task: Callable[[], Any], critical: bool = False):
+        """
+        Register a warm-up task
+
+        Args:
+            name (str): Name reported by status()
+            task: Zero-argument callable
+            critical (bool): Whether the app is not ready until the task succeeds
+        """
+        self._tasks[name] = task
+        self._status[name] = {'state': 'pending', 'critical': critical}
+
+    def start(self):
+        """Run the registered tasks on a daemon thread; later calls are no-ops."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='warmup', daemon=True)
+            self._thread.start()
+
+    def skip(self):
+        """Leave the tasks to first use, e.g. when warm-up is disabled; skipped tasks do not gate readiness."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            for status in self._status.values():
+                status['state'] = 'skipped'
+
+    def _run(self):
+        for name, task in self._tasks.items():
+            started = time.perf_counter()
+            self._status[name]['state'] = 'running'
+            try:
+                task()
+                self._status[name]['state'] = 'ok'
+            except Exception as e:
+                logger.warning(f"Warm-up task '{name}' failed: {e}")
+                self._status[name].update(state='failed', error=str(e))
+            self._status[name]['seconds'] = round(time.perf_counter() - started, 3)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: dict(status) for name, status in self._status.items()}
+
+    def ready(self) -> bool:
+        """Whether every critical task has finished successfully or was skipped."""
+        return all(status['state'] in ('ok', 'skipped') for status in self._status.values() if status['critical'])
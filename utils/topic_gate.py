@@ -0,0 +1,263 @@
+import os
+import math
+import json
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from utils.turkish_text import search_key
+
+logger = logging.getLogger(__name__)
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'dataset')
+
+# Curated water conservation datasets used as on-topic examples
+ON_TOPIC_SOURCES = [
+    'wc-train.json',
+    'wc-train-variations.json',
+    'wc-validate.json',
+    'wc-train.jsonl',
+    'wc-validate.jsonl',
+    'wc-validate-variations.jsonl'
+]
+
+# Hand-labelled negatives, plus positives the water datasets lack (plumbing,
+# leaks, teaching, Turkish irrigation questions, general agriculture)
+LABELLED_EXAMPLES = 'topic-gate-examples.jsonl'
+
+# Labelled questions never trained on, for choosing TOPIC_GATE_THRESHOLD
+DEV_EXAMPLES = 'topic-gate-dev.jsonl'
+
+# Labelled questions neither trained nor tuned on, for measuring precision and recall
+HOLDOUT_EXAMPLES = 'topic-gate-holdout.jsonl'
+
+# Canned refusals, matching what each role's system prompt asks the model to say
+REFUSALS = {
+    'education': "i don't have the information about your content.",
+    'farmer': "I can only help with agriculture and water conservation questions. "
+              "How can I help you improve your water management today?",
+    'general': "i don't have the information about your content.",
+    'tax': "Bu konuda bilgim yok. Lütfen su faturası veya su tasarrufu ile ilgili bir soru sorun."
+}
+
+
+def load_labelled(name: str) -> Tuple[List[str], List[int]]:
+    """
+    Read a hand-labelled JSONL file of {"text", "on_topic"} records from the dataset directory
+
+    Returns:
+        Tuple of (texts, labels) where 1 means water related
+    """
+    texts, labels = [], []
+    with open(os.path.join(DATASET_DIR, name), 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                texts.append(record['text'].strip())
+                labels.append(1 if record['on_topic'] else 0)
+    return texts, labels
+
+
+class TopicGate:
+    def __init__(self, threshold: float = None, min_words: int = 3):
+        """
+        Initialize the local water-topic classifier
+
+        Args:
+            threshold (float): On-topic probability below which a message is rejected
+            min_words (int): Messages shorter than this are never rejected (greetings etc.)
+        """
+        self.threshold = threshold if threshold is not None else float(os.getenv('TOPIC_GATE_THRESHOLD', '0.35'))
+        self.min_words = min_words
+        self.vectorizer = None
+        self.classifier = None
+        self._weights = None
+        self._bias = 0.0
+
+    def load_examples(self) -> Tuple[List[str], List[int]]:
+        """
+        Collect training texts from the curated datasets
+
+        Returns:
+            Tuple of (texts, labels) where 1 means water related
+        """
+        texts, labels = [], []
+
+        def add(text, label):
+            text = (text or '').strip()
+            if text:
+                texts.append(text)
+                labels.append(label)
+
+        for name in ON_TOPIC_SOURCES:
+            path = os.path.join(DATASET_DIR, name)
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    if name.endswith('.jsonl'):
+                        records = [json.loads(line) for line in f if line.strip()]
+                    else:
+                        records = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping topic gate source {name}: {e}")
+                continue
+
+            for record in records:
+                if 'messages' in record:
+                    for message in record['messages']:
+                        if message.get('role') == 'user':
+                            add(message.get('content'), 1)
+                elif 'text' in record:
+                    # "### Human: ...\n### Assistant: ..." format
+                    human = record['text'].split('### Assistant:')[0]
+                    add(human.replace('### Human:', ''), 1)
+
+        labelled_texts, labelled = load_labelled(LABELLED_EXAMPLES)
+        texts += labelled_texts
+        labels += labelled
+
+        return texts, labels
+
+    def train(self) -> 'TopicGate':
+        """
+        Fit a linear model over hashed character n-grams and words
+
+        Returns:
+            The trained gate
+        """
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import FeatureUnion
+
+        texts, labels = self.load_examples()
+
+        # Character n-grams cope with Turkish suffixes and typos, whole words
+        # carry rare but decisive terms ('faucet', 'photosynthesis'); hashing
+        # keeps both stateless. search_key folds case and Turkish letters,
+        # which str.lower() gets wrong for I/İ
+        self.vectorizer = FeatureUnion([
+            ('chars', HashingVectorizer(analyzer='char_wb', ngram_range=(3, 5), n_features=2 ** 18,
+                                        alternate_sign=False, preprocessor=search_key)),
+            ('words', HashingVectorizer(analyzer='word', n_features=2 ** 18,
+                                        alternate_sign=False, preprocessor=search_key)),
+        ]).fit(texts)
+        self.classifier = LogisticRegression(class_weight='balanced', C=10.0, max_iter=2000)
+        self.classifier.fit(self.vectorizer.transform(texts), labels)
+        self._weights = self.classifier.coef_[0]
+        self._bias = float(self.classifier.intercept_[0])
+
+        logger.info(f"Topic gate trained on {len(texts)} examples ({labels.count(0)} off-topic)")
+        return self
+
+    def on_topic_probability(self, message: str) -> float:
+        """
+        Probability that a message is about water
+
+        Args:
+            message (str): User message
+
+        Returns:
+            float: Probability in [0, 1]
+        """
+        # Plain sparse dot product; predict_proba's input validation dominates at this size
+        features = self.vectorizer.transform([message])
+        score = (features @ self._weights)[0] + self._bias
+        return 1.0 / (1.0 + math.exp(-score))
+
+    def evaluate(self, texts: List[str], labels: List[int]) -> Dict[str, float]:
+        """
+        Precision and recall of letting on-topic messages through at the current threshold
+
+        Args:
+            texts (list): Messages
+            labels (list): 1 for water related, 0 for off-topic
+
+        Returns:
+            Dict with precision, recall and accuracy
+        """
+        allowed = [self.on_topic_probability(text) >= self.threshold for text in texts]
+        passed = sum(1 for ok, label in zip(allowed, labels) if ok and label)
+        return {
+            'precision': passed / max(1, sum(allowed)),
+            'recall': passed / max(1, sum(labels)),
+            'accuracy': sum(1 for ok, label in zip(allowed, labels) if ok == bool(label)) / max(1, len(labels))
+        }
+
+    def check(self, message: str) -> Tuple[bool, float]:
+        """
+        Decide whether a message should reach the LLM
+
+        Args:
+            message (str): User message
+
+        Returns:
+            Tuple of (allowed, on-topic probability)
+        """
+        message = (message or '').strip()
+        if len(message.split()) < self.min_words:
+            return True, 1.0
+
+        probability = self.on_topic_probability(message)
+        return probability >= self.threshold, probability
+
+
+_gate = None
+_gate_error = None
+_gate_lock = threading.Lock()
+
+
+def get_topic_gate() -> Optional[TopicGate]:
+    """
+    Return the process-wide topic gate, training it on first use
+
+    Returns:
+        TopicGate instance, or None if the gate is disabled
+
+    Raises:
+        Exception: Training failed; later calls raise the same error instead of retraining
+    """
+    global _gate, _gate_error
+
+    if os.getenv('TOPIC_GATE_ENABLED', 'True').lower() not in ('1', 'true', 'yes'):
+        return None
+
+    if _gate is None:
+        with _gate_lock:
+            if _gate is None:
+                if _gate_error is not None:
+                    raise _gate_error
+                try:
+                    _gate = TopicGate().train()
+                except Exception as e:
+                    _gate_error = e
+                    raise
+
+    return _gate
+
+
+def off_topic_refusal(message: str, role: str = 'general') -> Optional[str]:
+    """
+    Canned refusal for clearly off-topic messages
+
+    Args:
+        message (str): User message
+        role (str): Chat role (education, farmer, general, tax)
+
+    Returns:
+        Refusal text in the role's language, or None if the message may proceed
+    """
+    try:
+        gate = get_topic_gate()
+    except Exception as e:
+        logger.error(f"Topic gate unavailable, passing all messages through: {e}")
+        return None
+    if gate is None:
+        return None
+
+    allowed, probability = gate.check(message)
+    if allowed:
+        return None
+
+    logger.debug(f"Topic gate rejected {role} message (p_on_topic={probability:.2f})")
+    return REFUSALS.get(role, REFUSALS['general'])
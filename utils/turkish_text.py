@@ -0,0 +1,131 @@
+"""
+Turkish text normalization shared by the bill parsers, cache keys and search
+
+Python's str.lower()/upper() are locale-naive: 'I'.lower() is 'i' rather
+than Turkish 'ı', and 'İ'.lower() grows a combining dot. Everything here is
+built on precomputed character tables, applied with str.replace (which
+CPython runs far faster than str.translate on non-ASCII text) and skipped
+entirely for ASCII input:
+
+    turkish_lower / turkish_upper   Turkish-correct case mapping, for display
+    fold_ascii                      Turkish letters to ASCII, case kept
+    fold_upper                      ASCII upper case, the form bill labels are matched in
+    search_key                      ASCII lower case with whitespace collapsed,
+                                    for dedupe keys and keyword search
+    fold_ocr_digits                 O/o, l/I/| read inside numbers back to 0 and 1
+    parse_number                    '1.234,56', '1,234.56' and '120.30' to Decimal
+
+The folds that run on whole bill texts and repeated questions are memoized.
+"""
+import os
+import re
+from decimal import Decimal
+from functools import lru_cache
+
+# Inputs remembered per memoized fold; bill texts are a few KB each
+TEXT_NORMALIZE_CACHE_SIZE = int(os.getenv('TEXT_NORMALIZE_CACHE_SIZE', '1024'))
+
+# (character, replacement) tables
+_TURKISH_LOWER = (('I', 'ı'), ('İ', 'i'))
+_TURKISH_UPPER = (('i', 'İ'), ('ı', 'I'))
+_ASCII = tuple(zip('çğıöşüÇĞİÖŞÜâîûÂÎÛ', 'cgiosuCGIOSUaiuAIU'))
+
+_OCR_DIGITS = str.maketrans('OolI|', '00111')
+
+# A digit look-alike next to a digit; text without one has nothing to fold.
+# Two single-class patterns scan several times faster than one alternation
+_OCR_HINTS = (re.compile(r'[OolI|][.,]?[0-9]'), re.compile(r'[0-9][.,]?[OolI|]'))
+
+# A number as OCR reads it: digits, separators and digit look-alikes, not
+# touching letters; folded only when a real digit is in it
+_OCR_NUMBER = re.compile(r'(?<![^\W\d_])[\dOolI|][\dOolI|.,]*(?![^\W\d_])')
+
+_WHITESPACE = re.compile(r'\s')
+_THOUSANDS = re.compile(r'\d{1,3}(?:\.\d{3})+|\d{1,3}(?:,\d{3})+')
+
+
+def _replace(text: str, table) -> str:
+    for char, replacement in table:
+        if char in text:
+            text = text.replace(char, replacement)
+    return text
+
+
+def turkish_lower(text: str) -> str:
+    """Lower case with I -> ı and İ -> i."""
+    return _replace(text, _TURKISH_LOWER).lower()
+
+
+def turkish_upper(text: str) -> str:
+    """Upper case with i -> İ and ı -> I."""
+    return _replace(text, _TURKISH_UPPER).upper()
+
+
+def fold_ascii(text: str) -> str:
+    """Turkish letters (and circumflexed vowels) to their ASCII base letter, keeping case and length."""
+    return text if text.isascii() else _replace(text, _ASCII)
+
+
+@lru_cache(maxsize=TEXT_NORMALIZE_CACHE_SIZE)
+def fold_upper(text: str) -> str:
+    """
+    ASCII upper case, the same length as text so match offsets carry over
+
+    Every Turkish i (I, İ, ı, i) becomes I. Falls back to case-kept ASCII
+    in the rare case upper() would change the length (e.g. 'ß').
+    """
+    folded = fold_ascii(text)
+    upper = folded.upper()
+    return upper if len(upper) == len(text) else folded
+
+
+@lru_cache(maxsize=TEXT_NORMALIZE_CACHE_SIZE)
+def search_key(text: str) -> str:
+    """
+    Case-, accent- and whitespace-insensitive form of text
+
+    Folds to ASCII before lowering, so 'FATURASI', 'faturası' and 'Faturasi'
+    share one key and English 'WATER' stays 'water'.
+    """
+    return ' '.join(fold_ascii(text).lower().split())
+
+
+def _fold_ocr_number(match) -> str:
+    token = match.group(0)
+    return token.translate(_OCR_DIGITS) if any(char.isdigit() for char in token) else token
+
+
+@lru_cache(maxsize=TEXT_NORMALIZE_CACHE_SIZE)
+def fold_ocr_digits(text: str) -> str:
+    """
+    Undo OCR letter/digit confusions inside numbers: '1O4' -> '104', '12l,5O' -> '121,50'
+
+    Only standalone number-like tokens containing a digit change, so words
+    and labels glued to numbers ('NO123') are left alone. Length is
+    preserved.
+    """
+    if not any(hint.search(text) for hint in _OCR_HINTS):
+        return text
+    return _OCR_NUMBER.sub(_fold_ocr_number, text)
+
+
+def parse_number(value: str) -> Decimal:
+    """
+    Decimal from a Turkish or English formatted number
+
+    '1.234,56' and '1234,56' use a decimal comma, '1,234.56' and '120.30' a
+    decimal point; with both separators the later one is the decimal one.
+    '1.234' and '1,234' with three-digit groups are thousands.
+    """
+    if not value.isdigit():
+        value = _WHITESPACE.sub('', value)
+    if ',' in value and '.' in value:
+        if value.rfind(',') > value.rfind('.'):
+            value = value.replace('.', '').replace(',', '.')
+        else:
+            value = value.replace(',', '')
+    elif _THOUSANDS.fullmatch(value):
+        value = value.replace('.', '').replace(',', '')
+    elif ',' in value:
+        value = value.replace(',', '.')
+    return Decimal(value)
@@ -0,0 +1,289 @@
+"""
+Single-pass upload handling
+
+Werkzeug hands every file part of a multipart body to the request's
+stream factory chunk by chunk. UploadSpool is that stream: it hashes the
+bytes with SHA-256, counts them against the endpoint's size limit and
+checks the magic bytes against the filename extension as they arrive, so
+an oversized or mislabelled file is rejected without buffering the rest
+of it. Small files stay in memory; larger ones spill to a temp file.
+
+Endpoints declare their limits with @upload_policy; saved files are named
+by content hash so concurrent uploads of e.g. "fatura.pdf" never collide.
+"""
+import os
+import mmap
+import hashlib
+import logging
+import tempfile
+from typing import Dict, Iterable, Optional
+
+from flask import Request, current_app, request
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+
+logger = logging.getLogger(__name__)
+
+# Uploads up to this size never touch the disk before they are used
+UPLOAD_SPOOL_THRESHOLD = int(os.getenv('UPLOAD_SPOOL_THRESHOLD', str(2 * 1024 * 1024)))
+
+# Bytes needed to tell the supported formats apart
+_SNIFF_BYTES = 16
+
+_SIGNATURES = [
+    (b'%PDF-', 'pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'II*\x00', 'tiff'),
+    (b'MM\x00*', 'tiff'),
+    (b'BM', 'bmp'),
+    (b'PK\x03\x04', 'zip'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'ole'),
+]
+
+# Byte order marks of UTF-32 and UTF-16 text, whose characters contain NUL bytes
+_UTF32_BOMS = (b'\xff\xfe\x00\x00', b'\x00\x00\xfe\xff')
+_UTF16_BOMS = (b'\xff\xfe', b'\xfe\xff')
+
+# Content kinds accepted for each extension
+EXTENSION_KINDS = {
+    'pdf': {'pdf'},
+    'png': {'png'},
+    'jpg': {'jpeg'},
+    'jpeg': {'jpeg'},
+    'tif': {'tiff'},
+    'tiff': {'tiff'},
+    'bmp': {'bmp'},
+    'docx': {'zip'},
+    'doc': {'ole', 'zip'},
+    'txt': {'text'},
+    'csv': {'text'},
+}
+
+
+def sniff_kind(head: bytes) -> str:
+    """
+    Identify a file from its first bytes
+
+    Returns:
+        One of the kinds in EXTENSION_KINDS, 'empty' or 'binary'
+    """
+    if not head:
+        return 'empty'
+    for signature, kind in _SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    if head.startswith(_UTF32_BOMS + _UTF16_BOMS) or b'\x00' not in head:
+        return 'text'
+    return 'binary'
+
+
+def decode_text(data: bytes) -> str:
+    """Decode an uploaded text file as UTF-8, or as UTF-16/32 when it starts with their byte order mark."""
+    data = bytes(data)
+    if data.startswith(_UTF32_BOMS):
+        return data.decode('utf-32')
+    if data.startswith(_UTF16_BOMS):
+        return data.decode('utf-16')
+    return data.decode('utf-8-sig')
+
+
+def file_extension(filename: str) -> str:
+    return filename.rsplit('.', 1)[1].lower() if filename and '.' in filename else ''
+
+
+class UploadPolicy:
+    def __init__(self, max_bytes: Optional[int] = None, extensions: Optional[Iterable[str]] = None):
+        """
+        Per-endpoint limits checked while an upload streams in
+
+        Args:
+            max_bytes (int, optional): Largest file accepted; None uses MAX_CONTENT_LENGTH
+            extensions (iterable, optional): Allowed extensions without the dot; None allows any
+        """
+        self.max_bytes = max_bytes
+        self.extensions = {ext.lower().lstrip('.') for ext in extensions} if extensions else None
+
+    def check_type(self, filename: str, kind: str):
+        """Raise 415 if the extension is not allowed or the content does not match it."""
+        ext = file_extension(filename)
+        if self.extensions is not None and ext not in self.extensions:
+            raise UnsupportedMediaType(f"File type .{ext} is not allowed")
+        expected = EXTENSION_KINDS.get(ext)
+        if expected and kind != 'empty' and kind not in expected:
+            raise UnsupportedMediaType(f"File content does not match its .{ext} extension")
+
+
+DEFAULT_POLICY = UploadPolicy()
+
+
+def upload_policy(max_bytes: Optional[int] = None, extensions: Optional[Iterable[str]] = None):
+    """
+    Declare the upload limits of a view; place it below @app.route
+
+    Args:
+        max_bytes (int, optional): Largest file accepted
+        extensions (iterable, optional): Allowed extensions without the dot
+    """
+    def decorator(view):
+        view.upload_policy = UploadPolicy(max_bytes, extensions)
+        return view
+    return decorator
+
+
+class UploadSpool(tempfile.SpooledTemporaryFile):
+    def __init__(self, filename: str, policy: UploadPolicy, max_bytes: Optional[int],
+                 spool_threshold: int = UPLOAD_SPOOL_THRESHOLD):
+        """
+        Stream target for one uploaded file that hashes and validates as it is written
+
+        Args:
+            filename (str): Client filename, used for the type check
+            policy (UploadPolicy): Limits of the receiving endpoint
+            max_bytes (int, optional): Size limit in bytes
+            spool_threshold (int): Size above which the data moves to a temp file
+        """
+        super().__init__(max_size=spool_threshold, mode='w+b')
+        self.filename = filename or ''
+        self.policy = policy
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.kind = None
+        self._hash = hashlib.sha256()
+        self._head = b''
+
+    def write(self, data) -> int:
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise RequestEntityTooLarge(
+                f"{self.filename or 'Upload'} is larger than {self.max_bytes // (1024 * 1024)} MB"
+            )
+        if self.kind is None:
+            self._head += bytes(data[:_SNIFF_BYTES - len(self._head)])
+            if len(self._head) >= _SNIFF_BYTES:
+                self._identify()
+        self._hash.update(data)
+        return super().write(data)
+
+    def seek(self, *args) -> int:
+        # Werkzeug rewinds the stream once the part is complete; files shorter
+        # than the sniff window are identified here
+        if self.kind is None:
+            self._identify()
+        return super().seek(*args)
+
+    def _identify(self):
+        self.kind = sniff_kind(self._head)
+        if self.filename:
+            self.policy.check_type(self.filename, self.kind)
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    @property
+    def in_memory(self) -> bool:
+        return not self._rolled
+
+    def getbuffer(self) -> memoryview:
+        """
+        The uploaded bytes without copying them
+
+        In-memory uploads expose their buffer directly; spooled ones are
+        memory-mapped read-only.
+        """
+        if not self._rolled:
+            return self._file.getbuffer()
+        self._file.flush()
+        if self.size == 0:
+            return memoryview(b'')
+        return memoryview(mmap.mmap(self.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+class UploadRequest(Request):
+    """Request class whose file parts stream into UploadSpool."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        view = current_app.view_functions.get(self.endpoint) if self.endpoint else None
+        policy = getattr(view, 'upload_policy', DEFAULT_POLICY)
+        max_bytes = policy.max_bytes or current_app.config.get('MAX_CONTENT_LENGTH')
+        if max_bytes is not None and content_length is not None and content_length > max_bytes:
+            raise RequestEntityTooLarge()
+        return UploadSpool(filename, policy, max_bytes)
+
+
+def _parse_uploads():
+    # Parse multipart bodies before the view runs, so a 413/415 raised while
+    # streaming is answered as such instead of by the view's own error handling
+    if request.mimetype == 'multipart/form-data':
+        request.files
+
+
+def init_uploads(app):
+    """Install streaming upload handling on a Flask app."""
+    app.request_class = UploadRequest
+    app.before_request(_parse_uploads)
+
+
+def upload_spool(file) -> Optional[UploadSpool]:
+    """The UploadSpool behind a FileStorage, or None for files from another source."""
+    stream = getattr(file, 'stream', None)
+    return stream if isinstance(stream, UploadSpool) else None
+
+
+def upload_bytes(file) -> memoryview:
+    """Bytes of an uploaded FileStorage, read once if it did not come through UploadSpool."""
+    spool = upload_spool(file)
+    if spool is not None:
+        return spool.getbuffer()
+    file.stream.seek(0)
+    return memoryview(file.stream.read())
+
+
+def upload_info(file) -> Dict[str, object]:
+    """
+    SHA-256, size and sniffed kind of an uploaded FileStorage
+
+    Returns:
+        Dict with sha256, size and kind
+    """
+    spool = upload_spool(file)
+    if spool is not None:
+        return {'sha256': spool.sha256, 'size': spool.size, 'kind': spool.kind}
+    data = upload_bytes(file)
+    return {'sha256': hashlib.sha256(data).hexdigest(), 'size': len(data), 'kind': sniff_kind(bytes(data[:_SNIFF_BYTES]))}
+
+
+def save_upload(file, folder: str) -> Dict[str, object]:
+    """
+    Save an upload under its content hash
+
+    Identical uploads share one file, and the write goes through a temp
+    file and os.replace, so readers never see a partial file and two
+    requests uploading the same name cannot overwrite each other.
+
+    Args:
+        file: Uploaded FileStorage
+        folder (str): Target directory
+
+    Returns:
+        Dict with path, sha256, size and kind
+    """
+    info = upload_info(file)
+    ext = file_extension(file.filename)
+    path = os.path.join(folder, f"{info['sha256']}.{ext}" if ext else info['sha256'])
+
+    if os.path.exists(path):
+        # Refresh the mtime so cleanup treats the file as freshly uploaded
+        os.utime(path)
+    else:
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(upload_bytes(file))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    return dict(info, path=path)
@@ -4,6 +4,15 @@ import requests
 import logging
 from typing import Dict, Any, Optional
 
+from utils.bill_report import (
+    TipsCache, parse_bill_fields, has_core_fields, tips_profile,
+    render_bill_report, fallback_tips
+)
+
+# Conservation tips depend only on the consumption profile, so they are
+# shared across requests and bill chat instances
+tips_cache = TipsCache()
+
 class WaterBillOllamaChat:
     def __init__(self, 
                  ollama_host: str = 'http://localhost:11434', 
@@ -18,10 +27,6 @@ class WaterBillOllamaChat:
         self.ollama_host = ollama_host
         self.model = model
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
 
     def generate_bill_analysis_prompt(self, bill_text: str, additional_instruction: str = '') -> str:
         """
@@ -133,20 +138,96 @@ Provide a detailed, precise analysis following this structure. WRITE EVERYTHING
                 'error': str(e)
             }
 
+    def conservation_tips_prompt(self, profile: tuple) -> str:
+        """
+        Build the tips prompt for a consumption profile
+        
+        Args:
+            profile (tuple): (consumption bucket, household size, season, language)
+        
+        Returns:
+            Prompt asking for a short numbered list of tips
+        """
+        bucket, household, season, language = profile
+        household_text = 'unknown size' if household == 'unknown' else f'{household} people'
+        return (
+            f"Give exactly 3 practical water-saving tips for a household of {household_text} "
+            f"with {bucket.replace('_', ' ')} monthly water consumption in {season}. "
+            f"Mention the potential water or cost savings. "
+            f"Write in {'Turkish' if language == 'tr' else 'English'}. "
+            f"Answer with a numbered list only."
+        )
+
+    def generate_conservation_tips(self, profile: tuple) -> Optional[str]:
+        """
+        Ask Ollama for conservation tips for a consumption profile
+        
+        Args:
+            profile (tuple): (consumption bucket, household size, season, language)
+        
+        Returns:
+            Numbered tips text, or None if the model is unavailable
+        """
+        try:
+            response = requests.post(
+                f'{self.ollama_host}/api/generate',
+                json={
+                    'model': self.model,
+                    'prompt': self.conservation_tips_prompt(profile),
+                    'stream': False,
+                    'options': {'num_predict': 200}
+                },
+                timeout=30
+            )
+            response.raise_for_status()
+            tips = response.json().get('response', '').strip()
+            return tips or None
+        
+        except requests.RequestException as e:
+            self.logger.error(f"Ollama API error: {e}")
+            return None
+
     def analyze_water_bill(self, 
                             bill_text: str, 
-                            additional_instruction: str = '') -> Dict[str, Any]:
+                            additional_instruction: str = '',
+                            household_size: Optional[int] = None,
+                            language: str = 'en') -> Dict[str, Any]:
         """
-        Comprehensive water bill analysis method in English
+        Comprehensive water bill analysis method
+        
+        Bill fields are parsed locally and rendered from a fixed template;
+        only the conservation tips come from the model, cached per
+        consumption profile. Bills the local parsers cannot read fall
+        back to full LLM analysis.
         
         Args:
             bill_text (str): Extracted text from water bill
             additional_instruction (str): Extra processing instructions
+            household_size (int, optional): Number of people in the household
+            language (str): Report language ('en' or 'tr')
         
         Returns:
             Comprehensive bill analysis
         """
-        return self.chat_with_ollama(bill_text, additional_instruction)
+        fields = parse_bill_fields(bill_text)
+        if not has_core_fields(fields):
+            return self.chat_with_ollama(bill_text, additional_instruction)
+        
+        profile = tips_profile(fields, household_size, language)
+        tips = tips_cache.get(profile)
+        cached = tips is not None
+        if not cached:
+            tips = self.generate_conservation_tips(profile)
+            if tips:
+                tips_cache.put(profile, tips)
+        
+        return {
+            'success': True,
+            'response': render_bill_report(fields, tips or fallback_tips(profile[3]), profile[3]),
+            'context': [],
+            'fields': fields,
+            'tips_cached': cached
+        }
 
 def create_water_bill_chat(language: str = 'en') -> WaterBillOllamaChat:
     """
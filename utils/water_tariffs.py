@@ -0,0 +1,97 @@
+from typing import Dict, Any, Optional
+
+from utils.turkish_text import search_key
+
+# Residential water tariffs (TL per m³, before VAT).
+# ASKI tier 1 rates are taken from the April 2024 Ankara bill used in
+# model_inference_tax.py (5 m³ -> 75.55 TL water, 37.80 TL wastewater,
+# 11.50 TL ÇTV). Higher tiers are placeholders marked unverified: charges
+# that reach them are never quoted to users (the intent router falls back
+# to the LLM) until they are replaced with the published tariff.
+TARIFFS = {
+    'aski': {
+        'name': 'ASKI (Ankara)',
+        'effective': '2024-04',
+        'tiers': [
+            # (upper bound in m³, water TL/m³, wastewater TL/m³, verified)
+            (10, 15.11, 7.56, True),
+            (20, 22.67, 11.34, False),
+            (30, 30.22, 15.11, False),
+            (None, 37.78, 18.89, False)
+        ],
+        'environment_tax_per_m3': 2.30,
+        'water_vat': 0.01,
+        'wastewater_vat': 0.10
+    }
+}
+
+# Provider and city names, as search_key folds them (ASKİ, askı, Aski -> aski)
+PROVIDER_ALIASES = {
+    'aski': 'aski',
+    'ankara': 'aski'
+}
+
+
+def resolve_provider(name: Optional[str]) -> Optional[str]:
+    """
+    Map a provider or city name to a tariff key
+
+    Args:
+        name (str): Provider or city name as written by the user
+
+    Returns:
+        Tariff key, or None if no tariff is known
+    """
+    if not name:
+        return 'aski'
+    return PROVIDER_ALIASES.get(search_key(name))
+
+
+def calculate_charge(volume_m3: float, provider: str = 'aski') -> Dict[str, Any]:
+    """
+    Calculate a residential water charge from the tariff table
+
+    Args:
+        volume_m3 (float): Consumption in cubic meters
+        provider (str): Tariff key
+
+    Returns:
+        Dict with per-item charges, total and whether every tier used is verified
+    """
+    tariff = TARIFFS[provider]
+    remaining = max(0.0, float(volume_m3))
+    lower = 0.0
+    water_cost = 0.0
+    wastewater_cost = 0.0
+    verified = True
+    tiers_used = []
+
+    for upper, water_rate, wastewater_rate, tier_verified in tariff['tiers']:
+        if remaining <= 0:
+            break
+        span = remaining if upper is None else min(remaining, upper - lower)
+        water_cost += span * water_rate
+        wastewater_cost += span * wastewater_rate
+        verified = verified and tier_verified
+        tiers_used.append({'volume': span, 'water_rate': water_rate, 'wastewater_rate': wastewater_rate})
+        remaining -= span
+        lower = upper if upper is not None else lower
+
+    environment_tax = volume_m3 * tariff['environment_tax_per_m3']
+    water_vat = water_cost * tariff['water_vat']
+    wastewater_vat = wastewater_cost * tariff['wastewater_vat']
+    total = water_cost + wastewater_cost + environment_tax + water_vat + wastewater_vat
+
+    return {
+        'provider': tariff['name'],
+        'effective': tariff['effective'],
+        'volume_m3': float(volume_m3),
+        'water_cost': round(water_cost, 2),
+        'wastewater_cost': round(wastewater_cost, 2),
+        'environment_tax': round(environment_tax, 2),
+        'water_vat': round(water_vat, 2),
+        'wastewater_vat': round(wastewater_vat, 2),
+        'total': round(total, 2),
+        'tiers': tiers_used,
+        'verified': verified
+    }
@@ -3,6 +3,8 @@ import logging
 import json
 from typing import Dict, Tuple, Optional, Any
 
+from utils.bill_parser import parse_bill
+
 class WaterTaxExpert:
     def __init__(self, context: str = 'bill_analysis'):
         """
@@ -107,12 +109,13 @@ and identifying areas where you can reduce water usage."""
             self.logger.error(error_msg)
             return "", error_msg
 
-    def generate_response(self, message: str) -> Tuple[str, Optional[str]]:
+    def generate_response(self, message: str, history: Optional[list] = None) -> Tuple[str, Optional[str]]:
         """
         Generate a comprehensive water bill analysis response
         
         Args:
             message (str): User's input message (bill details)
+            history (list, optional): Session turns; unused since each bill is analyzed on its own
         
         Returns:
             Tuple of (response, error)
@@ -169,6 +172,18 @@ Toplam Tutar	{bill_details.get('total_bill', '0.00')}"""
             self.logger.error(error_msg)
             return "", error_msg
 
+    def extract_bill_details(self, bill_text: str) -> Dict[str, str]:
+        """
+        Public entry point for structured bill field extraction
+
+        Args:
+            bill_text (str): Full bill text
+
+        Returns:
+            Dictionary of extracted bill details
+        """
+        return self._extract_bill_details(bill_text)
+
     def _extract_bill_details(self, bill_text: str) -> Dict[str, str]:
         """
         Extract structured details from the bill text
@@ -180,38 +195,34 @@ Toplam Tutar	{bill_details.get('total_bill', '0.00')}"""
             Dictionary of extracted bill details
         """
         try:
+            bill = parse_bill(bill_text)
             details = {
-                'bill_number': self._extract_value(bill_text, r'Fatura No:\s*(\d+)', 'Bulunamadı'),
-                'subscriber_no': self._extract_value(bill_text, r'Abone No:\s*(\d+)', 'Bulunamadı'),
-                'contract_no': self._extract_value(bill_text, r'Sözleşme No:\s*(\d+)', 'Bulunamadı'),
-                'subscriber_name': self._extract_value(bill_text, r'Abone Adı:\s*([^\n]+)', 'Bulunamadı'),
-                'address': self._extract_value(bill_text, r'Adres:\s*([^\n]+)', 'Bulunamadı'),
-                'bill_date': self._extract_value(bill_text, r'Fatura Tarihi:\s*(\d{2}\.\d{2}\.\d{4})', 'Bulunamadı'),
-                'notification_time': self._extract_value(bill_text, r'Tebligat Saati:\s*(\d{2}:\d{2}:\d{2})', 'Bulunamadı'),
-                'payment_deadline': self._extract_value(bill_text, r'Son Ödeme Tarihi:\s*(\d{2}\.\d{2}\.\d{4})', 'Bulunamadı'),
+                'bill_number': bill.text('bill_number', 'Bulunamadı'),
+                'subscriber_no': bill.text('subscriber_no', 'Bulunamadı'),
+                'contract_no': bill.text('contract_no', 'Bulunamadı'),
+                'subscriber_name': bill.text('subscriber_name', 'Bulunamadı'),
+                'address': bill.text('address', 'Bulunamadı'),
+                'bill_date': bill.text('bill_date', 'Bulunamadı'),
+                'notification_time': bill.text('notification_time', 'Bulunamadı'),
+                'payment_deadline': bill.text('payment_deadline', 'Bulunamadı'),
                 
-                'last_index': self._extract_value(bill_text, r'Son Endeks:\s*(\d+)', '0'),
-                'first_index': self._extract_value(bill_text, r'İlk Endeks:\s*(\d+)', '0'),
-                'total_consumption': self._extract_value(bill_text, r'Tüketim:\s*(\d+)\s*m³', '0'),
-                'reading_days': self._extract_value(bill_text, r'Okuma Gün Sayısı:\s*(\d+)', '0'),
+                'last_index': bill.text('last_index', '0'),
+                'first_index': bill.text('first_index', '0'),
+                'total_consumption': bill.text('consumption', '0'),
+                'reading_days': bill.text('reading_days', '0'),
                 
-                'water_cost': self._extract_value(bill_text, r'Su Bedeli \(1\. Kademe\):\s*(\d+(?:\.\d+)?)', '0.00'),
-                'wastewater_cost': self._extract_value(bill_text, r'Atıksu Bedeli:\s*(\d+(?:\.\d+)?)', '0.00'),
-                'environment_tax': self._extract_value(bill_text, r'ÇTV \(Çevre Temizlik Vergisi\):\s*(\d+(?:\.\d+)?)', '0.00'),
-                'water_vat_1': self._extract_value(bill_text, r'Su KDV \(%1\):\s*(\d+(?:\.\d+)?)', '0.00'),
-                'wastewater_vat_10': self._extract_value(bill_text, r'Atıksu KDV \(%10\):\s*(\d+(?:\.\d+)?)', '0.00'),
+                'water_cost': bill.text('water_cost', '0.00'),
+                'wastewater_cost': bill.text('wastewater_cost', '0.00'),
+                'environment_tax': bill.text('environment_tax', '0.00'),
+                'water_vat_1': bill.text('water_vat', '0.00'),
+                'wastewater_vat_10': bill.text('wastewater_vat', '0.00'),
                 'other_charges': '0.00',
-                'total_bill': self._extract_value(bill_text, r'Toplam Tutar:\s*(\d+(?:\.\d+)?)', '0.00')
+                'total_bill': bill.text('total_amount', '0.00')
             }
             
             # Additional validation
-            if details['total_consumption'] == '0':
-                try:
-                    last_index = float(details['last_index'])
-                    first_index = float(details['first_index'])
-                    details['total_consumption'] = str(max(0, last_index - first_index))
-                except (ValueError, TypeError):
-                    details['total_consumption'] = '0'
+            if 'consumption' not in bill.values and 'last_index' in bill.values and 'first_index' in bill.values:
+                details['total_consumption'] = str(max(0, bill.get('last_index') - bill.get('first_index')))
             
             return details
         
@@ -224,23 +235,6 @@ Toplam Tutar	{bill_details.get('total_bill', '0.00')}"""
                 'total_bill': '0.00'
             }
 
-    def _extract_value(self, text: str, pattern: str, default: str = 'N/A') -> str:
-        """
-        Extract a value from text using a regex pattern
-        
-        Args:
-            text (str): Full text to search
-            pattern (str): Regex pattern to match
-            default (str): Default value if no match found
-        
-        Returns:
-            Extracted value or default
-        """
-        import re
-        
-        match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-        return match.group(1).strip() if match else default
-
 def create_water_expert(context: str = 'bill_analysis') -> WaterTaxExpert:
     """
     Factory function to create a Water Tax Expert instance
@@ -98,6 +98,57 @@ class WeatherService:
         else:
             return "Good conditions for water conservation activities."
         
+    def geocode(self, name):
+        """Resolves a place name to coordinates using Open-Meteo geocoding."""
+        try:
+            params = {
+                'name': name,
+                'count': 1,
+                'language': 'tr'
+            }
+            response = requests.get(self.geocoding_url, params=params, timeout=5)
+            response.raise_for_status()
+
+            results = response.json().get('results') or []
+            if not results:
+                return None
+
+            place = results[0]
+            return {
+                'name': place.get('name', name),
+                'lat': place['latitude'],
+                'lon': place['longitude']
+            }
+
+        except Exception as e:
+            print(f"Could not geocode {name}: {str(e)}")
+            return None
+
+    def get_daily_forecast(self, lat, lon, days=7):
+        """Gets daily precipitation and temperature forecast for the coordinates."""
+        params = {
+            'latitude': lat,
+            'longitude': lon,
+            'daily': 'precipitation_sum,precipitation_probability_max,temperature_2m_max,temperature_2m_min',
+            'timezone': 'auto',
+            'forecast_days': days
+        }
+
+        response = requests.get(self.weather_url, params=params, timeout=10)
+        response.raise_for_status()
+
+        daily = response.json().get('daily', {})
+        return [
+            {
+                'date': date,
+                'precipitation_sum': daily['precipitation_sum'][i],
+                'precipitation_probability': daily['precipitation_probability_max'][i],
+                'temperature_max': daily['temperature_2m_max'][i],
+                'temperature_min': daily['temperature_2m_min'][i]
+            }
+            for i, date in enumerate(daily.get('time', []))
+        ]
+
     def get_weather(self, lat=None, lon=None):
         """Gets weather information for the specified coordinates."""
         try:
@@ -5,21 +5,50 @@ import json
 
 weather_bp = Blueprint('weather', __name__)
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Location services tried in order
+LOCATION_SERVICES = [
+    ('ipapi.co', 'https://ipapi.co/json/'),
+    ('ip-api.com', 'http://ip-api.com/json/'),
+]
+
+def parse_location(location_data):
+    """Extract (city, country, latitude, longitude) from a location service response."""
+    city = location_data.get('city')
+    country = location_data.get('country_name') or location_data.get('country')
+    latitude = location_data.get('latitude') or location_data.get('lat')
+    longitude = location_data.get('longitude') or location_data.get('lon')
+    return city, country, latitude, longitude
+
+def current_weather_url(latitude, longitude):
+    return f'https://api.open-meteo.com/v1/forecast?latitude={latitude}&longitude={longitude}&current_weather=true&hourly=temperature_2m,relativehumidity_2m,windspeed_10m,cloudcover'
+
+def build_weather_response(city, country, latitude, longitude, weather_data):
+    """Shape Open-Meteo current weather into the /get-weather response."""
+    # Extract current weather information
+    current_weather = weather_data['current_weather']
+    
+    # Get the current hour index
+    current_hour_index = 0  # Assuming the first hour is current
+    
+    return {
+        'location': f"{city}, {country}",
+        'temperature': current_weather['temperature'],
+        'wind_speed': current_weather['windspeed'],
+        'wind_direction': current_weather['winddirection'],
+        'humidity': weather_data['hourly']['relativehumidity_2m'][current_hour_index],
+        'cloudiness': weather_data['hourly']['cloudcover'][current_hour_index],
+        'latitude': latitude,
+        'longitude': longitude
+    }
+
 @weather_bp.route('/get-weather')
 def get_weather():
     try:
-        # Try multiple location services
-        location_services = [
-            ('ipapi.co', 'https://ipapi.co/json/'),
-            ('ip-api.com', 'http://ip-api.com/json/'),
-        ]
-        
+        city = country = latitude = longitude = None
         location_data = None
-        for service_name, url in location_services:
+        for service_name, url in LOCATION_SERVICES:
             try:
                 response = requests.get(url, timeout=5)
                 location_data = response.json()
@@ -28,10 +57,7 @@ def get_weather():
                 logger.debug(f"Location data from {service_name}: {json.dumps(location_data, indent=2)}")
                 
                 # Validate location data
-                city = location_data.get('city')
-                country = location_data.get('country_name') or location_data.get('country')
-                latitude = location_data.get('latitude') or location_data.get('lat')
-                longitude = location_data.get('longitude') or location_data.get('lon')
+                city, country, latitude, longitude = parse_location(location_data)
                 
                 # Check if we have valid location data
                 if all([city, country, latitude, longitude]):
@@ -52,8 +78,7 @@ def get_weather():
         
         # Fetch weather data from Open Meteo
         try:
-            weather_url = f'https://api.open-meteo.com/v1/forecast?latitude={latitude}&longitude={longitude}&current_weather=true&hourly=temperature_2m,relativehumidity_2m,windspeed_10m,cloudcover'
-            weather_response = requests.get(weather_url, timeout=10)
+            weather_response = requests.get(current_weather_url(latitude, longitude), timeout=10)
             
             # Check if weather request was successful
             if weather_response.status_code != 200:
@@ -63,24 +88,7 @@ def get_weather():
                     'details': 'Weather service unavailable'
                 }), 500
             
-            weather_data = weather_response.json()
-            
-            # Extract current weather information
-            current_weather = weather_data['current_weather']
-            
-            # Get the current hour index
-            current_hour_index = 0  # Assuming the first hour is current
-            
-            return jsonify({
-                'location': f"{city}, {country}",
-                'temperature': current_weather['temperature'],
-                'wind_speed': current_weather['windspeed'],
-                'wind_direction': current_weather['winddirection'],
-                'humidity': weather_data['hourly']['relativehumidity_2m'][current_hour_index],
-                'cloudiness': weather_data['hourly']['cloudcover'][current_hour_index],
-                'latitude': latitude,
-                'longitude': longitude
-            })
+            return jsonify(build_weather_response(city, country, latitude, longitude, weather_response.json()))
         
         except Exception as weather_error:
             logger.error(f"Weather data fetch error: {weather_error}")